@@ -1,13 +1,15 @@
-from src.environment import Environment
-from src.rpythonized_object import RPythonizedObject, list_equals, dict_equals, nullable_equals, list_to_string, \
-    dict_to_string, nullable_to_string
+from src.environment import Environment, ENVIRONMENT_IS_VIRTUALIZABLE
+from src.memory_stats import memory_statistics
+from src.rpythonized_object import RPythonizedObject, object_equals, list_equals, dict_equals, nullable_equals, \
+    list_to_string, dict_to_string, nullable_to_string
 
 # Begin RPython setup; catch import errors so this can still run in CPython...
-from src.rpythonizer import list_classes_in_file, add_binary_operation_equals
+from src.rpythonizer import list_classes_in_file, add_binary_operation_equals, add_accept_methods
 
 try:
     from rpython.rlib.jit import JitDriver, assert_green, elidable, promote, unroll_safe, jit_debug, we_are_jitted
-    from rpython.rlib.objectmodel import import_from_mixin, specialize
+    from rpython.rlib.objectmodel import import_from_mixin, specialize, compute_hash, compute_unique_id, \
+        we_are_translated
 except ImportError:
     class JitDriver(object):
         def __init__(self, **kw): pass
@@ -56,25 +58,46 @@ except ImportError:
             return decorated_func
 
 
+    def compute_hash(x):
+        return hash(x)
+
+
+    def compute_unique_id(x):
+        return id(x)
+
+
+    def we_are_translated():
+        return False
+
+
 # specialize necessary because get_location is used by two different jitdrivers passing in different types (While and
-# FunctionCall); normally RPython could resolve these to Exp but this is a late-stage annotation issue and types
+# the Exp body of a function); normally RPython could resolve these to Exp but this is a late-stage annotation issue and types
 # cannot be changed
 @specialize.argtype(0)
 def get_location(code):
+    if code.location is not None:
+        return "%s at %s" % (code.__class__.__name__, code.location.to_string())
     return "%s" % code.to_string()
 
 
-# to virtualize: jitdriver = JitDriver(greens=['code'], reds=['env', 'result', 'value'], virtualizables=['env'],
-# get_printable_location=get_location)
-while_jitdriver = JitDriver(greens=['code'], reds=['env', 'result', 'value'], get_printable_location=get_location)
-function_jitdriver = JitDriver(greens=['code'], reds='auto', is_recursive=True,
+# loops are entered (and their iterations counted towards the threshold) at the can_enter_jit back-edge in
+# While.evaluate; functions are entered at the merge point in evaluate_function_body, keyed on the function body so that
+# all call sites of a (recursive) function share one green key and one counter towards function_threshold
+# the 'env' reds are virtualizable (see Environment._virtualizable_): within a trace, the slots of the environment a loop
+# or function body is evaluated in are kept in registers and only written back when the environment escapes; this
+# depends on the environment implementation selected in environment.py
+virtualizable_reds = ['env'] if ENVIRONMENT_IS_VIRTUALIZABLE else []
+while_jitdriver = JitDriver(greens=['code'], reds=['env', 'result', 'value'], virtualizables=virtualizable_reds,
+                            get_printable_location=get_location)
+function_jitdriver = JitDriver(greens=['code'], reds=['env'], virtualizables=virtualizable_reds, is_recursive=True,
                                get_printable_location=get_location)
 
 
 def jitpolicy(driver):
     try:
         from rpython.jit.codewriter.policy import JitPolicy
-        return JitPolicy()
+        from src.jit_stats import jit_statistics
+        return JitPolicy(jit_statistics)
     except ImportError:
         raise NotImplemented("Abandon if we are unable to use RPython's JitPolicy")
 
@@ -93,16 +116,50 @@ class InterpretationError(Exception):
         return self.to_string()
 
 
+class InternedHashes(object):
+    """
+    The structural hashes of the nodes interned by a HashConsingFactory (see src/hash_consing.py); they are kept in this
+    table rather than in a field of every node because only hash-consed trees, which tiger-interpreter never builds,
+    have them
+    """
+
+    def __init__(self):
+        self.entries = {}  # unique id of an interned node -> (the node, so that its id is not reused, its hash)
+
+    def put(self, node, structural_hash):
+        self.entries[compute_unique_id(node)] = (node, structural_hash)
+
+    def get(self, node):
+        """:return: the structural hash cached for the node, or 0 if it has not been interned"""
+        if we_are_translated():
+            return 0  # hash consing runs hosted by CPython only
+        entry = self.entries.get(compute_unique_id(node), None)
+        return entry[1] if entry is not None and entry[0] is node else 0
+
+
+interned_hashes = InternedHashes()
+
+
 class Program(RPythonizedObject):
     """
-    Tiger programs have three types of AST nodes: expressions, declarations, and types
+    Tiger programs have three types of AST nodes: expressions, declarations, and types; each node class declares
+    __slots__ as its _attrs_ so that, hosted by CPython (e.g. in tests), nodes do not carry an instance dictionary
     """
-    _attrs_ = []
-    _immutable_fields_ = []
+    _attrs_ = ['location']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['location?']
+
+    def __init__(self):
+        RPythonizedObject.__init__(self)
+        self.location = None  # the source location of the node, if parsed; see Parser.locate()
 
-    #
-    # def __init__(self):
-    #     RPythonizedObject.__init__(self)
+    def children(self):
+        """:return: the nodes this node contains, in the order the traversals of src/visitor.py visit them"""
+        return []
+
+    def set_children(self, children):
+        """Replace the nodes this node contains with those of a list ordered as children() is, e.g. after rewriting"""
+        assert len(children) == 0
 
     def evaluate(self, env):
         pass
@@ -112,9 +169,20 @@ class Program(RPythonizedObject):
         return isinstance(other, Program)
         # this should be implemented in sub-classes
 
+    def has_different_hash(self, other):
+        """Hash-consed nodes cache their structural hash, so nodes whose cached hashes differ cannot be equal"""
+        if not isinstance(other, Program):
+            return False
+        own_hash = interned_hashes.get(self)
+        if own_hash == 0:
+            return False
+        other_hash = interned_hashes.get(other)
+        return other_hash != 0 and own_hash != other_hash
+
 
 class Exp(Program):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self):
@@ -123,6 +191,7 @@ class Exp(Program):
 
 class Declaration(Program):
     _attrs_ = ['name', 'parent', 'index']
+    __slots__ = _attrs_
     _immutable_fields_ = ['name', 'parent?', 'index?']
 
     def __init__(self, name, parent=None, index=0):
@@ -140,6 +209,7 @@ class Bound(Exp):
     This subclass is used for describing AST nodes that are 'bound' to their referring declaration in scopes.py
     """
     _attrs_ = ['declaration']
+    __slots__ = _attrs_
     _immutable_fields_ = ['declaration?']
 
     def __init__(self, declaration):
@@ -152,6 +222,7 @@ class Bound(Exp):
 
 class Type(Program):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self):
@@ -163,6 +234,7 @@ class Type(Program):
 
 class Value(Exp):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self):
@@ -181,6 +253,7 @@ class Value(Exp):
 
 class NilValue(Value):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self):
@@ -195,12 +268,15 @@ class NilValue(Value):
 
 class IntegerValue(Value):
     _attrs_ = ['integer']
+    __slots__ = _attrs_
     _immutable_fields_ = ['integer']
 
     def __init__(self, integer):
         Value.__init__(self)
         assert isinstance(integer, int)
         self.integer = integer
+        if memory_statistics.enabled:
+            memory_statistics.integer_values += 1
 
     def value(self):
         return self.integer
@@ -218,25 +294,102 @@ class IntegerValue(Value):
 
 
 class StringValue(Value):
-    _attrs_ = ['string']
-    _immutable_fields_ = ['string']
+    """
+    Strings are either flat (self.string holds the characters) or a rope, i.e. the lazy concatenation of a left and
+    right StringValue; ropes are flattened on demand by get_string() so that repeatedly concatenating to the same
+    string (e.g. s := concat(s, "...") in a loop) is not quadratic. The hash of the characters is computed once and
+    cached so that comparing unequal strings rarely needs to look at the characters (literals are also interned by the
+    parser so that comparing a literal to itself is an identity check)
+    """
+    _attrs_ = ['string', 'left', 'right', 'length', 'hash']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['length']  # note that the string and children are modified when a rope is flattened
 
-    def __init__(self, string):
+    """
+    Concatenations shorter than this are copied eagerly into a flat string instead of creating a rope node
+    """
+    SHORT_STRING_LENGTH = 64
+
+    def __init__(self, string, left=None, right=None):
         Value.__init__(self)
+        if memory_statistics.enabled:
+            memory_statistics.string_values += 1
         self.string = string
+        self.left = left
+        self.right = right
+        self.hash = 0  # 0 marks a hash that is not yet computed (like Java's String.hashCode)
+        if string is not None:
+            self.length = len(string)
+        else:
+            assert isinstance(left, StringValue) and isinstance(right, StringValue)
+            self.length = left.length + right.length
 
-    def value(self):
+    @staticmethod
+    def concatenate(left, right):
+        assert isinstance(left, StringValue)
+        assert isinstance(right, StringValue)
+        if right.length == 0:
+            return left
+        elif left.length == 0:
+            return right
+        elif left.length + right.length <= StringValue.SHORT_STRING_LENGTH:
+            return StringValue(left.get_string() + right.get_string())
+        elif left.is_rope() and not left.right.is_rope() and not right.is_rope() \
+                and left.right.length + right.length <= StringValue.SHORT_STRING_LENGTH:
+            # coalesce short leaves so that appending one character at a time does not create one node per character
+            return StringValue(None, left.left, StringValue(left.right.string + right.string))
+        else:
+            return StringValue(None, left, right)
+
+    def is_rope(self):
+        return self.string is None
+
+    def get_string(self):
+        if self.string is None:
+            self.flatten()
         return self.string
 
+    def flatten(self):
+        """Collect the leaves of the rope iteratively (ropes built in a loop are too deep to recurse on) and replace
+        the children with the flattened string"""
+        pieces = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.string is not None:
+                pieces.append(node.string)
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+        self.string = ''.join(pieces)
+        self.left = None
+        self.right = None
+
+    def get_hash(self):
+        if self.hash == 0:
+            self.hash = compute_hash(self.get_string())
+        return self.hash
+
+    def value(self):
+        return self.get_string()
+
     def to_string(self):
-        return '%s(%s)' % (self.__class__.__name__, self.string)
+        return '%s(%s)' % (self.__class__.__name__, self.get_string())
 
     def equals(self, other):
-        return isinstance(other, self.__class__) and self.string == other.string
+        if self is other:
+            return True
+        elif not isinstance(other, StringValue) or self.length != other.length:
+            return False
+        elif self.get_hash() != other.get_hash():
+            return False
+        else:
+            return self.get_string() == other.get_string()
 
 
 class ArrayValue(Value):
     _attrs_ = ['length', 'array']
+    __slots__ = _attrs_
     _immutable_fields_ = ['length', 'array']
 
     def __init__(self, length=0, initial_value=None):
@@ -244,6 +397,9 @@ class ArrayValue(Value):
         self.length = length
         assert (isinstance(initial_value, Value) or initial_value is None)
         self.array = [initial_value] * length
+        if memory_statistics.enabled:
+            memory_statistics.array_values += 1
+            memory_statistics.array_elements += length
 
     def to_string(self):
         return '%s(length=%d, array=%s)' % (self.__class__.__name__, self.length, list_to_string(self.array))
@@ -255,6 +411,7 @@ class ArrayValue(Value):
 
 class RecordValue(Value):
     _attrs_ = ['type', 'values']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type', 'values']
 
     def __init__(self, record_type, values=None):
@@ -263,6 +420,8 @@ class RecordValue(Value):
         self.type = record_type
         assert (isinstance(values, list))
         self.values = values
+        if memory_statistics.enabled:
+            memory_statistics.record_values += 1
 
     def to_string(self):
         return '%s(type=%s, values=%s)' % (self.__class__.__name__, self.type.to_string(), list_to_string(self.values))
@@ -277,6 +436,7 @@ class RecordValue(Value):
 
 class LValue(Bound):
     _attrs_ = ['name', 'next']
+    __slots__ = _attrs_
     _immutable_fields_ = ['name', 'next']
 
     def __init__(self, name, next_lvalue=None, declaration=None):
@@ -284,6 +444,15 @@ class LValue(Bound):
         self.name = name
         self.next = next_lvalue
 
+    def children(self):
+        return [self.next] if self.next is not None else []
+
+    def set_children(self, children):
+        if self.next is not None:
+            next_lvalue = children[0]
+            assert isinstance(next_lvalue, LValue)
+            self.next = next_lvalue
+
     def to_string(self):
         return '%s(name=%s, next=%s, declaration=%s)' % (
             self.__class__.__name__, self.name, nullable_to_string(self.next), nullable_to_string(self.declaration))
@@ -337,29 +506,42 @@ class LValue(Bound):
 
 class RecordLValue(LValue):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
     pass
 
 
 class ArrayLValue(LValue):
-    _attrs_ = ['name', 'next', 'expression']
+    _attrs_ = ['expression']
+    __slots__ = _attrs_
     _immutable_fields_ = ['expression']
 
     def __init__(self, expression, next_lvalue=None):
         LValue.__init__(self, None, next_lvalue)
         self.expression = expression
 
+    def children(self):
+        return [self.expression, self.next] if self.next is not None else [self.expression]
+
+    def set_children(self, children):
+        self.expression = children[0]
+        if self.next is not None:
+            next_lvalue = children[1]
+            assert isinstance(next_lvalue, LValue)
+            self.next = next_lvalue
+
     def to_string(self):
         return '%s(exp=%s, next=%s)' % (
             self.__class__.__name__, self.expression.to_string(), nullable_to_string(self.next))
 
     def equals(self, other):
-        return isinstance(other, ArrayLValue) and self.expression.equals(other.expression) \
+        return isinstance(other, ArrayLValue) and object_equals(self.expression, other.expression) \
                and nullable_equals(self.next, other.next)
 
 
 class ArrayCreation(Exp):
     _attrs_ = ['length_expression', 'initial_value_expression', 'type_id']
+    __slots__ = _attrs_
     _immutable_fields_ = ['length_expression', 'initial_value_expression', 'type_id']
 
     def __init__(self, type_id, length_expression, initial_value_expression):
@@ -371,15 +553,23 @@ class ArrayCreation(Exp):
         assert (isinstance(type_id, TypeId))
         self.type_id = type_id
 
+    def children(self):
+        return [self.length_expression, self.initial_value_expression]
+
+    def set_children(self, children):
+        self.length_expression = children[0]
+        self.initial_value_expression = children[1]
+
     def to_string(self):
         return '%s(initial_value=%s, length=%s, type=%s)' % (
             self.__class__.__name__, self.initial_value_expression.to_string(), self.length_expression.to_string(),
             self.type_id.to_string())
 
     def equals(self, other):
-        return isinstance(other, ArrayCreation) and self.initial_value_expression.equals(
-            other.initial_value_expression) and self.length_expression.equals(
-            other.length_expression) and self.type_id.equals(other.type_id)
+        return isinstance(other, ArrayCreation) \
+               and object_equals(self.initial_value_expression, other.initial_value_expression) \
+               and object_equals(self.length_expression, other.length_expression) \
+               and object_equals(self.type_id, other.type_id)
 
     @unroll_safe
     def evaluate(self, env):
@@ -394,6 +584,7 @@ class ArrayCreation(Exp):
 
 class RecordCreation(Exp):
     _attrs_ = ['type_id', 'fields']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type_id', 'fields']
 
     def __init__(self, type_id, fields):
@@ -403,12 +594,27 @@ class RecordCreation(Exp):
         # assert (isinstance(fields, dict))
         self.fields = fields
 
+    def children(self):
+        children = [self.type_id]
+        for name in self.fields.keys():
+            children.append(self.fields[name])
+        return children
+
+    def set_children(self, children):
+        type_id = children[0]
+        assert isinstance(type_id, TypeId)
+        self.type_id = type_id
+        i = 1
+        for name in self.fields.keys():
+            self.fields[name] = children[i]
+            i += 1
+
     def to_string(self):
         return '%s(type=%s, fields=%s)' % (
             self.__class__.__name__, self.type_id.to_string(), dict_to_string(self.fields))
 
     def equals(self, other):
-        return isinstance(other, RecordCreation) and self.type_id.equals(other.type_id) \
+        return isinstance(other, RecordCreation) and object_equals(self.type_id, other.type_id) \
                and dict_equals(self.fields, other.fields)
 
     @unroll_safe
@@ -432,6 +638,7 @@ class RecordCreation(Exp):
 
 class Assign(Exp):
     _attrs_ = ['lvalue', 'expression']
+    __slots__ = _attrs_
     _immutable_fields_ = ['lvalue', 'expression']
 
     def __init__(self, lvalue, expression):
@@ -440,13 +647,22 @@ class Assign(Exp):
         self.lvalue = lvalue
         self.expression = expression
 
+    def children(self):
+        return [self.lvalue, self.expression]
+
+    def set_children(self, children):
+        lvalue = children[0]
+        assert isinstance(lvalue, LValue)
+        self.lvalue = lvalue
+        self.expression = children[1]
+
     def to_string(self):
         return '%s(lvalue=%s, expression=%s)' % (
             self.__class__.__name__, self.lvalue.to_string(), self.expression.to_string())
 
     def equals(self, other):
-        return isinstance(other, Assign) and self.lvalue.equals(other.lvalue) and self.expression.equals(
-            other.expression)
+        return isinstance(other, Assign) and object_equals(self.lvalue, other.lvalue) \
+               and object_equals(self.expression, other.expression)
 
     @unroll_safe
     def evaluate(self, env):
@@ -496,12 +712,20 @@ class Assign(Exp):
 
 class Sequence(Exp):
     _attrs_ = ['expressions']
+    __slots__ = _attrs_
     _immutable_fields_ = ['expressions']
 
     def __init__(self, expressions):
         Exp.__init__(self)
         self.expressions = expressions
 
+    def children(self):
+        return [expression for expression in self.expressions]
+
+    def set_children(self, children):
+        for i in range(len(self.expressions)):
+            self.expressions[i] = children[i]
+
     def to_string(self):
         return '%s(expressions=%s)' % (self.__class__.__name__, list_to_string(self.expressions))
 
@@ -519,6 +743,7 @@ class Sequence(Exp):
 
 class Let(Exp):
     _attrs_ = ['declarations', 'expressions', 'environment']
+    __slots__ = _attrs_
     _immutable_fields_ = ['declarations', 'expressions']  # note that the environment is not declared immutable
 
     def __init__(self, declarations, expressions):
@@ -527,6 +752,18 @@ class Let(Exp):
         self.expressions = expressions  # the body of the let-binding; a sequence of expressions
         self.environment = Environment.empty(None, len(declarations))
 
+    def children(self):
+        return self.declarations + self.expressions
+
+    def set_children(self, children):
+        for i in range(len(self.declarations)):
+            declaration = children[i]
+            assert isinstance(declaration, Declaration)
+            self.declarations[i] = declaration
+        offset = len(self.declarations)
+        for i in range(len(self.expressions)):
+            self.expressions[i] = children[offset + i]
+
     def to_string(self):
         return '%s(declarations=%s, expressions=%s)' % (
             self.__class__.__name__, list_to_string(self.declarations), list_to_string(self.expressions))
@@ -540,6 +777,8 @@ class Let(Exp):
     def evaluate(self, env):
         promote(self)
         self.environment = self.environment.push(len(self.declarations))
+        if memory_statistics.enabled:
+            memory_statistics.environment_levels += 1
 
         for declaration in self.declarations:
             assert isinstance(declaration, Declaration)
@@ -557,8 +796,15 @@ class Let(Exp):
 # EXPRESSIONS: CONTROL FLOW
 
 
+def evaluate_function_body(code, env):
+    """The portal of function_jitdriver: evaluate the body of a Tiger function in its activation environment"""
+    function_jitdriver.jit_merge_point(code=code, env=env)
+    return code.evaluate(env)
+
+
 class FunctionCall(Bound):
     _attrs_ = ['name', 'arguments']
+    __slots__ = _attrs_
     _immutable_fields_ = ['name', 'arguments']
 
     def __init__(self, name, arguments, declaration=None):
@@ -567,6 +813,13 @@ class FunctionCall(Bound):
         assert (isinstance(arguments, list))
         self.arguments = arguments
 
+    def children(self):
+        return [argument for argument in self.arguments]
+
+    def set_children(self, children):
+        for i in range(len(self.arguments)):
+            self.arguments[i] = children[i]
+
     def to_string(self):
         return '%s(name=%s, args=%s)' % (
             self.__class__.__name__, self.name, list_to_string(self.arguments))
@@ -577,7 +830,6 @@ class FunctionCall(Bound):
 
     @unroll_safe
     def evaluate(self, env):
-        function_jitdriver.jit_merge_point(code=self)
         promote(self)
 
         # find declaration
@@ -595,15 +847,28 @@ class FunctionCall(Bound):
         result = None  # set by function return
         if isinstance(declaration, FunctionDeclaration):
             activation_environment = declaration.environment.push(len(declaration.parameters))
+            if memory_statistics.enabled:
+                memory_statistics.environment_levels += 1
             # evaluate arguments
             for i in range(len(self.arguments)):
                 value = self.arguments[i].evaluate(declaration.environment)
                 assert (isinstance(value, Value))
                 activation_environment.set(i, value)
-            # call function
-            declaration.environment = activation_environment
-            result = declaration.body.evaluate(activation_environment)
-            declaration.environment = declaration.environment.pop()
+            memoization = declaration.memoization
+            if memoization is not None:
+                # pure functions may return a cached result, see memoization.py
+                key = memoization.key(activation_environment, len(self.arguments))
+                result = memoization.get(key)
+                if result is None:
+                    declaration.environment = activation_environment
+                    result = evaluate_function_body(declaration.body, activation_environment)
+                    declaration.environment = declaration.environment.pop()
+                    memoization.put(key, result)
+            else:
+                # call function
+                declaration.environment = activation_environment
+                result = evaluate_function_body(declaration.body, activation_environment)
+                declaration.environment = declaration.environment.pop()
         elif isinstance(declaration, NativeFunctionDeclaration):
             # evaluate arguments (no need for an activation environment)
             values = []
@@ -627,6 +892,7 @@ class FunctionCall(Bound):
 
 class If(Exp):
     _attrs_ = ['condition', 'body_if_true', 'body_if_false']
+    __slots__ = _attrs_
     _immutable_fields_ = ['condition', 'body_if_true', 'body_if_false']
 
     def __init__(self, condition, body_if_true, body_if_false=None):
@@ -635,14 +901,25 @@ class If(Exp):
         self.body_if_true = body_if_true
         self.body_if_false = body_if_false
 
+    def children(self):
+        if self.body_if_false is None:
+            return [self.condition, self.body_if_true]
+        return [self.condition, self.body_if_true, self.body_if_false]
+
+    def set_children(self, children):
+        self.condition = children[0]
+        self.body_if_true = children[1]
+        if self.body_if_false is not None:
+            self.body_if_false = children[2]
+
     def to_string(self):
         return '%s(condition=%s, body_if_true=%s, body_if_false=%s)' % (
             self.__class__.__name__, self.condition.to_string(), self.body_if_true.to_string(),
             nullable_to_string(self.body_if_false))
 
     def equals(self, other):
-        return isinstance(other, If) and self.condition.equals(other.condition) \
-               and self.body_if_true.equals(other.body_if_true) \
+        return isinstance(other, If) and object_equals(self.condition, other.condition) \
+               and object_equals(self.body_if_true, other.body_if_true) \
                and nullable_equals(self.body_if_false, other.body_if_false)
 
     @unroll_safe
@@ -660,6 +937,7 @@ class If(Exp):
 
 class While(Exp):
     _attrs_ = ['condition', 'body']
+    __slots__ = _attrs_
     _immutable_fields_ = ['condition', 'body']
 
     def __init__(self, condition, body):
@@ -667,13 +945,20 @@ class While(Exp):
         self.condition = condition
         self.body = body
 
+    def children(self):
+        return [self.condition, self.body]
+
+    def set_children(self, children):
+        self.condition = children[0]
+        self.body = children[1]
+
     def to_string(self):
         return '%s(condition=%s, body=%s)' % (
             self.__class__.__name__, self.condition.to_string(), self.body.to_string())
 
     def equals(self, other):
-        return isinstance(other, While) and self.condition.equals(other.condition) and self.body.equals(
-            other.body)
+        return isinstance(other, While) and object_equals(self.condition, other.condition) \
+               and object_equals(self.body, other.body)
 
     def evaluate(self, env):
         promote(self)
@@ -681,8 +966,12 @@ class While(Exp):
         assert isinstance(condition_value, IntegerValue)
 
         result = None
-        while condition_value.integer != 0:
+        while True:
+            # the merge point is the loop head and nothing runs between can_enter_jit and it, so compiled code entered
+            # from the back-edge resumes at the exit test
             while_jitdriver.jit_merge_point(code=self, env=env, result=result, value=condition_value)
+            if condition_value.integer == 0:
+                break
             # attempted 'env = promote(env)' here but this let to incorrect number of inner loops in sumprimes
             try:
                 result = self.body.evaluate(env)
@@ -691,42 +980,74 @@ class While(Exp):
 
             condition_value = self.condition.evaluate(env)
             assert isinstance(condition_value, IntegerValue)
+            while_jitdriver.can_enter_jit(code=self, env=env, result=result, value=condition_value)
 
         return result
 
 
 class For(Exp):
-    _attrs_ = ['var', 'start', 'end', 'body', 'while_expression']
-    _immutable_fields_ = ['var', 'start', 'end', 'body', 'while_expression']
+    """
+    Only the while-loop that a for-loop is converted to is kept; the start, end and body expressions are retrieved from
+    it (see get_start(), get_end() and get_body()) rather than stored twice
+    """
+    _attrs_ = ['var', 'while_expression']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['var', 'while_expression']
 
     def __init__(self, var, start, end, body):
         Exp.__init__(self)
         self.var = var
-        self.start = start
-        self.end = end
-        self.body = body
 
         # transform this for-loop to a while-loop in order to use the merge point in the while-loop
-        self.while_expression = self.convert_to_while()
+        self.while_expression = For.convert_to_while(var, start, end, body)
+
+    def get_start(self):
+        declaration = self.while_expression.declarations[0]
+        assert isinstance(declaration, VariableDeclaration)
+        return declaration.expression
+
+    def get_end(self):
+        loop = self.while_expression.expressions[0]
+        assert isinstance(loop, While)
+        condition = loop.condition
+        assert isinstance(condition, LessThanOrEquals)
+        return condition.right
+
+    def get_body(self):
+        loop = self.while_expression.expressions[0]
+        assert isinstance(loop, While)
+        sequence = loop.body
+        assert isinstance(sequence, Sequence)
+        return sequence.expressions[0]
+
+    def children(self):
+        return [self.while_expression]  # the start, end and body are found in the while-loop
+
+    def set_children(self, children):
+        self.while_expression = children[0]
 
     def to_string(self):
         return '%s(var=%s, start=%s, end=%s, body=%s)' % (
-            self.__class__.__name__, self.var, self.start.to_string(), self.end.to_string(), self.body.to_string())
+            self.__class__.__name__, self.var, self.get_start().to_string(), self.get_end().to_string(),
+            self.get_body().to_string())
 
     def equals(self, other):
-        return isinstance(other, For) and self.var == other.var and self.start.equals(
-            other.start) and self.end.equals(other.end) and self.body.equals(other.body)
+        return isinstance(other, For) and self.var == other.var \
+               and object_equals(self.get_start(), other.get_start()) \
+               and object_equals(self.get_end(), other.get_end()) \
+               and object_equals(self.get_body(), other.get_body())
 
-    def convert_to_while(self):
+    @staticmethod
+    def convert_to_while(var, start, end, body):
         # var iterator := start
-        return Let([VariableDeclaration(self.var, None, self.start)], [
+        return Let([VariableDeclaration(var, None, start)], [
             # while iterator <= end:
             While(
-                LessThanOrEquals(LValue(self.var), self.end),
+                LessThanOrEquals(LValue(var), end),
                 # do body; iterator = iterator + 1
                 Sequence([
-                    self.body,
-                    Assign(LValue(self.var), Add(LValue(self.var), IntegerValue(1)))
+                    body,
+                    Assign(LValue(var), Add(LValue(var), IntegerValue(1)))
                 ])
             )
         ])
@@ -740,6 +1061,7 @@ class For(Exp):
 
 class Break(Exp):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self):
@@ -760,6 +1082,7 @@ class BreakException(Exception):
 
 class BinaryOperation(Exp):
     _attrs_ = ['left', 'right']
+    __slots__ = _attrs_
     _immutable_fields_ = ['left', 'right']
 
     def __init__(self, left, right):
@@ -771,7 +1094,15 @@ class BinaryOperation(Exp):
         # we should not be comparing (or really constructing) BinaryOperators but the following makes the parsing tests
         # work in Python-land; for RPython we overwrite this method for all descendants in the FIX-UP section at the
         # bottom of this file
-        return isinstance(other, BinaryOperation) and self.left.equals(other.left) and self.right.equals(other.right)
+        return isinstance(other, BinaryOperation) and object_equals(self.left, other.left) \
+               and object_equals(self.right, other.right)
+
+    def children(self):
+        return [self.left, self.right]
+
+    def set_children(self, children):
+        self.left = children[0]
+        self.right = children[1]
 
     def to_string(self):
         return '%s(left=%s, right=%s)' % (self.__class__.__name__, self.left.to_string(), self.right.to_string())
@@ -798,6 +1129,9 @@ class BinaryOperation(Exp):
 
 
 class Multiply(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -806,6 +1140,9 @@ class Multiply(BinaryOperation):
 
 
 class Divide(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -814,6 +1151,9 @@ class Divide(BinaryOperation):
 
 
 class Add(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -822,6 +1162,9 @@ class Add(BinaryOperation):
 
 
 class Subtract(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -830,6 +1173,9 @@ class Subtract(BinaryOperation):
 
 
 class GreaterThanOrEquals(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -838,6 +1184,9 @@ class GreaterThanOrEquals(BinaryOperation):
 
 
 class LessThanOrEquals(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -846,6 +1195,9 @@ class LessThanOrEquals(BinaryOperation):
 
 
 class Equals(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         (left, right) = self.evaluate_sides_to_value(env)
@@ -853,6 +1205,9 @@ class Equals(BinaryOperation):
 
 
 class NotEquals(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -861,6 +1216,9 @@ class NotEquals(BinaryOperation):
 
 
 class GreaterThan(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
 
     def evaluate(self, env):
         promote(self)
@@ -869,6 +1227,9 @@ class GreaterThan(BinaryOperation):
 
 
 class LessThan(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -877,6 +1238,9 @@ class LessThan(BinaryOperation):
 
 
 class And(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -885,6 +1249,9 @@ class And(BinaryOperation):
 
 
 class Or(BinaryOperation):
+    _attrs_ = []
+    __slots__ = _attrs_
+
     @unroll_safe
     def evaluate(self, env):
         promote(self)
@@ -897,6 +1264,7 @@ class Or(BinaryOperation):
 
 class TypeId(Bound):
     _attrs_ = ['name']
+    __slots__ = _attrs_
     _immutable_fields_ = ['name']
 
     def __init__(self, name, declaration=None):
@@ -920,17 +1288,24 @@ class TypeId(Bound):
 
 class TypeDeclaration(Declaration):
     _attrs_ = ['type']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type']
 
     def __init__(self, name, type_id_or_struct, parent=None, index=0):
         Declaration.__init__(self, name, parent, index)
         self.type = type_id_or_struct  # note that type here can be either a Type (record, array) or a TypeId
 
+    def children(self):
+        return [self.type]
+
+    def set_children(self, children):
+        self.type = children[0]
+
     def to_string(self):
         return '%s(name=%s, type=%s)' % (self.__class__.__name__, self.name, self.type.to_string())
 
     def equals(self, other):
-        return isinstance(other, TypeDeclaration) and self.name == other.name and self.type.equals(other.type)
+        return isinstance(other, TypeDeclaration) and self.name == other.name and object_equals(self.type, other.type)
 
     @unroll_safe
     def evaluate(self, env):
@@ -940,6 +1315,7 @@ class TypeDeclaration(Declaration):
 
 class VariableDeclaration(Declaration):
     _attrs_ = ['type', 'expression']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type', 'expression']
 
     def __init__(self, name, type_id, expression, parent=None, index=0):
@@ -948,13 +1324,23 @@ class VariableDeclaration(Declaration):
         self.type = type_id
         self.expression = expression
 
+    def children(self):
+        return [self.type, self.expression] if self.type is not None else [self.expression]
+
+    def set_children(self, children):
+        if self.type is not None:
+            type_id = children[0]
+            assert isinstance(type_id, TypeId)
+            self.type = type_id
+        self.expression = children[-1]
+
     def to_string(self):
         return '%s(name=%s, type=%s, expression=%s)' % (
             self.__class__.__name__, self.name, nullable_to_string(self.type), self.expression.to_string())
 
     def equals(self, other):
         return isinstance(other, VariableDeclaration) and self.name == other.name \
-               and nullable_equals(self.type, other.type) and self.expression.equals(other.expression)
+               and nullable_equals(self.type, other.type) and object_equals(self.expression, other.expression)
 
     @unroll_safe
     def evaluate(self, env):
@@ -966,6 +1352,7 @@ class VariableDeclaration(Declaration):
 
 class FunctionParameter(Declaration):
     _attrs_ = ['type']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type']
 
     def __init__(self, name, type_id=None, parent=None, index=0):
@@ -983,6 +1370,7 @@ class FunctionParameter(Declaration):
 
 class FunctionDeclarationBase(Declaration):
     _attrs_ = ['parameters', 'return_type']
+    __slots__ = _attrs_
     _immutable_fields_ = ['parameters', 'return_type']
 
     def __init__(self, name, parameters, return_type, parent=None, index=0):
@@ -994,8 +1382,9 @@ class FunctionDeclarationBase(Declaration):
 
 
 class FunctionDeclaration(FunctionDeclarationBase):
-    _attrs_ = ['body', 'environment']
-    _immutable_fields_ = ['body']
+    _attrs_ = ['body', 'environment', 'memoization']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['body', 'memoization?']
 
     def __init__(self, name, parameters, return_type, body, environment=None, parent=None, index=0):
         FunctionDeclarationBase.__init__(self, name, parameters, return_type, parent, index)
@@ -1003,6 +1392,21 @@ class FunctionDeclaration(FunctionDeclarationBase):
         self.body = body
         self.environment = environment or Environment.empty(None, len(
             self.parameters))  # to be reset when the function declaration is evaluated
+        self.memoization = None  # set by memoization.py for functions proven pure
+
+    def children(self):
+        children = [parameter for parameter in self.parameters]
+        children.append(self.body)
+        return children
+
+    def set_children(self, children):
+        for i in range(len(self.parameters)):
+            parameter = children[i]
+            assert isinstance(parameter, FunctionParameter)
+            self.parameters[i] = parameter
+        body = children[-1]
+        assert isinstance(body, Exp)
+        self.body = body
 
     def to_string(self):
         return '%s(name=%s, parameters=%s, return_type=%s, body=%s)' % (
@@ -1013,7 +1417,7 @@ class FunctionDeclaration(FunctionDeclarationBase):
         return isinstance(other, FunctionDeclaration) and self.name == other.name \
                and list_equals(self.parameters, other.parameters) \
                and nullable_equals(self.return_type, other.return_type) \
-               and self.body.equals(other.body)
+               and object_equals(self.body, other.body)
 
     @unroll_safe
     def evaluate(self, env):
@@ -1023,6 +1427,7 @@ class FunctionDeclaration(FunctionDeclarationBase):
 
 class NativeFunctionDeclaration(FunctionDeclarationBase):
     _attrs_ = []
+    __slots__ = _attrs_
     _immutable_fields_ = []
 
     def __init__(self, name, parameters=None, return_type=None):
@@ -1043,6 +1448,7 @@ class NativeFunctionDeclaration(FunctionDeclarationBase):
 
 class NativeNoArgumentFunctionDeclaration(NativeFunctionDeclaration):
     _attrs_ = ['function']
+    __slots__ = _attrs_
     _immutable_fields_ = ['function']
 
     def __init__(self, name, return_type, python_function):
@@ -1057,6 +1463,7 @@ class NativeNoArgumentFunctionDeclaration(NativeFunctionDeclaration):
 
 class NativeOneArgumentFunctionDeclaration(NativeFunctionDeclaration):
     _attrs_ = ['function']
+    __slots__ = _attrs_
     _immutable_fields_ = ['function']
 
     def __init__(self, name, parameters, return_type, python_function):
@@ -1071,6 +1478,7 @@ class NativeOneArgumentFunctionDeclaration(NativeFunctionDeclaration):
 
 class NativeTwoArgumentFunctionDeclaration(NativeFunctionDeclaration):
     _attrs_ = ['function']
+    __slots__ = _attrs_
     _immutable_fields_ = ['function']
 
     def __init__(self, name, parameters, return_type, python_function):
@@ -1083,11 +1491,42 @@ class NativeTwoArgumentFunctionDeclaration(NativeFunctionDeclaration):
         return self.function(arguments[0], arguments[1])
 
 
+class NativeThreeArgumentFunctionDeclaration(NativeFunctionDeclaration):
+    _attrs_ = ['function']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['function']
+
+    def __init__(self, name, parameters, return_type, python_function):
+        NativeFunctionDeclaration.__init__(self, name, parameters, return_type)
+        self.function = python_function  # remember that RPython will not accept a lambda
+
+    def call(self, arguments):
+        promote(self)
+        assert len(arguments) == 3
+        return self.function(arguments[0], arguments[1], arguments[2])
+
+
+class NativeFiveArgumentFunctionDeclaration(NativeFunctionDeclaration):
+    _attrs_ = ['function']
+    __slots__ = _attrs_
+    _immutable_fields_ = ['function']
+
+    def __init__(self, name, parameters, return_type, python_function):
+        NativeFunctionDeclaration.__init__(self, name, parameters, return_type)
+        self.function = python_function  # remember that RPython will not accept a lambda
+
+    def call(self, arguments):
+        promote(self)
+        assert len(arguments) == 5
+        return self.function(arguments[0], arguments[1], arguments[2], arguments[3], arguments[4])
+
+
 # TYPES
 
 
 class ArrayType(Type):
     _attrs_ = ['type_name']
+    __slots__ = _attrs_
     _immutable_fields_ = ['type_name']
 
     def __init__(self, element_type):
@@ -1103,6 +1542,7 @@ class ArrayType(Type):
 
 class RecordType(Type):
     _attrs_ = ['field_types', 'field_positions']
+    __slots__ = _attrs_
     _immutable_fields_ = ['field_types', 'field_positions']
 
     def __init__(self, field_types):
@@ -1133,3 +1573,17 @@ class RecordType(Type):
 # right to be accessible
 for _, cls in list_classes_in_file(BinaryOperation):
     add_binary_operation_equals(cls)
+
+
+def list_ast_classes():
+    """:return: the classes of AST nodes, i.e. Program and its subclasses in this file"""
+    classes = []
+    for value in globals().values():
+        if isinstance(value, type) and issubclass(value, Program):
+            classes.append(value)
+    return classes
+
+
+# add the accept() and accept_exit() methods of the visitors of src/visitor.py to all AST nodes
+for cls in list_ast_classes():
+    add_accept_methods(cls)
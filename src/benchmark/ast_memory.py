@@ -0,0 +1,89 @@
+import argparse
+import gc
+import logging
+import sys
+import types
+from collections import OrderedDict
+
+from src.ast import Program
+from src.benchmark.extract import collect_files
+from src.benchmark.micro import SYNTHETIC_PROGRAMS, read
+from src.hash_consing import HashConsingFactory
+from src.parser import Parser
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Measure the memory the CPython-hosted interpreter uses to represent parsed ASTs: every object reachable from the root
+node (nodes, their attribute dictionaries or slots, lists, dictionaries, strings, integers and the empty environments of
+Let and FunctionDeclaration nodes) is counted once, so nodes shared between parents (e.g. interned literals) cost
+nothing extra
+"""
+DEFAULT_SUITE = 'src/benchmark/suite-single'
+
+# code and classes are shared by all programs so they are not part of an AST's memory
+NOT_COUNTED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+if hasattr(types, 'ClassType'):
+    NOT_COUNTED += (types.ClassType,)
+
+
+def measure(root):
+    """
+    :return: a tuple of the bytes reachable from the root and the number of distinct AST nodes among them
+    """
+    seen = set()
+    stack = [root]
+    size = 0
+    nodes = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, NOT_COUNTED):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, Program):
+            nodes += 1
+        stack.extend(gc.get_referents(obj))
+    return size, nodes
+
+
+def measure_program(text, hash_consing=False):
+    program = HashConsingFactory().parse(text) if hash_consing else Parser(text).parse()
+    size, nodes = measure(program)
+    kilobytes = len(text) / 1024.0
+    result = OrderedDict()
+    result['source_bytes'] = len(text)
+    result['ast_bytes'] = size
+    result['ast_nodes'] = nodes
+    result['bytes_per_source_kb'] = size / kilobytes
+    result['nodes_per_source_kb'] = nodes / kilobytes
+    result['bytes_per_node'] = float(size) / nodes
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the memory of parsed ASTs per KB of Tiger source')
+    parser.add_argument('suite', nargs='?', default=DEFAULT_SUITE,
+                        help='directory of .tig programs to parse; default: %s' % DEFAULT_SUITE)
+    parser.add_argument('-s', '--hash-consing', action='store_true',
+                        help='share structurally identical subtrees (see src/hash_consing.py)')
+    args = parser.parse_args()
+
+    programs = [(name, read(path)) for (name, path) in sorted(collect_files(args.suite, suffix='.tig'))]
+    programs.extend(SYNTHETIC_PROGRAMS.items())
+
+    print('program\tsource-bytes\tast-bytes\tnodes\tbytes/source-kb\tnodes/source-kb\tbytes/node')
+    total_source, total_ast = 0, 0
+    for name, text in programs:
+        result = measure_program(text, args.hash_consing)
+        total_source += result['source_bytes']
+        total_ast += result['ast_bytes']
+        print('%s\t%d\t%d\t%d\t%.0f\t%.1f\t%.1f' % (name, result['source_bytes'], result['ast_bytes'],
+                                                   result['ast_nodes'], result['bytes_per_source_kb'],
+                                                   result['nodes_per_source_kb'], result['bytes_per_node']))
+    print('total\t%d\t%d\t\t%.0f\t\t' % (total_source, total_ast, total_ast / (total_source / 1024.0)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import logging
+import pickle
+import sys
+from collections import OrderedDict
+
+from src.benchmark.extract import extract_benchmark_name
+from src.benchmark.measurement import BenchmarkMeasurement
+from src.benchmark.stats import mean, standard_deviation, welch_t_test
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_THRESHOLD = 0.05  # relative slowdown, i.e. 5%
+DEFAULT_SIGNIFICANCE = 0.05
+DEFAULT_PERF_REPEATS = 5  # see run_perf_on in perf.py; the pickles do not record how many times perf ran a command
+EXIT_CODE_REGRESSION = 1
+
+
+class Sample:
+    """The summary statistics of one benchmark's timings (in ticks, or milliseconds for perf measurements)"""
+
+    def __init__(self, mean, stdev, n):
+        self.mean = mean
+        self.stdev = stdev
+        self.n = n
+
+    @staticmethod
+    def of(values):
+        return Sample(mean(values), standard_deviation(values), len(values))
+
+    @staticmethod
+    def of_perf(measurements, repeats=DEFAULT_PERF_REPEATS):
+        """perf reports the mean task-clock and its relative standard deviation over its repeats"""
+        if isinstance(measurements, BenchmarkMeasurement):
+            time, relative_stdev = measurements.get_as_float('task-clock'), measurements.get_variance('task-clock')
+        else:
+            time = float(measurements['task-clock']['value'])
+            relative_stdev = float(measurements['task-clock']['variance'].replace('%', '')) / 100
+        return Sample(time, time * relative_stdev, repeats)
+
+
+def load_runner_results(data):
+    """Samples from the JSON written by src/benchmark/run.py (see FORMAT_VERSION there)"""
+    assert data.get('format_version') == 1, 'Unsupported results format: %s' % data.get('format_version')
+    samples = OrderedDict()
+    for interpreter, benchmarks in data['results'].items():
+        for name, result in benchmarks.items():
+            invocations = result['invocations']
+            if len(invocations) == 1:
+                invocation = invocations[0]
+                values = invocation['ticks'][invocation['warmup_iterations'] or 0:]
+            else:
+                values = [i['steady_state_mean_ticks'] for i in invocations if i['steady_state_mean_ticks'] is not None]
+            if values:
+                samples['%s %s' % (interpreter, name)] = Sample.of(values)
+    return samples
+
+
+def load_pickled_results(data, repeats=DEFAULT_PERF_REPEATS, prefix=''):
+    """
+    Samples from the pickles the benchmark scripts write to var/: lists of (command, perf measurements) tuples (e.g.
+    environment-comparison) or of BenchmarkMeasurement objects, possibly grouped in a dictionary (e.g. jit-vs-no-jit)
+    """
+    samples = OrderedDict()
+    if isinstance(data, dict):
+        for key, value in data.items():
+            samples.update(load_pickled_results(value, repeats, prefix + str(key) + ' '))
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, BenchmarkMeasurement):
+                samples[prefix + extract_benchmark_name(item.get_command())] = Sample.of_perf(item, repeats)
+            elif isinstance(item, tuple) and len(item) == 2:
+                command, measurements = item
+                samples[prefix + extract_benchmark_name(command)] = Sample.of_perf(measurements, repeats)
+            else:
+                raise ValueError('Unexpected pickled result: %s' % (item,))
+    elif isinstance(data, BenchmarkMeasurement):
+        samples[prefix.strip() or extract_benchmark_name(data.get_command())] = Sample.of_perf(data, repeats)
+    else:
+        raise ValueError('Unexpected pickled results: %s' % type(data))
+    return samples
+
+
+def load(path, repeats=DEFAULT_PERF_REPEATS):
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return load_runner_results(json.load(f))
+    with open(path, 'rb') as f:
+        return load_pickled_results(pickle.load(f), repeats)
+
+
+class Comparison:
+    def __init__(self, name, baseline, candidate, threshold, significance):
+        self.name = name
+        self.baseline = baseline
+        self.candidate = candidate
+        self.change = candidate.mean / baseline.mean - 1.0  # positive is slower
+        self.t, self.p = welch_t_test(baseline.mean, baseline.stdev, baseline.n,
+                                      candidate.mean, candidate.stdev, candidate.n)
+        significant = self.p < significance
+        self.regression = significant and self.change > threshold
+        self.improvement = significant and self.change < -threshold
+
+    def to_string(self):
+        verdict = 'REGRESSION' if self.regression else ('improvement' if self.improvement else 'ok')
+        return '%s\t%.2f\t%.2f\t%+.1f%%\t%.4f\t%s' % (self.name, self.baseline.mean, self.candidate.mean,
+                                                     self.change * 100, self.p, verdict)
+
+
+def compare(baseline, candidate, threshold=DEFAULT_THRESHOLD, significance=DEFAULT_SIGNIFICANCE):
+    """
+    Compare the benchmarks present in both result sets: a benchmark regresses if it is slower by more than the
+    threshold and the difference is significant according to Welch's t-test
+    :return: a list of Comparisons
+    """
+    comparisons = []
+    for name in baseline:
+        if name not in candidate:
+            logging.warning("Benchmark %s is missing from the candidate results", name)
+            continue
+        if baseline[name].n < 2 or candidate[name].n < 2:
+            logging.warning("Benchmark %s has too few samples to compare", name)
+            continue
+        comparisons.append(Comparison(name, baseline[name], candidate[name], threshold, significance))
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare candidate benchmark results against a baseline and exit '
+                                                 'with code %d if any benchmark regressed' % EXIT_CODE_REGRESSION)
+    parser.add_argument('baseline', help='results of src/benchmark/run.py (.json) or a pickle from var/ (.pkl)')
+    parser.add_argument('candidate', help='results in the same format as the baseline')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown to flag, e.g. 0.05 for 5%%')
+    parser.add_argument('-s', '--significance', type=float, default=DEFAULT_SIGNIFICANCE,
+                        help='p-value below which a difference is significant')
+    parser.add_argument('-r', '--perf-repeats', type=int, default=DEFAULT_PERF_REPEATS,
+                        help='number of perf repeats behind each pickled measurement')
+    args = parser.parse_args()
+
+    comparisons = compare(load(args.baseline, args.perf_repeats), load(args.candidate, args.perf_repeats),
+                          args.threshold, args.significance)
+    print('benchmark\tbaseline\tcandidate\tchange\tp-value\tverdict')
+    for comparison in comparisons:
+        print(comparison.to_string())
+
+    regressions = [c.name for c in comparisons if c.regression]
+    if regressions:
+        logging.error("%d benchmark(s) regressed by more than %.1f%%: %s", len(regressions), args.threshold * 100,
+                      ', '.join(regressions))
+        sys.exit(EXIT_CODE_REGRESSION)
+    logging.info("No regressions in %d benchmark(s)", len(comparisons))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,8 +15,8 @@ from src.benchmark.extract import extract_benchmark_name, extract_execution_time
 logging.basicConfig(level=logging.INFO)
 
 
-# the charting is done separately from benchmark.py because we must gather benchmarks from different code branches in
-# var/environment-comparison-*.pkl before charting them (some amount of manual work needed)
+# the charting is done separately from benchmark.py, which saves the results of each environment implementation to
+# var/environment-comparison-*.pkl (benchmark-branches.sh can add results from the older environment branches)
 
 def extract_environment_name(path):
     return basename(path).replace('.pkl', '').replace('environment-comparison-', '')
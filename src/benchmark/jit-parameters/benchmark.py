@@ -0,0 +1,93 @@
+import logging
+import pickle
+from collections import OrderedDict
+
+from src.benchmark.perf import analyze_all
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+BENCHMARKS = ['permute', 'queens', 'sieve', 'sumprimes', 'towers']
+PATH_TO_INTERPRETER = 'bin/tiger-interpreter'
+PATH_TO_BENCHMARKS = 'src/benchmark/suite-looped'
+PATH_TO_PICKLED_DATA = 'var/jit-parameters.pkl'
+PATH_TO_TABLE = 'var/jit-parameters.txt'
+
+# the values to try for each parameter; the first value of each is RPython's default (see PARAMETERS in
+# rpython/rlib/jit.py)
+PARAMETERS = OrderedDict([
+    ('threshold', [1039, 100, 250, 500, 2000, 4000]),
+    ('function_threshold', [1619, 100, 400, 800, 3200, 6400]),
+    ('trace_eagerness', [200, 50, 100, 400, 800]),
+    ('trace_limit', [6000, 3000, 12000, 24000, 48000]),
+    ('inlining', [1, 0]),
+    ('loop_longevity', [1000, 250, 4000, 16000]),
+])
+
+
+def to_jit_option(settings):
+    return ','.join(['%s=%d' % (name, value) for (name, value) in settings.items()])
+
+
+def measure(benchmark, all_settings):
+    """
+    Run a benchmark with each of the given JIT settings ($JOBS at a time) and return the (task-clock) times in
+    milliseconds
+    """
+    program = '%s/%s.tig' % (PATH_TO_BENCHMARKS, benchmark)
+    commands = ['%s --jit %s %s' % (PATH_TO_INTERPRETER, to_jit_option(settings), program) for settings in all_settings]
+    times = []
+    for measurements in analyze_all(commands, True):
+        measurements.assert_no_os_interference()
+        times.append(measurements.get_as_float('task-clock'))
+    return times
+
+
+def sweep(benchmark):
+    """
+    Search one parameter at a time (the full grid is too large to run): starting from the defaults, try each value of a
+    parameter while keeping the others at their best values so far and keep the fastest
+    :return: a tuple of the default time, the best time and the best settings
+    """
+    best = OrderedDict([(name, values[0]) for (name, values) in PARAMETERS.items()])
+    default_time = best_time = measure(benchmark, [best])[0]
+    results = [(to_jit_option(best), default_time)]
+    for name, values in PARAMETERS.items():
+        all_settings = []
+        for value in values[1:]:
+            settings = OrderedDict(best)
+            settings[name] = value
+            all_settings.append(settings)
+        for settings, time in zip(all_settings, measure(benchmark, all_settings)):
+            value = settings[name]
+            results.append((to_jit_option(settings), time))
+            if time < best_time:
+                logging.info("Improved %s benchmark from %sms to %sms with %s=%d", benchmark, best_time, time, name,
+                             value)
+                best_time = time
+                best = settings
+    return default_time, best_time, best, results
+
+
+# gather data
+data = OrderedDict()
+for benchmark in BENCHMARKS:
+    data[benchmark] = sweep(benchmark)
+
+# save data
+logging.info("Saving data to: %s", PATH_TO_PICKLED_DATA)
+pickled_data_file = open(PATH_TO_PICKLED_DATA, 'wb')
+pickle.dump(data, pickled_data_file)
+pickled_data_file.close()
+
+# write table of best settings
+lines = ['benchmark\tdefault-ms\tbest-ms\tspeedup\tbest-settings']
+for benchmark, (default_time, best_time, best, _) in data.items():
+    lines.append('%s\t%.2f\t%.2f\t%.3f\t%s' % (benchmark, default_time, best_time, default_time / best_time,
+                                              to_jit_option(best)))
+table = '\n'.join(lines) + '\n'
+logging.info("Best JIT settings per benchmark:\n%s", table)
+logging.info("Saving table to: %s", PATH_TO_TABLE)
+table_file = open(PATH_TO_TABLE, 'w')
+table_file.write(table)
+table_file.close()
@@ -3,7 +3,8 @@ import pickle
 from collections import OrderedDict
 
 from src.benchmark.measurement import BenchmarkMeasurement
-from src.benchmark.perf import analyze, run_perf_on, parse_perf_output
+from src.benchmark.perf import analyze_all, run_perf_on, parse_perf_output
+from src.benchmark.pool import PinnedPool
 
 # setup logging
 logging.basicConfig(level=logging.INFO)
@@ -13,15 +14,51 @@ PATH_TO_BIN = 'bin'
 PATH_TO_BENCHMARKS = 'src/benchmark/suite-looped'
 PATH_TO_PICKLED_DATA = 'var/jit-vs-no-jit-vs-c.pkl'
 
+
+def measure_rpython(task, prefix):
+    """Run one self-timing benchmark in the given interpreter and average the cycles of its last five iterations"""
+    interpreter, benchmark = task
+    program = '%s/%s.tig' % (PATH_TO_BENCHMARKS, benchmark)
+    stdout, stderr = run_perf_on(interpreter, program, env={'DEBUG': '1'}, iterate=1, prefix=prefix)
+
+    program_results = [int(s) for s in stdout.split("\n") if s]
+    assert not program_results or all(x == program_results[0] for x in program_results), \
+        'Expected all results to be the same %s, %s' % (program_results[0], program_results)
+
+    cycles = [int(s.replace('ticks=', '')) for s in stderr.split("\n") if s.startswith('ticks=')]
+    logging.debug("Raw loop times for %s benchmark: %s", benchmark, cycles)
+
+    parsed = parse_perf_output('\n'.join([s for s in stderr.split("\n") if not s.startswith('ticks=')]))
+    measurements = BenchmarkMeasurement(interpreter + ' ' + program, parsed)
+    logging.info("Total time for %s benchmark: %sms (%s total perf cycles ?= %s summed iteration cycles)",
+                 benchmark,
+                 measurements.get_as_float('task-clock'), measurements.get_as_int('cycles'), sum(cycles))
+    measurements.assert_no_os_interference()
+
+    last_five_iterations = cycles[-5:]
+    logging.debug("Raw loop times for the last five iterations of %s benchmark: %s", benchmark,
+                  last_five_iterations)
+    cycles_mean = sum(last_five_iterations) / len(last_five_iterations)
+    cycles_error = sum([abs(float(c - cycles_mean)) for c in last_five_iterations]) / len(
+        last_five_iterations) / cycles_mean
+    cycles_variance = sum([(c - cycles_mean) ** 2 for c in last_five_iterations]) / (len(
+        last_five_iterations) - 1)  # TODO is this correct? and does it map to perf's percentage variance?
+    logging.info("Average cycles for last five iterations of %s benchmark: %s (variance = %s)", benchmark,
+                 cycles_mean, cycles_error)
+
+    return OrderedDict([('cycles', cycles_mean),
+                        ('cycles-variance', cycles_error),
+                        ])
+
+
 results = OrderedDict()
 
-# add C benchmarks (O0 and O2)
+# add C benchmarks (O0 and O2), $JOBS at a time
 for feature in ['O0', 'O2']:
     feature_key = 'c-' + feature
     results[feature_key] = OrderedDict()
-    for benchmark in BENCHMARKS:
-        program = '%s/%s-%s' % (PATH_TO_BIN, benchmark, feature)
-        measurements = analyze(program, True)
+    programs = ['%s/%s-%s' % (PATH_TO_BIN, benchmark, feature) for benchmark in BENCHMARKS]
+    for benchmark, measurements in zip(BENCHMARKS, analyze_all(programs, True)):
         measurements.assert_no_os_interference()
         results[feature_key][benchmark] = OrderedDict([('cycles', measurements.get_as_int('cycles')),
                                                        ('cycles-variance', measurements.get_variance('cycles')),
@@ -29,42 +66,11 @@ for feature in ['O0', 'O2']:
                                                        ('time-variance', measurements.get_variance('task-clock')),
                                                        ])
 
-# add RPython benchmarks (jit and no-jit)
+# add RPython benchmarks (jit and no-jit), $JOBS at a time
 for feature in ['jit', 'no-jit']:
-    results[feature] = OrderedDict()
     interpreter = '%s/tiger-interpreter%s' % (PATH_TO_BIN, '' if feature == 'jit' else '-no-jit')
-    for benchmark in BENCHMARKS:
-        program = '%s/%s.tig' % (PATH_TO_BENCHMARKS, benchmark)
-        stdout, stderr = run_perf_on(interpreter, program, env={'DEBUG': '1'}, iterate=1)
-
-        program_results = [int(s) for s in stdout.split("\n") if s]
-        assert not program_results or all(x == program_results[0] for x in program_results), \
-            'Expected all results to be the same %s, %s' % (program_results[0], program_results)
-
-        cycles = [int(s.replace('ticks=', '')) for s in stderr.split("\n") if s.startswith('ticks=')]
-        logging.debug("Raw loop times for %s benchmark: %s", benchmark, cycles)
-
-        parsed = parse_perf_output('\n'.join([s for s in stderr.split("\n") if not s.startswith('ticks=')]))
-        measurements = BenchmarkMeasurement(interpreter + ' ' + program, parsed)
-        logging.info("Total time for %s benchmark: %sms (%s total perf cycles ?= %s summed iteration cycles)",
-                     benchmark,
-                     measurements.get_as_float('task-clock'), measurements.get_as_int('cycles'), sum(cycles))
-        measurements.assert_no_os_interference()
-
-        last_five_iterations = cycles[-5:]
-        logging.debug("Raw loop times for the last five iterations of %s benchmark: %s", benchmark,
-                      last_five_iterations)
-        cycles_mean = sum(last_five_iterations) / len(last_five_iterations)
-        cycles_error = sum([abs(float(c - cycles_mean)) for c in last_five_iterations]) / len(
-            last_five_iterations) / cycles_mean
-        cycles_variance = sum([(c - cycles_mean) ** 2 for c in last_five_iterations]) / (len(
-            last_five_iterations) - 1)  # TODO is this correct? and does it map to perf's percentage variance?
-        logging.info("Average cycles for last five iterations of %s benchmark: %s (variance = %s)", benchmark,
-                     cycles_mean, cycles_error)
-
-        results[feature][benchmark] = OrderedDict([('cycles', cycles_mean),
-                                                   ('cycles-variance', cycles_error),
-                                                   ])
+    measured = PinnedPool().map(measure_rpython, [(interpreter, benchmark) for benchmark in BENCHMARKS])
+    results[feature] = OrderedDict(zip(BENCHMARKS, measured))
 
 # save data
 logging.info("Saving data to: %s", PATH_TO_PICKLED_DATA)
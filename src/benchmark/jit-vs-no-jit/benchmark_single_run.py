@@ -9,7 +9,7 @@ import matplotlib.pyplot as plt
 
 from src.benchmark.charting import cycle_bar_styles
 from src.benchmark.extract import extract_benchmark_name, extract_execution_time, extract_execution_time_variance
-from src.benchmark.perf import analyze
+from src.benchmark.perf import analyze_all
 
 # setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,8 +23,8 @@ PATH_TO_PICKLED_DATA = 'var/jit-vs-no-jit.pkl'
 benchmark_programs = [join(PATH_TO_BENCHMARKS, file_path) for file_path in listdir(PATH_TO_BENCHMARKS)
                       if file_path.endswith('.tig')]
 data = OrderedDict()
-data['jit'] = [analyze(PATH_TO_JIT_INTERPRETER + ' ' + benchmark) for benchmark in benchmark_programs]
-data['no-jit'] = [analyze(PATH_TO_NO_JIT_INTERPRETER + ' ' + benchmark) for benchmark in benchmark_programs]
+data['jit'] = analyze_all([PATH_TO_JIT_INTERPRETER + ' ' + benchmark for benchmark in benchmark_programs])
+data['no-jit'] = analyze_all([PATH_TO_NO_JIT_INTERPRETER + ' ' + benchmark for benchmark in benchmark_programs])
 
 # save data
 logging.info("Saving data to: %s", PATH_TO_PICKLED_DATA)
@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import time
+from collections import OrderedDict
+from timeit import default_timer
+
+from src.ast import Let
+from src.benchmark.extract import collect_files
+from src.benchmark.stats import mean, standard_deviation
+from src.native_functions import create_native_functions, create_empty_environment
+from src.parser import Parser
+from src.scopes import transform_lvalues
+from src.tokenizer import Tokenizer
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Micro-benchmarks of the interpreter's components, run in-process (with CPython or PyPy, i.e. untranslated) so that a
+slowdown can be traced to a phase (tokenizing, parsing, transform_lvalues, evaluation) or to the evaluation of one
+node type; whole-binary benchmarks live in run.py
+"""
+FORMAT_VERSION = 1
+
+DEFAULT_SUITE = 'src/benchmark/suite-single'
+DEFAULT_REPETITIONS = 10
+DEFAULT_MINIMUM_SECONDS = 0.1  # per repetition; operations are batched until a repetition takes at least this long
+
+
+def measure(operation, setup=None, repetitions=DEFAULT_REPETITIONS, minimum_seconds=DEFAULT_MINIMUM_SECONDS):
+    """
+    Time an operation: the number of operations per repetition is doubled until a repetition takes at least
+    `minimum_seconds` and then each repetition is timed separately
+    :param operation: a function taking no arguments or, if `setup` is given, the result of setup()
+    :param setup: an optional function producing a fresh input for each operation (e.g. a new AST for an operation
+    that modifies it); it runs outside of the timed region
+    :return: a list of operations per second, one per repetition
+    """
+    number = 1
+    while True:
+        elapsed = time_operations(operation, setup, number)
+        if elapsed >= minimum_seconds or number >= 1 << 24:
+            break
+        number *= 2
+    return [number / time_operations(operation, setup, number) for _ in range(repetitions)]
+
+
+def time_operations(operation, setup, number):
+    if setup is None:
+        start = default_timer()
+        for _ in range(number):
+            operation()
+        return max(default_timer() - start, 1e-9)
+    elapsed = 0.0
+    for _ in range(number):
+        argument = setup()
+        start = default_timer()
+        operation(argument)
+        elapsed += default_timer() - start
+    return max(elapsed, 1e-9)
+
+
+def summarize(ops_per_second):
+    summary = OrderedDict()
+    summary['ops_per_second_mean'] = mean(ops_per_second)
+    summary['ops_per_second_stdev'] = standard_deviation(ops_per_second) if len(ops_per_second) > 1 else 0.0
+    summary['coefficient_of_variation'] = summary['ops_per_second_stdev'] / summary['ops_per_second_mean']
+    summary['ops_per_second'] = ops_per_second
+    return summary
+
+
+# SYNTHETIC INPUTS
+
+
+def generate_many_declarations(n):
+    """A flat let with n variables and n functions, each function reading the variable declared before it"""
+    declarations = []
+    for i in range(n):
+        declarations.append('  var v%d : int := %d' % (i, i))
+        declarations.append('  function f%d(x: int): int = x + v%d' % (i, i))
+    body = ' + '.join(['f%d(%d)' % (i, i) for i in range(min(n, 50))])
+    return 'let\n%s\nin\n  %s\nend\n' % ('\n'.join(declarations), body)
+
+
+def generate_deep_nesting(depth):
+    """Nested lets, each declaring a variable and reading the variables of all enclosing lets"""
+    source = ' + '.join(['v%d' % i for i in range(depth)])
+    for i in reversed(range(depth)):
+        source = 'let var v%d := %d in %s end' % (i, i, source)
+    return source + '\n'
+
+
+def generate_long_sequence(n):
+    """A loop-free body of n assignments and record, array and function operations"""
+    lines = []
+    for i in range(n):
+        lines.append('a[%d] := p.x + f(%d); p := point{x = a[%d], y = %d}' % (i % 10, i, i % 10, i))
+    return 'let\n  type point = {x: int, y: int}\n  type ints = array of int\n  var a := ints[10] of 0\n' \
+           '  var p := point{x = 0, y = 0}\n  function f(i: int): int = i * 2\nin\n  %s;\n  p.x\nend\n' % \
+           ';\n  '.join(lines)
+
+
+SYNTHETIC_PROGRAMS = OrderedDict([
+    ('declarations-1000', generate_many_declarations(1000)),
+    ('nesting-100', generate_deep_nesting(100)),
+    ('sequence-2000', generate_long_sequence(2000)),
+])
+
+"""Small, print-free programs to time whole evaluations with (the suite programs take too long untranslated)"""
+EVALUATION_PROGRAMS = OrderedDict([
+    ('for-sum', 'let var s := 0 in for i := 1 to 1000 do s := s + i; s end'),
+    ('while-count', 'let var i := 0 in while i < 1000 do i := i + 1; i end'),
+    ('fibonacci', 'let function fib(n: int): int = if n < 2 then n else fib(n - 1) + fib(n - 2) in fib(12) end'),
+    ('records', 'let type point = {x: int, y: int} var p := point{x = 0, y = 0} in '
+                'for i := 1 to 500 do p := point{x = p.x + i, y = p.y - i}; p.x end'),
+    ('arrays', 'let type ints = array of int var a := ints[100] of 0 in '
+               'for i := 0 to 999 do a[i / 10] := a[i / 10] + i; a[0] end'),
+])
+
+"""
+Single expressions timed in the environment of their declarations: the expression is evaluated directly, without the
+surrounding let, e.g. to time one LValue.evaluate
+"""
+NODE_DECLARATIONS = 'type point = {x: int, y: int} type ints = array of int ' \
+                    'var a := 42 var p := point{x = 1, y = 2} var arr := ints[10] of 3 ' \
+                    'function identity(i: int): int = i function constant(): int = 42'
+NODE_EXPRESSIONS = OrderedDict([
+    ('LValue.evaluate (variable)', 'a'),
+    ('LValue.evaluate (record field)', 'p.y'),
+    ('LValue.evaluate (array element)', 'arr[5]'),
+    ('FunctionCall.evaluate (no arguments)', 'constant()'),
+    ('FunctionCall.evaluate (one argument)', 'identity(a)'),
+    ('FunctionCall.evaluate (native)', 'ord("a")'),
+    ('RecordCreation.evaluate', 'point{x = 1, y = 2}'),
+    ('ArrayCreation.evaluate', 'ints[10] of 0'),
+    ('Assign.evaluate', 'a := 42'),
+    ('Add.evaluate', 'a + 1'),
+    ('If.evaluate', 'if a > 0 then 1 else 2'),
+])
+
+
+def prepare_node(declarations, expression):
+    """
+    Parse `let <declarations> in <expression> end` and evaluate only its declarations
+    :return: the expression node and the environment to evaluate it in
+    """
+    program = Parser('let %s in %s end' % (declarations, expression)).parse(create_native_functions())
+    assert isinstance(program, Let)
+    program.environment = program.environment.push(len(program.declarations))
+    for declaration in program.declarations:
+        declaration.evaluate(program.environment)
+    assert len(program.expressions) == 1
+    return program.expressions[0], program.environment
+
+
+# BENCHMARKS
+
+
+def parse(text, native_function_declarations=None):
+    return Parser(text).parse(native_function_declarations)
+
+
+def list_benchmarks(suite):
+    """
+    :return: a list of (name, operation, setup) tuples, see measure()
+    """
+    programs = [(name, read(path)) for (name, path) in sorted(collect_files(suite, suffix='.tig'))]
+    programs.extend(SYNTHETIC_PROGRAMS.items())
+
+    benchmarks = []
+    for name, text in programs:
+        benchmarks.append(('tokenize %s' % name, lambda text=text: Tokenizer(text).all(), None))
+        benchmarks.append(('parse %s' % name, lambda text=text: parse(text), None))
+        benchmarks.append(('transform_lvalues %s' % name,
+                           lambda arguments: transform_lvalues(*arguments),
+                           lambda text=text: (parse(text), create_native_functions())))
+
+    for name, text in EVALUATION_PROGRAMS.items():
+        program = parse(text, create_native_functions())
+        benchmarks.append(('evaluate %s' % name, lambda program=program: program.evaluate(create_empty_environment()),
+                           None))
+
+    for name, expression in NODE_EXPRESSIONS.items():
+        node, environment = prepare_node(NODE_DECLARATIONS, expression)
+        benchmarks.append((name, lambda node=node, environment=environment: node.evaluate(environment), None))
+    return benchmarks
+
+
+def read(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def run(benchmarks, repetitions=DEFAULT_REPETITIONS, minimum_seconds=DEFAULT_MINIMUM_SECONDS):
+    results = OrderedDict()
+    for name, operation, setup in benchmarks:
+        results[name] = summarize(measure(operation, setup, repetitions, minimum_seconds))
+        logging.info("%s: %.1f ops/s (+/- %.1f%%)", name, results[name]['ops_per_second_mean'],
+                     results[name]['coefficient_of_variation'] * 100)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the tokenizer, parser, transform_lvalues and the evaluation of '
+                                                 'programs and single AST nodes in-process and report operations per '
+                                                 'second')
+    parser.add_argument('suite', nargs='?', default=DEFAULT_SUITE,
+                        help='directory of .tig programs to tokenize, parse and transform (they are not evaluated); '
+                             'default: %s' % DEFAULT_SUITE)
+    parser.add_argument('-k', '--filter', help='only run the benchmarks whose names contain this text')
+    parser.add_argument('-r', '--repetitions', type=int, default=DEFAULT_REPETITIONS,
+                        help='timed repetitions per benchmark')
+    parser.add_argument('-t', '--minimum-seconds', type=float, default=DEFAULT_MINIMUM_SECONDS,
+                        help='minimum duration of each repetition')
+    parser.add_argument('-o', '--output', help='JSON file to write the results to')
+    args = parser.parse_args()
+
+    benchmarks = [b for b in list_benchmarks(args.suite) if not args.filter or args.filter in b[0]]
+    results = run(benchmarks, args.repetitions, args.minimum_seconds)
+
+    print('benchmark\tops/s\tstdev\tcv')
+    for name, summary in results.items():
+        print('%s\t%.1f\t%.1f\t%.1f%%' % (name, summary['ops_per_second_mean'], summary['ops_per_second_stdev'],
+                                          summary['coefficient_of_variation'] * 100))
+
+    if args.output:
+        data = OrderedDict()
+        data['format_version'] = FORMAT_VERSION
+        data['date'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        data['python'] = '%s %s' % (platform.python_implementation(), platform.python_version())
+        data['host'] = platform.node()
+        data['repetitions'] = args.repetitions
+        data['minimum_seconds'] = args.minimum_seconds
+        data['results'] = results
+        if os.path.dirname(args.output) and not os.path.isdir(os.path.dirname(args.output)):
+            os.makedirs(os.path.dirname(args.output))
+        logging.info("Saving results to: %s", args.output)
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ import subprocess
 from collections import OrderedDict
 
 from src.benchmark.measurement import BenchmarkMeasurement
+from src.benchmark.pool import PinnedPool, DEFAULT_JOBS
 
 logging.basicConfig(level=logging.INFO)
 
@@ -31,10 +32,13 @@ def run_perf_on(*args, **kwargs):
     Run a command from within 'perf'; see https://perf.wiki.kernel.org/index.php/Tutorial; note: it would not be hard
     to add or remove events with '-e'
     :param args: a vararg list of the command to run
+    :param kwargs: 'iterate' sets the number of perf repeats and 'prefix' a list of arguments to run perf with (e.g.
+    ['taskset', '-c', '3']); the rest are passed to run_command
     :return: a tuple with the (stdout, stderr) strings or an exception is thrown
     """
     number_of_iterations_to_run = kwargs.pop('iterate', 5)
-    perf_args = ['perf', 'stat', '-x;', '-r ' + str(number_of_iterations_to_run)]
+    perf_args = list(kwargs.pop('prefix', None) or [])
+    perf_args.extend(['perf', 'stat', '-x;', '-r ' + str(number_of_iterations_to_run)])
     perf_args.extend(args)
     return run_command(*perf_args, **kwargs)
 
@@ -73,15 +77,16 @@ def parse_perf_output(output):
     return measurements
 
 
-def analyze(command, wrap_measurements=False):
+def analyze(command, wrap_measurements=False, prefix=None):
     """
     :param command: a string version of the command, e.g. 'curl -s http://google.com'
     :param wrap_measurements: if set to true, use the new BenchmarkMeasurement helper class to wrap measurements
+    :param prefix: a list of arguments to run perf with, e.g. ['taskset', '-c', '3'] to pin it to a CPU
     :return: a tuple with the command string and the measurements taken from running it, e.g.
     ('ls', {'task-clock': {'value': '52.5', ...}, 'instructions': {...}, ...})
     """
     args = command.split(' ')
-    stdout, stderr = run_perf_on(*args)
+    stdout, stderr = run_perf_on(*args, prefix=prefix)
     measurements = parse_perf_output(stderr)
 
     for key in measurements:
@@ -92,3 +97,12 @@ def analyze(command, wrap_measurements=False):
         return BenchmarkMeasurement(command, measurements)
     else:
         return command, measurements
+
+
+def analyze_all(commands, wrap_measurements=False, jobs=DEFAULT_JOBS):
+    """
+    Analyze several commands, running up to `jobs` of them at a time, each pinned to its own CPU (see PinnedPool)
+    :return: a list of the results of analyze() in the order of the commands
+    """
+    pool = PinnedPool(jobs)
+    return pool.map(lambda command, prefix: analyze(command, wrap_measurements, prefix), commands)
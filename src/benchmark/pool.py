@@ -0,0 +1,117 @@
+import logging
+import os
+from distutils.spawn import find_executable
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Number of programs to run at the same time when not configured otherwise (e.g. with `make ... JOBS=8`)
+"""
+DEFAULT_JOBS = int(os.environ.get('JOBS', '1'))
+
+
+def parse_cpu_list(text):
+    """Parse a Linux CPU list such as '0-3,8,10-11' (see cpuset(7))"""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus():
+    """The CPUs this process may run on (e.g. as restricted by taskset or cgroups)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('Cpus_allowed_list:'):
+                    return parse_cpu_list(line.split(':')[1])
+    except IOError:
+        pass
+    return list(range(cpu_count()))
+
+
+def isolated_cpus():
+    """The CPUs removed from the kernel's scheduler with the isolcpus boot parameter"""
+    try:
+        with open('/sys/devices/system/cpu/isolated', 'r') as f:
+            return parse_cpu_list(f.read())
+    except IOError:
+        return []
+
+
+def choose_cpus(jobs):
+    """
+    Pick one CPU per job, preferring isolated CPUs and leaving CPU 0 (which handles most interrupts and housekeeping)
+    to the OS when possible; raises if there are not enough CPUs to give each job its own
+    """
+    available = available_cpus()
+    isolated = [cpu for cpu in isolated_cpus() if cpu in available]
+    preferred = isolated + [cpu for cpu in available if cpu not in isolated and cpu != 0] + \
+                [cpu for cpu in available if cpu not in isolated and cpu == 0]
+    if jobs > len(preferred):
+        raise EnvironmentError('Cannot run %d pinned jobs on %d available CPUs (%s)' % (jobs, len(preferred),
+                                                                                       available))
+    chosen = preferred[:jobs]
+    if not isolated:
+        logging.warning("No isolated CPUs (see isolcpus); other processes may interfere with measurements")
+    elif not all([cpu in isolated for cpu in chosen]):
+        logging.warning("Only %d of %d jobs run on isolated CPUs", len([c for c in chosen if c in isolated]), jobs)
+    return chosen
+
+
+class PinnedPool:
+    """
+    Run commands in parallel, each pinned with taskset to a CPU that no other running command uses, so that a command
+    is neither migrated between CPUs nor shares its CPU with another benchmark (see
+    BenchmarkMeasurement.assert_no_os_interference); with jobs=1 commands run serially, as before
+    """
+
+    def __init__(self, jobs=DEFAULT_JOBS, pin=True):
+        assert jobs >= 1, 'Expected at least one job'
+        self.jobs = jobs
+        self.pin = pin and find_executable('taskset') is not None
+        if pin and not self.pin:
+            logging.warning("Cannot find taskset; running %d jobs without CPU pinning", jobs)
+        self.cpus = Queue()
+        for cpu in (choose_cpus(jobs) if self.pin else [None] * jobs):
+            self.cpus.put(cpu)
+
+    def prefix(self, cpu):
+        return ['taskset', '-c', str(cpu)] if cpu is not None else []
+
+    def map(self, function, items):
+        """
+        Call function(item, prefix) for each item, at most `jobs` at a time; prefix is the list of arguments (e.g.
+        ['taskset', '-c', '3']) to prepend to any command the function runs
+        :return: the results in the order of the items
+        """
+
+        def run(item):
+            cpu = self.cpus.get()
+            try:
+                return function(item, self.prefix(cpu))
+            finally:
+                self.cpus.put(cpu)
+
+        if self.jobs == 1:
+            return [run(item) for item in items]
+        pool = ThreadPool(self.jobs)  # threads suffice: each only waits on its child process
+        try:
+            return pool.map(run, items)
+        finally:
+            pool.close()
+            pool.join()
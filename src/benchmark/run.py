@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import time
+from collections import OrderedDict
+
+from src.benchmark.extract import collect_files
+from src.benchmark.perf import run_command
+from src.benchmark.pool import PinnedPool, DEFAULT_JOBS
+from src.benchmark.stats import median, confidence_interval, geometric_mean, detect_steady_state, mean
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Version of the JSON results format written by this runner; increment it whenever the layout of the results changes so
+that charting scripts can reject (or convert) files they do not understand
+"""
+FORMAT_VERSION = 1
+
+DEFAULT_INTERPRETERS = ['bin/tiger-interpreter']
+DEFAULT_ITERATIONS = 30
+DEFAULT_INVOCATIONS = 5
+PATH_TO_WRAPPED_PROGRAMS = 'var/run'
+
+
+def wrap_program(name, path, iterations, directory=PATH_TO_WRAPPED_PROGRAMS):
+    """
+    Programs that do not time themselves (i.e. do not call timeGo()) are wrapped in a loop that runs and times them
+    the given number of times, like warmup/wrap-benchmarks.sh; self-timing programs (e.g. suite-looped) are run as-is
+    :return: the path of the program to run
+    """
+    with open(path, 'r') as f:
+        contents = f.read()
+    if 'timeGo()' in contents:
+        return path
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    wrapped_path = os.path.join(directory, '%s-%d.tig' % (name, iterations))
+    indented = '\n'.join(['  ' + line for line in contents.rstrip().split('\n')])
+    with open(wrapped_path, 'w') as f:
+        f.write('for i := 1 to %d\ndo (\n  timeGo();\n%s;\n  timeStop()\n)\n' % (iterations, indented))
+    return wrapped_path
+
+
+def parse_ticks(stderr):
+    return [int(line.replace('ticks=', '')) for line in stderr.split('\n') if line.startswith('ticks=')]
+
+
+def run_invocation(interpreter, program, iterations, prefix=None):
+    """Run one process invocation and collect its wall-clock time and per-iteration ticks (see timeStop())"""
+    environment = dict(os.environ)
+    environment['DEBUG'] = '1'
+    command = (prefix or []) + interpreter.split(' ') + [program]
+    start = time.time()
+    stdout, stderr = run_command(*command, env=environment)
+    wall_seconds = time.time() - start
+
+    ticks = parse_ticks(stderr)[:iterations]
+    warmup = detect_steady_state(ticks)
+    steady = ticks[warmup:] if warmup is not None else ticks
+    return OrderedDict([
+        ('wall_seconds', wall_seconds),
+        ('ticks', ticks),
+        ('warmup_iterations', warmup),  # None if no steady state was reached
+        ('steady_state_mean_ticks', mean(steady) if steady else None),
+    ])
+
+
+def summarize(invocations):
+    """
+    Summarize the invocations of one benchmark: across several invocations the per-invocation steady-state means are
+    the samples (iterations within a process are not independent); with a single invocation, its steady iterations are
+    """
+    means = [i['steady_state_mean_ticks'] for i in invocations if i['steady_state_mean_ticks'] is not None]
+    if len(invocations) == 1 and invocations[0]['ticks']:
+        invocation = invocations[0]
+        samples = invocation['ticks'][invocation['warmup_iterations'] or 0:]
+    else:
+        samples = means
+    walls = [i['wall_seconds'] for i in invocations]
+
+    summary = OrderedDict()
+    summary['steady_state_reached'] = len([i for i in invocations if i['warmup_iterations'] is not None])
+    summary['warmup_iterations_median'] = median(
+        [i['warmup_iterations'] for i in invocations if i['warmup_iterations'] is not None] or [0])
+    summary['ticks_median'] = median(samples) if samples else None
+    summary['ticks_ci95'] = confidence_interval(samples) if samples else None
+    summary['wall_seconds_median'] = median(walls)
+    summary['wall_seconds_ci95'] = confidence_interval(walls)
+    return summary
+
+
+def find_git_commit():
+    try:
+        return run_command('git', 'rev-parse', 'HEAD')[0].strip()
+    except Exception:
+        return None
+
+
+def run(suite, interpreters, iterations, invocations, jobs=DEFAULT_JOBS):
+    """Run all invocations, up to `jobs` at a time on separate CPUs (see PinnedPool), and summarize them"""
+    programs = sorted(collect_files(suite, suffix='.tig'))
+    tasks = []
+    for interpreter in interpreters:
+        for name, path in programs:
+            program = wrap_program(name, path, iterations)
+            tasks.extend([(interpreter, name, program)] * invocations)
+
+    def run_task(task, prefix):
+        interpreter, _, program = task
+        return run_invocation(interpreter, program, iterations, prefix)
+
+    runs = PinnedPool(jobs).map(run_task, tasks)
+
+    results = OrderedDict()
+    for interpreter in interpreters:
+        results[interpreter] = OrderedDict()
+        for name, path in programs:
+            runs_of_program = [r for (t, r) in zip(tasks, runs) if t[0] == interpreter and t[1] == name]
+            summary = summarize(runs_of_program)
+            logging.info("%s %s: median %s ticks (95%% CI %s), %s of %d invocations reached a steady state",
+                         interpreter, name, summary['ticks_median'], summary['ticks_ci95'],
+                         summary['steady_state_reached'], invocations)
+            results[interpreter][name] = OrderedDict([('summary', summary), ('invocations', runs_of_program)])
+    return results
+
+
+def geometric_means(results):
+    """
+    The geometric mean of the median ticks per interpreter and, for each interpreter after the first, the geometric mean
+    of its speedup over the first (i.e. baseline) interpreter
+    """
+    interpreters = list(results.keys())
+    baseline = results[interpreters[0]]
+    means = OrderedDict()
+    for interpreter in interpreters:
+        medians = [r['summary']['ticks_median'] for r in results[interpreter].values()]
+        entry = OrderedDict()
+        entry['ticks'] = geometric_mean(medians) if medians and all(medians) else None
+        speedups = [baseline[name]['summary']['ticks_median'] / r['summary']['ticks_median']
+                    for name, r in results[interpreter].items()
+                    if r['summary']['ticks_median'] and baseline[name]['summary']['ticks_median']]
+        entry['speedup'] = geometric_mean(speedups) if speedups else None  # relative to the baseline interpreter
+        means[interpreter] = entry
+    return means
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a suite of Tiger benchmarks against one or more interpreters '
+                                                 'and write the timings and their statistics as JSON')
+    parser.add_argument('suite', help='directory of .tig programs, e.g. src/benchmark/suite-looped')
+    parser.add_argument('-i', '--interpreter', action='append', dest='interpreters',
+                        help='interpreter command to run each program with (repeatable); default: %s' %
+                             DEFAULT_INTERPRETERS[0])
+    parser.add_argument('-n', '--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help='in-process iterations per invocation (self-timing programs run their own iterations, '
+                             'of which at most this many are kept)')
+    parser.add_argument('-m', '--invocations', type=int, default=DEFAULT_INVOCATIONS,
+                        help='process invocations per program and interpreter')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help='invocations to run at the same time, each pinned to its own CPU; default: $JOBS or 1')
+    parser.add_argument('-o', '--output', help='JSON file to write; default: var/run-<date>.json')
+    args = parser.parse_args()
+
+    interpreters = args.interpreters or DEFAULT_INTERPRETERS
+    results = run(args.suite, interpreters, args.iterations, args.invocations, args.jobs)
+
+    data = OrderedDict()
+    data['format_version'] = FORMAT_VERSION
+    data['date'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    data['git_commit'] = find_git_commit()
+    data['host'] = platform.node()
+    data['suite'] = args.suite
+    data['interpreters'] = interpreters
+    data['baseline'] = interpreters[0]
+    data['iterations'] = args.iterations
+    data['invocations'] = args.invocations
+    data['jobs'] = args.jobs
+    data['geometric_means'] = geometric_means(results)
+    data['results'] = results
+
+    output = args.output or 'var/run-%s.json' % time.strftime('%Y%m%d-%H%M%S')
+    if os.path.dirname(output) and not os.path.isdir(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+    logging.info("Geometric means: %s", json.dumps(data['geometric_means']))
+    logging.info("Saving results to: %s", output)
+    with open(output, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+import math
+import random
+
+"""
+Number of resamples used for bootstrapped confidence intervals
+"""
+BOOTSTRAP_RESAMPLES = 1000
+
+"""
+Relative distance from the median within which all remaining iterations must lie to be considered steady
+"""
+STEADY_STATE_TOLERANCE = 0.05
+
+"""
+Minimum number of iterations in a steady state
+"""
+STEADY_STATE_MINIMUM_ITERATIONS = 5
+
+
+def mean(values):
+    assert values, 'Expected at least one value'
+    return float(sum(values)) / len(values)
+
+
+def median(values):
+    assert values, 'Expected at least one value'
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return float(ordered[middle])
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def variance(values):
+    """Sample variance (i.e. divided by n - 1)"""
+    if len(values) < 2:
+        return 0.0
+    m = mean(values)
+    return sum([(v - m) ** 2 for v in values]) / (len(values) - 1)
+
+
+def standard_deviation(values):
+    return math.sqrt(variance(values))
+
+
+def percentile(ordered_values, fraction):
+    """Linearly interpolated percentile of an already-sorted list, e.g. fraction=0.5 for the median"""
+    assert ordered_values, 'Expected at least one value'
+    position = (len(ordered_values) - 1) * fraction
+    lower = int(math.floor(position))
+    upper = int(math.ceil(position))
+    if lower == upper:
+        return float(ordered_values[lower])
+    return ordered_values[lower] + (ordered_values[upper] - ordered_values[lower]) * (position - lower)
+
+
+def confidence_interval(values, statistic=median, confidence=0.95, resamples=BOOTSTRAP_RESAMPLES, seed=42):
+    """
+    Bootstrap a confidence interval for a statistic of the values (no assumption of normality, which benchmark timings
+    rarely satisfy); the fixed seed makes the reported intervals reproducible
+    :return: a tuple of (lower, upper) bounds
+    """
+    assert values, 'Expected at least one value'
+    if len(values) == 1:
+        return float(values[0]), float(values[0])
+    generator = random.Random(seed)
+    estimates = sorted([statistic([generator.choice(values) for _ in values]) for _ in range(resamples)])
+    alpha = (1.0 - confidence) / 2
+    return percentile(estimates, alpha), percentile(estimates, 1.0 - alpha)
+
+
+def geometric_mean(values):
+    assert values, 'Expected at least one value'
+    assert all([v > 0 for v in values]), 'Expected only positive values: %s' % values
+    return math.exp(sum([math.log(v) for v in values]) / len(values))
+
+
+def detect_steady_state(iterations, tolerance=STEADY_STATE_TOLERANCE, minimum=STEADY_STATE_MINIMUM_ITERATIONS):
+    """
+    Find the first iteration after which all iterations lie within a relative tolerance of the median of those
+    remaining iterations, e.g. the ticks printed by timeStop() for each iteration of a suite-looped program
+    :return: the number of warmup iterations before the steady state or None if no steady state was reached
+    """
+    for start in range(len(iterations) - minimum + 1):
+        remaining = iterations[start:]
+        center = median(remaining)
+        if center == 0:
+            continue
+        if all([abs(v - center) / center <= tolerance for v in remaining]):
+            return start
+    return None
+
+
+def incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), evaluated with Lentz's continued fraction"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1.0) / (a + b + 2.0):
+        return 1.0 - incomplete_beta(b, a, 1.0 - x)  # the continued fraction converges quickly only below this point
+
+    logarithm = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)
+    front = math.exp(logarithm) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in [m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))]:
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * result
+
+
+def welch_t_test(mean_a, stdev_a, n_a, mean_b, stdev_b, n_b):
+    """
+    Welch's unequal-variances t-test from summary statistics (the perf-based pickles only record a mean and a relative
+    standard deviation, not the individual samples)
+    :return: a tuple of (t statistic, two-sided p-value)
+    """
+    assert n_a >= 2 and n_b >= 2, 'Expected at least two samples on each side'
+    variance_a = float(stdev_a) ** 2 / n_a
+    variance_b = float(stdev_b) ** 2 / n_b
+    standard_error = math.sqrt(variance_a + variance_b)
+    if standard_error == 0:
+        return (0.0, 1.0) if mean_a == mean_b else (float('inf') if mean_b > mean_a else float('-inf'), 0.0)
+    t = (mean_b - mean_a) / standard_error
+    degrees_of_freedom = (variance_a + variance_b) ** 2 / (
+        variance_a ** 2 / (n_a - 1) + variance_b ** 2 / (n_b - 1))
+    p = incomplete_beta(degrees_of_freedom / 2.0, 0.5, degrees_of_freedom / (degrees_of_freedom + t ** 2))
+    return t, p
+
+
+"""
+Minimum relative standard deviation assumed for a segment when detecting changepoints; without it, a segment of
+identical values (common with coarse timers) would have zero variance and an infinitely good fit
+"""
+CHANGEPOINT_MINIMUM_RELATIVE_DEVIATION = 0.001
+
+
+def changepoints(values, penalty=None, minimum_length=2):
+    """
+    Detect changes in the mean and variance of a series with PELT (Killick et al., 2012), the changepoint analysis used
+    by Barrett et al. in "Virtual Machine Warmup Blows Hot and Cold" (with their penalty of 15 * log(n)); each segment
+    is modelled as normally distributed, so a segment costs n * log(variance) (constant terms cancel out)
+    :return: the sorted indexes at which a new segment starts (excluding 0)
+    """
+    n = len(values)
+    if n < 2 * minimum_length:
+        return []
+    if penalty is None:
+        penalty = 15 * math.log(n)
+    sums, squares = [0.0], [0.0]
+    for v in values:
+        sums.append(sums[-1] + v)
+        squares.append(squares[-1] + float(v) * v)
+    minimum_variance = (CHANGEPOINT_MINIMUM_RELATIVE_DEVIATION * abs(median(values))) ** 2 or 1e-12
+
+    def cost(start, end):
+        length = end - start
+        total = sums[end] - sums[start]
+        segment_variance = (squares[end] - squares[start] - total * total / length) / length
+        return length * math.log(max(segment_variance, minimum_variance))
+
+    best = {0: -penalty}  # the cost of the best segmentation of values[:t]
+    previous = {0: None}
+    candidates = [0]
+    for end in range(minimum_length, n + 1):
+        eligible = [s for s in candidates if end - s >= minimum_length]
+        costs = dict([(s, best[s] + cost(s, end) + penalty) for s in eligible])
+        start = min(eligible, key=lambda s: costs[s])
+        best[end] = costs[start]
+        previous[end] = start
+        # prune the starts that can never be optimal again (the PELT condition) and allow a segment to start here
+        candidates = [s for s in candidates if s not in costs or costs[s] - penalty <= best[end]]
+        if end <= n - minimum_length:
+            candidates.append(end)
+
+    starts = []
+    end = previous[n]
+    while end:
+        starts.append(end)
+        end = previous[end]
+    return sorted(starts)
@@ -4,6 +4,7 @@ from collections import OrderedDict
 
 from src.benchmark.extract import collect_files
 from src.benchmark.perf import run_command
+from src.benchmark.pool import PinnedPool
 
 # setup logging
 logging.basicConfig(level=logging.INFO)
@@ -13,13 +14,12 @@ PATH_TO_BENCHMARKS = 'src/benchmark/suite-looped'
 PATH_TO_PICKLED_DATA = 'var/warmup.pkl'
 PATH_TO_PYPYLOG = 'jit:var/%s-convoluted.log'
 
-# gather data
-benchmark_programs = collect_files(PATH_TO_BENCHMARKS, suffix='.tig')
 
-data = OrderedDict()
-for name, program in benchmark_programs:
+def measure(task, prefix):
+    """Run one self-timing benchmark, logging its JIT activity, and return the ticks of each of its iterations"""
+    name, program = task
     log = PATH_TO_PYPYLOG % name
-    stdout, stderr = run_command(PATH_TO_JIT_INTERPRETER, program,
+    stdout, stderr = run_command(*(prefix + [PATH_TO_JIT_INTERPRETER, program]),
                                  env={'DEBUG': '1', 'PYPYLOG': log})
 
     results = [int(s) for s in stdout.split("\n") if s]
@@ -28,8 +28,13 @@ for name, program in benchmark_programs:
 
     loop_times = [int(s.replace('ticks=', '')) for s in stderr.split("\n") if s]
     logging.info("Raw loop times for %s benchmark: %s", name, loop_times)
+    return loop_times
+
 
-    data[name] = loop_times
+# gather data, $JOBS benchmarks at a time (see PinnedPool)
+benchmark_programs = collect_files(PATH_TO_BENCHMARKS, suffix='.tig')
+loop_times = PinnedPool().map(measure, benchmark_programs)
+data = OrderedDict(zip([name for name, _ in benchmark_programs], loop_times))
 
 # save data
 logging.info("Saving data to: %s", PATH_TO_PICKLED_DATA)
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import pickle
@@ -8,11 +9,16 @@ import matplotlib.pyplot as plt
 logging.basicConfig(level=logging.INFO)
 
 PATH_TO_PICKLED_DATA = 'var/warmup.pkl'
+PATH_TO_ANALYSIS = 'var/warmup.json'  # see src/benchmark/warmup_analysis.py
 
 # gather data
 logging.info("Collection data from: %s", PATH_TO_PICKLED_DATA)
 with open(PATH_TO_PICKLED_DATA, 'rb') as f:
     data = pickle.load(f)
+analysis = {}
+if os.path.exists(PATH_TO_ANALYSIS):
+    with open(PATH_TO_ANALYSIS, 'r') as f:
+        analysis = json.load(f)['benchmarks']
 
 # show variance
 for name, loop_times in data.items():
@@ -37,11 +43,13 @@ num_columns = 3
 i = 1
 for name, loop_times in data.items():
     ax = plt.subplot(num_rows * 100 + num_columns * 10 + i)
-    ax.set_title(name)
+    ax.set_title(name if name not in analysis else '%s (%s)' % (name, analysis[name]['classification']))
     ax.set_ylabel('CPU Cycles')
     ax.set_xlabel("Iterations")
     index = range(len(loop_times))
     plt.plot(index, loop_times, 'k')  # or 'k'
+    if name in analysis and analysis[name]['steady_state_iteration_mean'] is not None:
+        ax.axvline(analysis[name]['steady_state_iteration_mean'], color='k', linestyle='--')  # steady state begins
     i += 1
 
 plt.tight_layout()  # necessary to re-position axis labels
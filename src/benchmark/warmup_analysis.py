@@ -0,0 +1,172 @@
+import argparse
+import json
+import logging
+import os
+import pickle
+from collections import OrderedDict
+
+from src.benchmark.stats import changepoints, confidence_interval, mean, standard_deviation
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Version of the JSON written by this analysis; increment it whenever its layout changes
+"""
+FORMAT_VERSION = 1
+
+PATH_TO_PICKLED_DATA = 'var/warmup.pkl'
+PATH_TO_ANALYSIS = 'var/warmup.json'
+
+"""
+The classifications of Barrett et al.: a flat series has no (significant) changepoints, a warmup series ends in its
+fastest segment, a slowdown series ends in a segment slower than an earlier one and a series with no steady state
+still changes near its end; invocations of one benchmark that disagree are inconsistent
+"""
+FLAT = 'flat'
+WARMUP = 'warmup'
+SLOWDOWN = 'slowdown'
+NO_STEADY_STATE = 'no steady state'
+INCONSISTENT = 'inconsistent'
+
+"""
+The final fraction of the iterations (at least STEADY_STATE_MINIMUM_ITERATIONS) in which no changepoint may appear for a
+series to reach a steady state; Barrett et al. use the last 500 of 2000 iterations
+"""
+STEADY_STATE_WINDOW = 0.25
+STEADY_STATE_MINIMUM_ITERATIONS = 5
+
+"""
+Relative difference below which the means of two segments are considered equivalent (differences within the segments'
+own standard deviations are also ignored), so that changepoints caused by noise do not affect the classification
+"""
+EQUIVALENCE_TOLERANCE = 0.01
+
+
+class Segment:
+    def __init__(self, start, values):
+        self.start = start
+        self.end = start + len(values)
+        self.mean = mean(values)
+        self.stdev = standard_deviation(values)
+
+    def is_equivalent(self, other):
+        difference = abs(self.mean - other.mean)
+        return difference <= max(EQUIVALENCE_TOLERANCE * min(self.mean, other.mean), self.stdev, other.stdev)
+
+    def to_dict(self):
+        return OrderedDict([('start', self.start), ('end', self.end), ('mean', self.mean), ('stdev', self.stdev)])
+
+
+def segment(iterations):
+    starts = [0] + changepoints(iterations) + [len(iterations)]
+    return [Segment(starts[i], iterations[starts[i]:starts[i + 1]]) for i in range(len(starts) - 1)]
+
+
+def classify(iterations):
+    """
+    Classify the per-iteration times of one process invocation and find its steady state, which begins with the first
+    of the segments at the end of the series that are equivalent to the last one
+    :return: a dictionary with the classification, the segments and, if there is a steady state, its first iteration,
+    the time spent before it and the mean (with a 95% confidence interval) iteration time within it
+    """
+    assert iterations, 'Expected at least one iteration'
+    segments = segment(iterations)
+    last = segments[-1]
+
+    window = max(int(len(iterations) * STEADY_STATE_WINDOW), STEADY_STATE_MINIMUM_ITERATIONS)
+    if last.start > len(iterations) - window:
+        classification = NO_STEADY_STATE
+    elif all([s.is_equivalent(last) for s in segments]):
+        classification = FLAT
+    elif any([s.mean < last.mean and not s.is_equivalent(last) for s in segments]):
+        classification = SLOWDOWN
+    else:
+        classification = WARMUP
+
+    result = OrderedDict()
+    result['classification'] = classification
+    result['segments'] = [s.to_dict() for s in segments]
+    if classification == NO_STEADY_STATE:
+        result['steady_state_iteration'] = None
+        result['time_to_steady_state'] = None
+        result['steady_state_mean'] = None
+        result['steady_state_ci95'] = None
+    else:
+        first = len(segments) - 1
+        while first > 0 and segments[first - 1].is_equivalent(last):
+            first -= 1
+        steady_state = segments[first].start
+        result['steady_state_iteration'] = steady_state
+        result['time_to_steady_state'] = sum(iterations[:steady_state])
+        result['steady_state_mean'] = mean(iterations[steady_state:])
+        result['steady_state_ci95'] = confidence_interval(iterations[steady_state:], statistic=mean)
+    return result
+
+
+def analyze(invocations):
+    """
+    Classify each invocation of a benchmark (a list of per-iteration times) and summarize them: a benchmark whose
+    invocations disagree is inconsistent
+    """
+    results = [classify(iterations) for iterations in invocations if iterations]
+    classifications = [r['classification'] for r in results]
+    steady = [r for r in results if r['steady_state_iteration'] is not None]
+
+    analysis = OrderedDict()
+    analysis['classification'] = classifications[0] if len(set(classifications)) == 1 else INCONSISTENT
+    analysis['classifications'] = OrderedDict([(c, classifications.count(c)) for c in sorted(set(classifications))])
+    analysis['steady_state_iteration_mean'] = mean([r['steady_state_iteration'] for r in steady]) if steady else None
+    analysis['time_to_steady_state_mean'] = mean([r['time_to_steady_state'] for r in steady]) if steady else None
+    analysis['steady_state_mean'] = mean([r['steady_state_mean'] for r in steady]) if steady else None
+    analysis['invocations'] = results
+    return analysis
+
+
+def load(path):
+    """
+    Per-iteration times from the pickle of warmup/benchmark.py (one invocation per benchmark) or the JSON of run.py
+    :return: a dictionary of benchmark names to lists of invocations
+    """
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        assert data.get('format_version') == 1, 'Unsupported results format: %s' % data.get('format_version')
+        series = OrderedDict()
+        for interpreter, benchmarks in data['results'].items():
+            for name, result in benchmarks.items():
+                series['%s %s' % (interpreter, name)] = [i['ticks'] for i in result['invocations']]
+        return series
+    with open(path, 'rb') as f:
+        return OrderedDict([(name, [ticks]) for (name, ticks) in pickle.load(f).items()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify the warmup behavior of benchmarks from their per-iteration '
+                                                 'times with changepoint analysis and write the results as JSON')
+    parser.add_argument('input', nargs='?', default=PATH_TO_PICKLED_DATA,
+                        help='the pickle of warmup/benchmark.py or the JSON of run.py; default: %s' %
+                             PATH_TO_PICKLED_DATA)
+    parser.add_argument('-o', '--output', default=PATH_TO_ANALYSIS, help='default: %s' % PATH_TO_ANALYSIS)
+    args = parser.parse_args()
+
+    data = OrderedDict()
+    data['format_version'] = FORMAT_VERSION
+    data['input'] = args.input
+    data['benchmarks'] = OrderedDict()
+    for name, invocations in load(args.input).items():
+        analysis = analyze(invocations)
+        data['benchmarks'][name] = analysis
+        logging.info("%s: %s, steady state after %s iterations (%s ticks) at %s ticks per iteration", name,
+                     analysis['classification'], analysis['steady_state_iteration_mean'],
+                     analysis['time_to_steady_state_mean'], analysis['steady_state_mean'])
+
+    if os.path.dirname(args.output) and not os.path.isdir(os.path.dirname(args.output)):
+        os.makedirs(os.path.dirname(args.output))
+    logging.info("Saving analysis to: %s", args.output)
+    with open(args.output, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import logging
+import re
+import sys
+from collections import Counter
+
+# setup logging
+logging.basicConfig(level=logging.INFO)
+
+"""
+Count the operations in the optimized traces of a PYPYLOG file (e.g. PYPYLOG=jit-log-opt:var/while-1m.log
+bin/tiger-interpreter src/benchmark/while_loop/while-1m.tig); for each loop and bridge, print the total number of
+operations and the number of each kind of heap operation, since these show whether environment slots stay in registers
+"""
+HEAP_OPERATIONS = ['getfield_gc', 'setfield_gc', 'getarrayitem_gc', 'setarrayitem_gc', 'new_with_vtable', 'new_array',
+                   'call', 'guard_not_invalidated', 'guard_class', 'guard_value']
+
+path = sys.argv[1] if len(sys.argv) > 1 else 'var/while-1m.log'
+with open(path, 'r') as f:
+    logs = f.read()
+
+blocks = re.findall('\{jit-log-opt-(?:loop|bridge)(.*?)jit-log-opt-(?:loop|bridge)\}', logs, re.MULTILINE | re.DOTALL)
+if not blocks:
+    logging.error("No optimized traces found in %s; was PYPYLOG set to include jit-log-opt?", path)
+    sys.exit(1)
+
+for block in blocks:
+    lines = block.split('\n')
+    header = re.search('# (Loop|Bridge).*', block)
+    operations = Counter()
+    for line in lines:
+        match = re.match('\s*(?:\+\d+:\s*)?(?:[ifpr]\d+\s*=\s*)?([a-z_]+)\(', line)
+        if match:
+            operation = match.group(1)
+            for kind in HEAP_OPERATIONS:
+                if operation.startswith(kind):
+                    operations[kind] += 1
+            operations['total'] += 1
+    print header.group(0) if header else '# (unnamed trace)'
+    print '\ttotal operations: %d' % operations['total']
+    for kind in HEAP_OPERATIONS:
+        print '\t%s: %d' % (kind, operations[kind])
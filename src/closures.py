@@ -0,0 +1,101 @@
+from src.ast import Program, LValue, RecordLValue, ArrayLValue, Assign, Let, FunctionCall, FunctionDeclaration, \
+    FunctionParameter, VariableDeclaration
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class Closure:
+    """
+    What a function needs from the scopes enclosing it: the outer variables (and parameters) its body, including the
+    bodies of the functions nested in it, reads or assigns--its free variables--and the outer functions it calls. A
+    captured variable that is assigned anywhere after its declaration must be shared with the enclosing scope (as a
+    cell, in classic closure conversion); the others may be copied into the closure (or, see lambda_lifting.py,
+    passed as arguments)
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.captured = []  # declarations, in the order of their first use
+        self.mutable = {}  # the keys of the captured declarations that are assigned
+        self.called = []  # outer (non-native) function declarations, in the order of their first call
+
+    def is_mutable(self, declaration):
+        return compute_unique_id(declaration) in self.mutable
+
+    def captures_mutable(self):
+        return len(self.mutable) > 0
+
+    def to_string(self):
+        captured = []
+        for declaration in self.captured:
+            captured.append('%s(%s)' % (declaration.name, 'cell' if self.is_mutable(declaration) else 'value'))
+        called = [function.name for function in self.called]
+        return 'closure: function=%s captured=[%s] calls=[%s] location=%s' % (
+            self.function.name, ', '.join(captured), ', '.join(called),
+            self.function.location.to_string() if self.function.location is not None else '<unknown>')
+
+
+class ClosureAnalysis:
+    """
+    Find the free variables of each function declared in a program (see Closure), using the declarations that
+    transform_lvalues bound each name to: a name is free in a function when its declaration belongs to a scope (a let
+    or function) outside of the function
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.program = program
+        self.assigned = {}  # declarations assigned to anywhere in the program
+        for node in DepthFirstAstIterator(program):
+            if isinstance(node, Assign) and node.lvalue.next is None:
+                self.assigned[compute_unique_id(node.lvalue.declaration)] = True
+
+    def analyze(self):
+        """
+        :return: a Closure for each function in the program, in the order of their declarations
+        """
+        closures = []
+        for node in DepthFirstAstIterator(self.program):
+            if isinstance(node, FunctionDeclaration):
+                closures.append(self.analyze_function(node))
+        return closures
+
+    def analyze_function(self, function):
+        nodes = [node for node in DepthFirstAstIterator(function.body)]
+        inner = {compute_unique_id(function): True}  # the scopes declared within the function
+        for node in nodes:
+            if isinstance(node, Let) or isinstance(node, FunctionDeclaration):
+                inner[compute_unique_id(node)] = True
+
+        closure = Closure(function)
+        seen = {}
+        for node in nodes:
+            if isinstance(node, LValue) and not isinstance(node, RecordLValue) and not isinstance(node, ArrayLValue):
+                declaration = node.declaration
+                if isinstance(declaration, VariableDeclaration) or isinstance(declaration, FunctionParameter):
+                    key = compute_unique_id(declaration)
+                    if key not in seen and compute_unique_id(declaration.parent) not in inner:
+                        seen[key] = True
+                        closure.captured.append(declaration)
+                        if key in self.assigned:
+                            closure.mutable[key] = True
+            elif isinstance(node, FunctionCall):
+                declaration = node.declaration
+                if isinstance(declaration, FunctionDeclaration):
+                    key = compute_unique_id(declaration)
+                    if key not in seen and compute_unique_id(declaration) not in inner:
+                        seen[key] = True
+                        closure.called.append(declaration)
+        return closure
+
+
+def analyze_closures(program):
+    """
+    :return: a Closure for each function in the program (see ClosureAnalysis)
+    """
+    return ClosureAnalysis(program).analyze()
@@ -0,0 +1,352 @@
+from src.ast import Program, Exp, Declaration, IntegerValue, NilValue, StringValue, LValue, RecordLValue, ArrayLValue, \
+    ArrayCreation, RecordCreation, Assign, Sequence, Let, FunctionCall, If, While, For, BinaryOperation, Multiply, \
+    Divide, Add, Subtract, GreaterThanOrEquals, LessThanOrEquals, Equals, NotEquals, GreaterThan, LessThan, And, Or, \
+    VariableDeclaration, FunctionDeclaration
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+"""
+Prefix of the names of the temporary variables introduced by the pass; it cannot appear in Tiger source, so the
+temporaries never shadow (or are shadowed by) a program's own names
+"""
+TEMPORARY_PREFIX = '$cse'
+
+"""
+The Tiger operator of each binary operation, for reporting eliminated expressions
+"""
+OPERATOR_SYMBOLS = [(Multiply, '*'), (Divide, '/'), (Add, '+'), (Subtract, '-'), (GreaterThanOrEquals, '>='),
+                    (LessThanOrEquals, '<='), (Equals, '='), (NotEquals, '<>'), (GreaterThan, '>'), (LessThan, '<'),
+                    (And, '&'), (Or, '|')]
+
+
+class EliminatedExpression:
+    """
+    An expression evaluated more than once in a block, now evaluated once into a temporary; see
+    CommonSubexpressionElimination
+    """
+
+    def __init__(self, text, occurrences, temporary, location):
+        self.text = text
+        self.occurrences = occurrences
+        self.temporary = temporary
+        self.location = location
+
+    def to_string(self):
+        return 'cse: expression=%s occurrences=%d temporary=%s location=%s' % (
+            self.text, self.occurrences, self.temporary,
+            self.location.to_string() if self.location is not None else '<unknown>')
+
+
+class Occurrence:
+    """
+    Where an expression appears: the field of its parent (and the position, for list fields) that refers to it
+    """
+
+    def __init__(self, node, parent, field, index):
+        self.node = node
+        self.parent = parent
+        self.field = field
+        self.index = index
+
+    def replace(self, replacement):
+        parent = self.parent
+        if self.field == 'left':
+            assert isinstance(parent, BinaryOperation)
+            parent.left = replacement
+        elif self.field == 'right':
+            assert isinstance(parent, BinaryOperation)
+            parent.right = replacement
+        elif self.field == 'expression' and isinstance(parent, ArrayLValue):
+            parent.expression = replacement
+        elif self.field == 'expression' and isinstance(parent, Assign):
+            parent.expression = replacement
+        elif self.field == 'expression' and isinstance(parent, VariableDeclaration):
+            parent.expression = replacement
+        elif self.field == 'expressions' and isinstance(parent, Sequence):
+            parent.expressions[self.index] = replacement
+        elif self.field == 'expressions' and isinstance(parent, Let):
+            parent.expressions[self.index] = replacement
+        elif self.field == 'arguments':
+            assert isinstance(parent, FunctionCall)
+            parent.arguments[self.index] = replacement
+        elif self.field == 'length_expression':
+            assert isinstance(parent, ArrayCreation)
+            parent.length_expression = replacement
+        elif self.field == 'initial_value_expression':
+            assert isinstance(parent, ArrayCreation)
+            parent.initial_value_expression = replacement
+        elif self.field == 'condition':
+            assert isinstance(parent, If)
+            parent.condition = replacement
+        else:
+            raise ValueError('Unable to replace the %s field of %s' % (self.field, parent.__class__.__name__))
+
+
+class Block:
+    """
+    The pure expressions evaluated, in order, by straight-line code (no branches or loops) in one scope. Expressions
+    are keyed by their structure and by the versions of the variables (and, for reads through records and arrays, of
+    the heap) they read, so two occurrences with the same key compute the same value: assigning to a variable starts a
+    new version of it, storing into a record or array starts a new version of the heap, and anything that may do either
+    (a function call, a nested loop, let or conditional) starts a new epoch for all of them
+    """
+
+    def __init__(self):
+        self.keys = []  # in the order of their first occurrence
+        self.occurrences = {}
+        self.versions = {}
+        self.heap = 0
+        self.epoch = 0
+
+    def record(self, key, occurrence):
+        key = '%d|%s' % (self.epoch, key)
+        if key in self.occurrences:
+            self.occurrences[key].append(occurrence)
+        else:
+            self.keys.append(key)
+            self.occurrences[key] = [occurrence]
+
+    def version(self, declaration):
+        return self.versions.get(compute_unique_id(declaration), 0)
+
+    def assign(self, declaration):
+        self.versions[compute_unique_id(declaration)] = self.version(declaration) + 1
+
+    def store(self):
+        self.heap += 1
+
+    def barrier(self):
+        self.epoch += 1
+
+
+class CommonSubexpressionElimination:
+    """
+    Find the pure expressions--arithmetic, comparisons and reads of record fields and array elements--that a block of
+    straight-line code evaluates more than once with the same inputs (e.g. a[i].next.val or n * 8 + k) and evaluate
+    them once: the first occurrence becomes (t := e; t) and the others read t, a temporary variable appended to the
+    declarations of the let that encloses the block. Blocks are the declarations of a let and, separately, its body,
+    plus the bodies of the conditionals and loops within them; code in functions without a let of their own is left
+    alone since the function has no slot to keep a temporary in. Larger expressions are eliminated before the
+    expressions inside them. The program must have been transformed by transform_lvalues
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.program = program
+        self.eliminated = []
+        self.temporaries = 0
+
+    def run(self):
+        """
+        :return: the list of EliminatedExpressions, e.g. for reporting
+        """
+        self.region(self.program, None)
+        return self.eliminated
+
+    def region(self, node, scope):
+        """Optimize a node that starts new straight-line code, e.g. the body of a loop"""
+        block = Block()
+        self.visit(node, None, '', 0, block, scope)
+        self.eliminate(block, scope)
+
+    def let(self, let):
+        # the temporaries are initialized after the other declarations, so a temporary assigned in a declaration must
+        # not be read in the body: the declarations and the body are separate blocks
+        block = Block()
+        for declaration in let.declarations:
+            if isinstance(declaration, VariableDeclaration):
+                self.visit(declaration.expression, declaration, 'expression', 0, block, let)
+            elif isinstance(declaration, FunctionDeclaration):
+                self.region(declaration.body, None)
+        self.eliminate(block, let)
+
+        block = Block()
+        for i in range(len(let.expressions)):
+            self.visit(let.expressions[i], let, 'expressions', i, block, let)
+        self.eliminate(block, let)
+
+    def visit(self, node, parent, field, index, block, scope):
+        """
+        Record the pure expressions in the node, in evaluation order
+        :return: the key of the node if it is pure or the empty string
+        """
+        if isinstance(node, IntegerValue):
+            return 'i%d' % node.integer
+        elif isinstance(node, NilValue):
+            return 'nil'
+        elif isinstance(node, StringValue):
+            string = node.get_string()
+            return 's%d:%s' % (len(string), string)
+        elif isinstance(node, LValue):
+            return self.visit_read(node, parent, field, index, block, scope)
+        elif isinstance(node, BinaryOperation):
+            left = self.visit(node.left, node, 'left', 0, block, scope)
+            right = self.visit(node.right, node, 'right', 0, block, scope)
+            if not left or not right:
+                return ''
+            key = '(%s %s %s)' % (node.__class__.__name__, left, right)
+            if parent is not None:
+                block.record(key, Occurrence(node, parent, field, index))
+            return key
+        elif isinstance(node, Sequence):
+            for i in range(len(node.expressions)):
+                self.visit(node.expressions[i], node, 'expressions', i, block, scope)
+        elif isinstance(node, Assign):
+            self.visit(node.expression, node, 'expression', 0, block, scope)
+            self.visit_indices(node.lvalue, block, scope)
+            if node.lvalue.next is None:
+                block.assign(node.lvalue.declaration)
+            else:
+                block.store()
+        elif isinstance(node, FunctionCall):
+            for i in range(len(node.arguments)):
+                self.visit(node.arguments[i], node, 'arguments', i, block, scope)
+            block.barrier()
+        elif isinstance(node, ArrayCreation):
+            self.visit(node.length_expression, node, 'length_expression', 0, block, scope)
+            self.visit(node.initial_value_expression, node, 'initial_value_expression', 0, block, scope)
+        elif isinstance(node, RecordCreation):
+            # the fields are evaluated in the order of the record type, not of the expression
+            for name in node.fields:
+                self.region(node.fields[name], scope)
+            block.barrier()
+        elif isinstance(node, If):
+            self.visit(node.condition, node, 'condition', 0, block, scope)
+            self.region(node.body_if_true, scope)
+            if node.body_if_false is not None:
+                self.region(node.body_if_false, scope)
+            block.barrier()
+        elif isinstance(node, While):
+            self.region(node.condition, scope)
+            self.region(node.body, scope)
+            block.barrier()
+        elif isinstance(node, For):
+            self.let(node.while_expression)
+            block.barrier()
+        elif isinstance(node, Let):
+            self.let(node)
+            block.barrier()
+        else:
+            block.barrier()  # e.g. break
+        return ''
+
+    def visit_read(self, lvalue, parent, field, index, block, scope):
+        declaration = lvalue.declaration
+        assert isinstance(declaration, Declaration)
+        parts = ['v%d.%d' % (compute_unique_id(declaration), block.version(declaration))]
+        pure = True
+        link = lvalue.next
+        while link is not None:
+            if isinstance(link, ArrayLValue):
+                key = self.visit(link.expression, link, 'expression', 0, block, scope)
+                if not key:
+                    pure = False
+                parts.append('[%s]' % key)
+            elif isinstance(link, RecordLValue):
+                parts.append('.%s' % link.name)
+            link = link.next
+        if not pure:
+            return ''
+        if lvalue.next is None:
+            return ''.join(parts)  # reading a plain variable is as cheap as reading a temporary
+        parts.append('@%d' % block.heap)
+        key = ''.join(parts)
+        if parent is not None:
+            block.record(key, Occurrence(lvalue, parent, field, index))
+        return key
+
+    def visit_indices(self, lvalue, block, scope):
+        """The indices of an assignment's destination are evaluated after its value"""
+        link = lvalue.next
+        while link is not None:
+            if isinstance(link, ArrayLValue):
+                self.visit(link.expression, link, 'expression', 0, block, scope)
+            link = link.next
+
+    def eliminate(self, block, scope):
+        if not isinstance(scope, Let):
+            return
+        removed = {}
+        # an expression is recorded after the expressions inside it, so visiting the keys in reverse order of their
+        # first occurrence eliminates larger expressions first
+        for k in range(len(block.keys) - 1, -1, -1):
+            occurrences = [o for o in block.occurrences[block.keys[k]] if compute_unique_id(o.node) not in removed]
+            if len(occurrences) < 2:
+                continue
+
+            first = occurrences[0].node
+            temporary = self.declare_temporary(scope)
+            wrapped = Sequence([Assign(self.read(temporary, first), first), self.read(temporary, first)])
+            wrapped.location = first.location
+            occurrences[0].replace(wrapped)
+            for occurrence in occurrences[1:]:
+                for node in DepthFirstAstIterator(occurrence.node):
+                    removed[compute_unique_id(node)] = True
+                occurrence.replace(self.read(temporary, occurrence.node))
+            self.eliminated.append(EliminatedExpression(to_source(first), len(occurrences), temporary.name,
+                                                        first.location))
+
+    def declare_temporary(self, let):
+        temporary = VariableDeclaration('%s%d' % (TEMPORARY_PREFIX, self.temporaries), None, NilValue(), let,
+                                        len(let.declarations))
+        self.temporaries += 1
+        let.declarations.append(temporary)
+        return temporary
+
+    @staticmethod
+    def read(temporary, replaced):
+        lvalue = LValue(temporary.name, None, temporary)
+        lvalue.location = replaced.location
+        return lvalue
+
+
+def to_source(expression):
+    """Print a pure expression as Tiger source"""
+    if isinstance(expression, IntegerValue):
+        return str(expression.integer)
+    elif isinstance(expression, NilValue):
+        return 'nil'
+    elif isinstance(expression, StringValue):
+        return '"%s"' % expression.get_string()
+    elif isinstance(expression, LValue):
+        parts = [expression.name]
+        link = expression.next
+        while link is not None:
+            if isinstance(link, ArrayLValue):
+                parts.append('[%s]' % to_source(link.expression))
+            else:
+                parts.append('.%s' % link.name)
+            link = link.next
+        return ''.join(parts)
+    elif isinstance(expression, BinaryOperation):
+        return '%s %s %s' % (to_operand_source(expression.left), operator_symbol(expression),
+                             to_operand_source(expression.right))
+    else:
+        assert isinstance(expression, Exp)
+        return expression.__class__.__name__
+
+
+def to_operand_source(expression):
+    if isinstance(expression, BinaryOperation):
+        return '(%s)' % to_source(expression)
+    return to_source(expression)
+
+
+def operator_symbol(operation):
+    for cls, symbol in OPERATOR_SYMBOLS:
+        if isinstance(operation, cls):
+            return symbol
+    return operation.__class__.__name__
+
+
+def eliminate_common_subexpressions(program):
+    """
+    Evaluate each repeated pure expression in a block once (see CommonSubexpressionElimination)
+    :return: the list of EliminatedExpressions, e.g. for reporting
+    """
+    return CommonSubexpressionElimination(program).run()
@@ -0,0 +1,269 @@
+from src.ast import Program, Declaration, LValue, ArrayLValue, Assign, Sequence, Let, FunctionCall, If, While, For, \
+    Break, BinaryOperation, Divide, ArrayCreation, RecordCreation, VariableDeclaration, FunctionDeclaration, \
+    NativeFunctionDeclaration
+from src.environment import Environment
+from src.memoization import PURE_NATIVE_FUNCTIONS
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+"""
+The side-effect-free natives (see memoization.PURE_NATIVE_FUNCTIONS) that raise an error for some arguments
+"""
+FAILING_NATIVE_FUNCTIONS = ['substring', 'chr']
+
+
+class RemovedCode:
+    """
+    A declaration or store removed by DeadCodeElimination
+    """
+
+    def __init__(self, kind, name, location):
+        self.kind = kind
+        self.name = name
+        self.location = location
+
+    def to_string(self):
+        return 'dce: removed=%s name=%s location=%s' % (
+            self.kind, self.name, self.location.to_string() if self.location is not None else '<unknown>')
+
+
+def is_pure(expression):
+    """
+    Whether evaluating an expression can only produce a value, so that removing it cannot be observed: it does not
+    assign, call a function other than a few side-effect-free natives, loop or break, nor can it raise an error, as a
+    division (by zero), a read from an array (out of bounds) or a record (nil) or a call of substring or chr can
+    """
+    for node in DepthFirstAstIterator(expression):
+        if isinstance(node, Assign) or isinstance(node, While) or isinstance(node, For) or isinstance(node, Break) \
+                or isinstance(node, Divide):
+            return False
+        elif isinstance(node, LValue) and node.next is not None:
+            return False
+        elif isinstance(node, FunctionCall):
+            declaration = node.declaration
+            if not isinstance(declaration, NativeFunctionDeclaration) or declaration.name not in PURE_NATIVE_FUNCTIONS \
+                    or declaration.name in FAILING_NATIVE_FUNCTIONS:
+                return False
+    return True
+
+
+def reads(expression, declaration):
+    for node in DepthFirstAstIterator(expression):
+        if isinstance(node, LValue) and node.declaration is declaration:
+            return True
+    return False
+
+
+def is_plain_store(expression):
+    return isinstance(expression, Assign) and expression.lvalue.next is None
+
+
+class DeadCodeElimination:
+    """
+    Remove the code whose result is never used, using the declarations that transform_lvalues bound each name to. A
+    liveness (mark) phase starts from the body of the program and follows references: a variable becomes live when it
+    is read, and only then are its initializer and the values stored to it visited; a function becomes live when it is
+    called, and only then is its body visited. Variables whose initializer or a store has side effects are always
+    live. The sweep phase then removes, from each let, the variables and functions that are not live (type
+    declarations are kept since array types refer to their element types by name only) and renumbers the remaining
+    declarations so that the let's environment only has slots for them; lets left without declarations become
+    sequences. Stores to variables that are not live are removed, as are pure stores that are overwritten, within the
+    same sequence, before the variable is read (or anything else happens that might read it, such as a call)
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.program = program
+        self.live = {}  # note that declarations are keyed by identity since they are compared structurally by equals()
+        self.stores = {}  # the pure values stored to each variable, visited once the variable is live
+        self.stack = []
+        self.removed = []
+
+    def run(self):
+        """
+        :return: the list of RemovedCode, e.g. for reporting
+        """
+        self.mark()
+        self.sweep(self.program)
+        return self.removed
+
+    # LIVENESS
+
+    def mark(self):
+        self.stack.append(self.program)
+        while self.stack:
+            node = self.stack.pop()
+            if node is None:
+                continue  # e.g. an if without an else
+            elif isinstance(node, LValue):
+                self.mark_live(node.declaration)
+                self.push_indices(node)
+            elif isinstance(node, Assign):
+                self.push_indices(node.lvalue)
+                declaration = node.lvalue.declaration
+                if node.lvalue.next is None and is_pure(node.expression) and not self.is_live(declaration):
+                    key = compute_unique_id(declaration)
+                    if key not in self.stores:
+                        self.stores[key] = []
+                    self.stores[key].append(node.expression)
+                else:
+                    # storing into a record or array reads the variable holding it
+                    self.mark_live(declaration)
+                    self.stack.append(node.expression)
+            elif isinstance(node, FunctionCall):
+                self.mark_live(node.declaration)
+                for argument in node.arguments:
+                    self.stack.append(argument)
+            elif isinstance(node, Let):
+                for declaration in node.declarations:
+                    if isinstance(declaration, VariableDeclaration) and not is_pure(declaration.expression):
+                        self.mark_live(declaration)
+                for expression in node.expressions:
+                    self.stack.append(expression)
+            else:
+                self.stack.extend(node.children())
+
+    def mark_live(self, declaration):
+        if not isinstance(declaration, Declaration) or self.is_live(declaration):
+            return
+        key = compute_unique_id(declaration)
+        self.live[key] = True
+        if isinstance(declaration, VariableDeclaration):
+            self.stack.append(declaration.expression)
+            if key in self.stores:
+                self.stack.extend(self.stores[key])
+                del self.stores[key]
+        elif isinstance(declaration, FunctionDeclaration):
+            self.stack.append(declaration.body)
+
+    def is_live(self, declaration):
+        return compute_unique_id(declaration) in self.live
+
+    def push_indices(self, lvalue):
+        link = lvalue.next
+        while link is not None:
+            if isinstance(link, ArrayLValue):
+                self.stack.append(link.expression)
+            link = link.next
+
+    # REMOVAL
+
+    def sweep(self, node):
+        """
+        Remove the dead code within a node
+        :return: the node or, if it is itself dead, what replaces it
+        """
+        if isinstance(node, Let):
+            self.sweep_let(node)
+            if not node.declarations and node is not self.program:
+                sequence = Sequence(node.expressions)
+                sequence.location = node.location
+                return sequence
+        elif isinstance(node, Sequence):
+            node.expressions = self.sweep_list(node.expressions)
+        elif isinstance(node, Assign):
+            if self.is_dead_store(node):
+                self.removed.append(RemovedCode('store', node.lvalue.name, node.location))
+                return Sequence([])
+            self.sweep_indices(node.lvalue)
+            node.expression = self.sweep(node.expression)
+        elif isinstance(node, LValue):
+            self.sweep_indices(node)
+        elif isinstance(node, FunctionCall):
+            for i in range(len(node.arguments)):
+                node.arguments[i] = self.sweep(node.arguments[i])
+        elif isinstance(node, If):
+            node.condition = self.sweep(node.condition)
+            node.body_if_true = self.sweep(node.body_if_true)
+            if node.body_if_false is not None:
+                node.body_if_false = self.sweep(node.body_if_false)
+        elif isinstance(node, While):
+            node.condition = self.sweep(node.condition)
+            node.body = self.sweep(node.body)
+        elif isinstance(node, For):
+            self.sweep_let(node.while_expression)  # keep the let, which declares the loop variable
+        elif isinstance(node, BinaryOperation):
+            node.left = self.sweep(node.left)
+            node.right = self.sweep(node.right)
+        elif isinstance(node, ArrayCreation):
+            node.length_expression = self.sweep(node.length_expression)
+            node.initial_value_expression = self.sweep(node.initial_value_expression)
+        elif isinstance(node, RecordCreation):
+            for name in node.fields:
+                node.fields[name] = self.sweep(node.fields[name])
+        return node
+
+    def sweep_let(self, let):
+        declarations = []
+        for declaration in let.declarations:
+            if isinstance(declaration, VariableDeclaration):
+                if not self.is_live(declaration):
+                    self.removed.append(RemovedCode('variable', declaration.name, declaration.location))
+                    continue
+                declaration.expression = self.sweep(declaration.expression)
+            elif isinstance(declaration, FunctionDeclaration):
+                if not self.is_live(declaration):
+                    self.removed.append(RemovedCode('function', declaration.name, declaration.location))
+                    continue
+                declaration.body = self.sweep(declaration.body)
+            declaration.index = len(declarations)
+            declarations.append(declaration)
+        let.declarations = declarations
+        let.environment = Environment.empty(None, len(declarations))
+        let.expressions = self.sweep_list(let.expressions)
+
+    def sweep_list(self, expressions):
+        swept = []
+        for i in range(len(expressions)):
+            expression = expressions[i]
+            last = i == len(expressions) - 1
+            if not last and (self.is_dead_store(expression) or self.is_overwritten(expressions, i)):
+                assert isinstance(expression, Assign)
+                self.removed.append(RemovedCode('store', expression.lvalue.name, expression.location))
+                continue
+            swept.append(self.sweep(expression))
+        return swept
+
+    def sweep_indices(self, lvalue):
+        link = lvalue.next
+        while link is not None:
+            if isinstance(link, ArrayLValue):
+                link.expression = self.sweep(link.expression)
+            link = link.next
+
+    def is_dead_store(self, expression):
+        return is_plain_store(expression) and not self.is_live(expression.lvalue.declaration)
+
+    @staticmethod
+    def is_overwritten(expressions, i):
+        """Whether expressions[i] is a pure store that a later expression of the same list overwrites unread"""
+        store = expressions[i]
+        if not is_plain_store(store) or not is_pure(store.expression):
+            return False
+        declaration = store.lvalue.declaration
+        for j in range(i + 1, len(expressions)):
+            expression = expressions[j]
+            if isinstance(expression, Assign):
+                if not is_pure(expression.expression) or not is_pure(expression.lvalue) \
+                        or reads(expression.expression, declaration):
+                    return False
+                elif expression.lvalue.next is None and expression.lvalue.declaration is declaration:
+                    return True
+                elif reads(expression.lvalue, declaration):
+                    return False
+            elif not is_pure(expression) or reads(expression, declaration):
+                return False
+        return False
+
+
+def eliminate_dead_code(program):
+    """
+    Remove unused declarations and stores (see DeadCodeElimination)
+    :return: the list of RemovedCode, e.g. for reporting
+    """
+    return DeadCodeElimination(program).run()
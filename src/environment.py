@@ -1,6 +1,30 @@
-# By importing the specific type of Environment here we ensure that, as long as clients import this file, they will
-# receive the correct environment implementation
-from src.environments.environment_level_for_bindings import Environment
+import os
+
 from src.environments.environment_interface import EnvironmentInterface
 
+# By importing the specific type of Environment here we ensure that, as long as clients import this file, they will
+# receive the correct environment implementation. The implementation is chosen when this file is first imported (i.e.
+# at translation time for the RPython binaries) from the TIGER_ENV variable, e.g. `make binaries ENV=immutable-bindings`
+# or `TIGER_ENV=without-display python src/main/tiger_interpreter.py ...`. Only the implementations that support the
+# index-based get/set used by the AST are selectable; environment_with_paths.py and environment_with_dictionary_tree.py
+# mutate a single display object on push/pop and so cannot be referenced from each Let and FunctionDeclaration
+ENVIRONMENT_IMPLEMENTATIONS = ['bindings', 'immutable-bindings', 'without-display']
+DEFAULT_ENVIRONMENT_IMPLEMENTATION = 'bindings'
+
+ENVIRONMENT_IMPLEMENTATION = os.environ.get('TIGER_ENV', DEFAULT_ENVIRONMENT_IMPLEMENTATION)
+if ENVIRONMENT_IMPLEMENTATION == 'bindings':
+    from src.environments.environment_level_for_bindings import Environment
+elif ENVIRONMENT_IMPLEMENTATION == 'immutable-bindings':
+    from src.environments.environment_immutable_level_for_bindings import Environment
+elif ENVIRONMENT_IMPLEMENTATION == 'without-display':
+    from src.environments.environment_without_display import IndexedEnvironment as Environment
+else:
+    raise ImportError('Unknown environment implementation TIGER_ENV=%s; expected one of: %s' % (
+        ENVIRONMENT_IMPLEMENTATION, ', '.join(ENVIRONMENT_IMPLEMENTATIONS)))
+
 assert issubclass(Environment, EnvironmentInterface)
+
+"""
+The JIT drivers can only declare their 'env' reds virtualizable if the implementation is (see ast.py)
+"""
+ENVIRONMENT_IS_VIRTUALIZABLE = hasattr(Environment, '_virtualizable_')
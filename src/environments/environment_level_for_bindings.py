@@ -2,7 +2,8 @@
 from src.environments.environment_interface import EnvironmentInterface
 
 try:
-    from rpython.rlib.jit import JitDriver, elidable, promote, unroll_safe, jit_debug, we_are_jitted
+    from rpython.rlib.jit import JitDriver, elidable, promote, unroll_safe, jit_debug, we_are_jitted, hint
+    from rpython.rlib.debug import make_sure_not_resized
 except ImportError:
     class JitDriver(object):
         def __init__(self, **kw): pass
@@ -32,6 +33,14 @@ except ImportError:
         return False
 
 
+    def hint(x, **kwds):
+        return x
+
+
+    def make_sure_not_resized(x):
+        return x
+
+
 # end of RPython setup
 
 class Environment(EnvironmentInterface):
@@ -39,21 +48,27 @@ class Environment(EnvironmentInterface):
     Contains the name bindings for the current scope and points to a linked-list of parent scopes; push() and pop()
     return a different environment (either a new one or the parent). To find a name (see __locate__), use the given
     path to iterate through the parents and retrieve the index.
+
+    The slots are a fixed-length array (sized by the number of names declared in the scope) so that the environment
+    can be virtualizable: the JIT drivers in ast.py pass it as the 'env' red, which lets traced loops keep the slots of
+    that environment in registers and only write them back to the heap when the environment escapes.
     """
-    _immutable_ = True
+    _virtualizable_ = ['slots[*]']
+    _immutable_fields_ = ['parent', 'slots']
 
-    def __init__(self, parent, expressions):
+    def __init__(self, parent, slots):
+        self = hint(self, access_directly=True, fresh_virtualizable=True)
         self.parent = parent
-        self.expressions = expressions
+        self.slots = make_sure_not_resized(slots)
 
     def __str__(self):
-        return 'Environment(expressions=%s)' % self.expressions
+        return 'Environment(slots=%s)' % self.slots
 
     @staticmethod
     def empty(parent=None, number_of_names=0):
         assert isinstance(number_of_names, int)
-        expressions = [None] * number_of_names
-        return Environment(parent, expressions)
+        slots = [None] * number_of_names
+        return Environment(parent, slots)
 
     def push(self, number_of_names):
         """Create a new environment level (i.e. frame)"""
@@ -68,8 +83,8 @@ class Environment(EnvironmentInterface):
         """
         Add a name to the current level
         """
-        # assert 0 >= index > len(self.expressions)
-        self.expressions[index] = expression
+        # assert 0 >= index > len(self.slots)
+        self.slots[index] = expression
 
     def set(self, index, expression):
         """
@@ -79,14 +94,14 @@ class Environment(EnvironmentInterface):
 
     def get(self, index):
         """Retrieve a 'name' by index from the topmost level of the environment stack"""
-        # assert 0 >= index > len(self.expressions)
-        return self.expressions[index]
+        # assert 0 >= index > len(self.slots)
+        return self.slots[index]
 
     def unset(self, index):
         """Unset 'name' only in the current level; will not search through the entire environment"""
-        # assert 0 >= index > len(self.expressions)
-        found_expression = self.expressions[index]
-        self.expressions[index] = None
+        # assert 0 >= index > len(self.slots)
+        found_expression = self.slots[index]
+        self.slots[index] = None
         return found_expression
 
     def size(self):
@@ -94,10 +109,11 @@ class Environment(EnvironmentInterface):
         level = self
         number_of_slots = 0
         while level:
-            number_of_slots += len(level.expressions)
+            number_of_slots += len(level.slots)
             level = level.parent
         return number_of_slots
 
     def clone(self):
-        """Clone an environment by copying the stack shallowly"""
-        return Environment(self.parent, self.expressions)
+        """Clone an environment by copying the stack shallowly; the slots are copied since a virtualizable must not
+        share its array with another environment"""
+        return Environment(self.parent, self.slots[:])
@@ -135,3 +135,27 @@ class Environment(EnvironmentInterface):
             level = level.parent
 
         raise EnvironmentError('Expected path (%d, %d) to lead to a valid scope but it did not' % (path[0], index))
+
+
+class IndexedEnvironment(Environment):
+    """
+    Adapts this environment to the index-based get/set used by the AST (see environment_level_for_bindings.py): since
+    names are resolved statically to the environment of the Let or FunctionDeclaration declaring them, every lookup is
+    a path with zero hops
+    """
+    _immutable_ = True
+
+    @staticmethod
+    def empty(parent=None, number_of_names=0):
+        assert isinstance(number_of_names, int)
+        return IndexedEnvironment(parent, [None] * number_of_names, [None] * number_of_names)
+
+    def push(self, number_of_names):
+        """Create a new environment level (i.e. frame)"""
+        return IndexedEnvironment.empty(self, number_of_names)
+
+    def set(self, index, expression):
+        Environment.set(self, (0, index), expression)
+
+    def get(self, index):
+        return Environment.get(self, (0, index))
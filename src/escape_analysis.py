@@ -0,0 +1,243 @@
+from src.ast import Program, LValue, RecordLValue, Assign, Sequence, Let, If, While, RecordCreation, RecordType, \
+    TypeDeclaration, VariableDeclaration, NilValue
+from src.environment import Environment
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class RecordVariable:
+    """
+    A variable initialized with a record creation, e.g. var p := point{x = 1, y = 2}, and what is known of its uses
+    """
+
+    def __init__(self, declaration, let, declaring_type):
+        self.declaration = declaration
+        self.let = let
+        self.declaring_type = declaring_type  # the TypeDeclaration of the record type
+        self.escapes = False
+        self.field_accesses = []  # the LValues reading or storing to one field, e.g. p.x
+        self.creations = []  # the assignments of new records, e.g. p := point{x = 3, y = 4}
+        self.fields = {}  # the declaration of each field, once scalar-replaced
+
+    def field_names(self):
+        record_type = self.declaring_type.type
+        assert isinstance(record_type, RecordType)
+        return [name for name in record_type.field_types]
+
+
+def record_declaration_of(creation):
+    """:return: the TypeDeclaration of the record type created, if it is statically known, or None"""
+    declaration = creation.type_id.declaration
+    if isinstance(declaration, TypeDeclaration) and isinstance(declaration.type, RecordType):
+        for name in declaration.type.field_types:
+            if name not in creation.fields:
+                return None
+        if len(creation.fields) == len(declaration.type.field_types):
+            return declaration
+    return None
+
+
+class EscapeAnalysis:
+    """
+    Find the record variables whose record never escapes: every use of the variable reads or stores one of its fields
+    (p.x, p.x := e) or assigns it a new record of the same type (p := point{...}) in a sequence, let, if or while body
+    (where the assignment can be replaced with one per field; assignments have no value). Since the record is
+    never read as a whole, it is never aliased, passed to or returned from a function or compared, so its fields can
+    live in slots of the let that declares the variable instead of in a RecordValue (see ScalarReplacement)
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.program = program
+        self.variables = {}  # note that declarations are keyed by identity since they are compared structurally
+        self.declared = []  # the same variables, in the order of their declarations
+
+    def find_non_escaping(self):
+        nodes = [node for node in DepthFirstAstIterator(self.program)]
+        statements = {}  # expressions whose value is discarded or returned by a sequence, let, if or while
+        targets = {}  # lvalues assigned to
+        for node in nodes:
+            if isinstance(node, Let):
+                for declaration in node.declarations:
+                    if isinstance(declaration, VariableDeclaration) \
+                            and isinstance(declaration.expression, RecordCreation):
+                        declaring_type = record_declaration_of(declaration.expression)
+                        if declaring_type is not None:
+                            variable = RecordVariable(declaration, node, declaring_type)
+                            self.variables[compute_unique_id(declaration)] = variable
+                            self.declared.append(variable)
+                for expression in node.expressions:
+                    statements[compute_unique_id(expression)] = True
+            elif isinstance(node, Sequence):
+                for expression in node.expressions:
+                    statements[compute_unique_id(expression)] = True
+            elif isinstance(node, If):
+                statements[compute_unique_id(node.body_if_true)] = True
+                if node.body_if_false is not None:
+                    statements[compute_unique_id(node.body_if_false)] = True
+            elif isinstance(node, While):
+                statements[compute_unique_id(node.body)] = True
+            elif isinstance(node, Assign):
+                targets[compute_unique_id(node.lvalue)] = True
+
+        for node in nodes:
+            if isinstance(node, Assign) and node.lvalue.next is None:
+                variable = self.variables.get(compute_unique_id(node.lvalue.declaration), None)
+                if variable is not None:
+                    expression = node.expression
+                    if isinstance(expression, RecordCreation) and compute_unique_id(node) in statements \
+                            and record_declaration_of(expression) is variable.declaring_type:
+                        variable.creations.append(node)
+                    else:
+                        variable.escapes = True
+            elif isinstance(node, LValue) and not isinstance(node, RecordLValue) and node.name is not None:
+                variable = self.variables.get(compute_unique_id(node.declaration), None)
+                if variable is not None and not (node.next is None and compute_unique_id(node) in targets):
+                    if isinstance(node.next, RecordLValue) and node.next.name in variable.field_names():
+                        variable.field_accesses.append(node)
+                    else:
+                        variable.escapes = True
+
+        return [v for v in self.declared if not v.escapes]
+
+
+class ScalarReplacement:
+    """
+    Replace each non-escaping record variable (see EscapeAnalysis) with one variable per field, declared in its place
+    in the same let: var p := point{x = 1, y = 2} becomes var p.x := 1 var p.y := 2 (names that cannot clash with Tiger
+    identifiers), p.x reads and stores the variable p.x and p := point{x = 3, y = 4} becomes (p.x := 3; p.y := 4), so
+    RecordCreation.evaluate no longer allocates a RecordValue and its list of values and reading a field no longer
+    looks it up in the record's type. Fields are evaluated in the order of the record type, as RecordCreation does;
+    when a field's new value reads a field assigned before it, the new values are first kept in temporaries
+    """
+
+    def __init__(self, program):
+        self.program = program
+        self.replaced = []
+        self.temporaries = 0
+
+    def run(self):
+        """
+        :return: the list of the replaced variables' declarations, e.g. for reporting
+        """
+        variables = EscapeAnalysis(self.program).find_non_escaping()
+        replacements = {}
+        lets = {}
+        for variable in variables:
+            self.declare_fields(variable)
+            for access in variable.field_accesses:
+                field = access.next
+                assert isinstance(field, RecordLValue)
+                access.declaration = variable.fields[field.name]
+                access.name = access.declaration.name
+                access.next = field.next
+            for creation in variable.creations:
+                replacements[compute_unique_id(creation)] = self.assign_fields(variable, creation)
+            lets[compute_unique_id(variable.let)] = variable.let
+            self.replaced.append(variable.declaration)
+        self.replace_statements(replacements)
+        for let in lets.values():
+            self.renumber(let)
+        return self.replaced
+
+    def declare_fields(self, variable):
+        creation = variable.declaration.expression
+        assert isinstance(creation, RecordCreation)
+        fields = []
+        for name in variable.field_names():
+            field = VariableDeclaration('%s.%s' % (variable.declaration.name, name), None, creation.fields[name],
+                                        variable.let)
+            field.location = variable.declaration.location
+            variable.fields[name] = field
+            fields.append(field)
+        declarations = []
+        for declaration in variable.let.declarations:
+            if declaration is variable.declaration:
+                declarations.extend(fields)
+            else:
+                declarations.append(declaration)
+        variable.let.declarations = declarations
+
+    def assign_fields(self, variable, assign):
+        creation = assign.expression
+        assert isinstance(creation, RecordCreation)
+        names = variable.field_names()
+        assigned = {}
+        sequential = True
+        for name in names:
+            for node in DepthFirstAstIterator(creation.fields[name]):
+                if isinstance(node, LValue) and compute_unique_id(node.declaration) in assigned:
+                    sequential = False  # the field accesses have already been replaced with reads of the fields
+            assigned[compute_unique_id(variable.fields[name])] = True
+
+        assignments = []
+        if sequential:
+            for name in names:
+                assignments.append(self.assign(variable.fields[name], creation.fields[name], creation))
+        else:
+            temporaries = []
+            for name in names:
+                temporary = VariableDeclaration('$record%d' % self.temporaries, None, NilValue(), variable.let)
+                self.temporaries += 1
+                variable.let.declarations.append(temporary)
+                temporaries.append(temporary)
+                assignments.append(self.assign(temporary, creation.fields[name], creation))
+            for i in range(len(names)):
+                assignments.append(self.assign(variable.fields[names[i]], self.read(temporaries[i], creation),
+                                               creation))
+        sequence = Sequence(assignments)
+        sequence.location = assign.location
+        return sequence
+
+    def assign(self, declaration, expression, replaced):
+        assign = Assign(self.read(declaration, replaced), expression)
+        assign.location = replaced.location
+        return assign
+
+    @staticmethod
+    def read(declaration, replaced):
+        lvalue = LValue(declaration.name, None, declaration)
+        lvalue.location = replaced.location
+        return lvalue
+
+    def replace_statements(self, replacements):
+        if not replacements:
+            return
+        for node in DepthFirstAstIterator(self.program):
+            if isinstance(node, Let) or isinstance(node, Sequence):
+                expressions = node.expressions
+                for i in range(len(expressions)):
+                    key = compute_unique_id(expressions[i])
+                    if key in replacements:
+                        expressions[i] = replacements[key]
+            elif isinstance(node, If):
+                key = compute_unique_id(node.body_if_true)
+                if key in replacements:
+                    node.body_if_true = replacements[key]
+                if node.body_if_false is not None:
+                    key = compute_unique_id(node.body_if_false)
+                    if key in replacements:
+                        node.body_if_false = replacements[key]
+            elif isinstance(node, While):
+                key = compute_unique_id(node.body)
+                if key in replacements:
+                    node.body = replacements[key]
+
+    @staticmethod
+    def renumber(let):
+        for i in range(len(let.declarations)):
+            let.declarations[i].index = i
+        let.environment = Environment.empty(None, len(let.declarations))
+
+
+def scalar_replace_records(program):
+    """
+    Keep the fields of non-escaping records in let slots (see EscapeAnalysis and ScalarReplacement)
+    :return: the list of the replaced variables' declarations
+    """
+    return ScalarReplacement(program).run()
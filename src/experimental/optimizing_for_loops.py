@@ -179,9 +179,9 @@ class TestOptimizingForLoops(unittest.TestCase):
 
             def evaluate(self, env):
                 env.push()
-                start_value = self.start.evaluate(env)
+                start_value = self.get_start().evaluate(env)
                 assert isinstance(start_value, IntegerValue)
-                end_value = self.end.evaluate(env)
+                end_value = self.get_end().evaluate(env)
                 assert isinstance(end_value, IntegerValue)
 
                 iterator = IntegerValue(start_value.integer)
@@ -189,7 +189,7 @@ class TestOptimizingForLoops(unittest.TestCase):
                     iterator.integer = i
                     env.set_current_level(self.var, iterator)
                     try:
-                        result = loop(self, self.body, env)
+                        result = loop(self, self.get_body(), env)
                         assert result is None
                     except BreakException:
                         break
@@ -299,9 +299,9 @@ class TestOptimizingForLoops(unittest.TestCase):
 
             def evaluate(self, env):
                 env.push()
-                start_value = self.start.evaluate(env)
+                start_value = self.get_start().evaluate(env)
                 assert isinstance(start_value, IntegerValue)
-                end_value = self.end.evaluate(env)
+                end_value = self.get_end().evaluate(env)
                 assert isinstance(end_value, IntegerValue)
 
                 iterator = IntegerValue(start_value.integer)
@@ -309,8 +309,8 @@ class TestOptimizingForLoops(unittest.TestCase):
                     iterator.integer = i
                     env.set_current_level(self.var, iterator)
                     try:
-                        jitdriver.jit_merge_point(code=self, expression=self.body, environment=env)
-                        result = self.body.evaluate(env)
+                        jitdriver.jit_merge_point(code=self, expression=self.get_body(), environment=env)
+                        result = self.get_body().evaluate(env)
                         assert result is None
                     except BreakException:
                         break
@@ -361,18 +361,18 @@ class TestOptimizingForLoops(unittest.TestCase):
 
             def evaluate(self, env):
                 env.push()
-                start_value = self.start.evaluate(env)
+                start_value = self.get_start().evaluate(env)
                 assert isinstance(start_value, IntegerValue)
-                end_value = self.end.evaluate(env)
+                end_value = self.get_end().evaluate(env)
                 assert isinstance(end_value, IntegerValue)
 
                 iterator = IntegerValue(start_value.integer)
                 for i in range(iterator.integer, end_value.integer + 1):
-                    jitdriver.jit_merge_point(code=self, expression=self.body, environment=env)
+                    jitdriver.jit_merge_point(code=self, expression=self.get_body(), environment=env)
                     iterator.integer = i
                     env.set_current_level(self.var, iterator)
                     try:
-                        result = self.body.evaluate(env)
+                        result = self.get_body().evaluate(env)
                         assert result is None
                     except BreakException:
                         break
@@ -421,20 +421,20 @@ class TestOptimizingForLoops(unittest.TestCase):
 
             def evaluate(self, env):
                 env.push()
-                start_value = self.start.evaluate(env)
+                start_value = self.get_start().evaluate(env)
                 assert isinstance(start_value, IntegerValue)
-                end_value = self.end.evaluate(env)
+                end_value = self.get_end().evaluate(env)
                 assert isinstance(end_value, IntegerValue)
 
                 iterator = IntegerValue(start_value.integer)
                 result = None
                 while iterator.integer < end_value.integer + 1:
-                    jitdriver.jit_merge_point(code=self, expression=self.body, environment=env)
+                    jitdriver.jit_merge_point(code=self, expression=self.get_body(), environment=env)
                     promote(end_value)
                     env.set_current_level(self.var, iterator)
 
                     try:
-                        result = self.body.evaluate(env)
+                        result = self.get_body().evaluate(env)
                         assert result is None
                     except BreakException:
                         break
@@ -505,21 +505,21 @@ class TestOptimizingForLoops(unittest.TestCase):
 
             def evaluate(self, env):
                 env.push()
-                start_value = self.start.evaluate(env)
+                start_value = self.get_start().evaluate(env)
                 assert isinstance(start_value, IntegerValue)
-                end_value = self.end.evaluate(env)
+                end_value = self.get_end().evaluate(env)
                 assert isinstance(end_value, IntegerValue)
 
                 iterator = IntegerValue(start_value.integer)
                 result = None
                 while iterator.integer < end_value.integer + 1:
-                    jitdriver.jit_merge_point(code=self, expression=self.body, environment=env, iterator=iterator,
+                    jitdriver.jit_merge_point(code=self, expression=self.get_body(), environment=env, iterator=iterator,
                                               end_value=end_value, level=env.local_variables)
                     promote(end_value)
                     env.set_current_level(self.var, iterator)
 
                     try:
-                        result = self.body.evaluate(env)
+                        result = self.get_body().evaluate(env)
                         assert result is None
                     except BreakException:
                         break
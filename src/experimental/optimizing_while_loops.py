@@ -69,6 +69,24 @@ class TestOptimizingWhileLoops(unittest.TestCase):
 
         self.assertEqual(interpretation_mechanisms.meta_interpret(test, []), 100)
 
+    def test_virtualizable_environment(self):
+        """
+        The same program as src/benchmark/while_loop/while-1m.tig (with fewer iterations) using the current
+        implementation, in which the environment passed as the 'env' red of while_jitdriver is virtualizable; compare
+        the 'loop with N ops' count printed for this loop against test_current_implementation above: the reads and
+        writes of 'i' should no longer appear as getarrayitem_gc/setarrayitem_gc on the environment's slots
+        """
+
+        def test():
+            program = Parser('let var i : int := 0 in (while i < 10000 do i := i + 1; i) end').parse(
+                create_native_functions())
+            environment = create_environment_with_natives()
+            result = program.evaluate(environment)
+            assert isinstance(result, IntegerValue)
+            return result.integer
+
+        self.assertEqual(interpretation_mechanisms.meta_interpret(test, []), 10000)
+
     def test_larger_merge_point_key(self):
         """
         This has the same merge point location as the current implementation but uses a merge point key with more
@@ -0,0 +1,118 @@
+from src.ast import Program, StringValue, interned_hashes
+from src.parser import Parser
+
+"""
+Fields that do not contribute to the structure of a node: where it was parsed, what scopes.py binds it to and the state
+it accumulates while being evaluated; RecordType.field_positions is derived from its field_types
+"""
+NON_STRUCTURAL_FIELDS = frozenset(['location', 'declaration', 'parent', 'index', 'environment', 'memoization',
+                                   'field_positions'])
+
+
+class HashConsingFactory:
+    """
+    Builds hash-consed ASTs: each structurally distinct subtree exists once per factory, so two interned nodes are
+    equal (in the sense of Program.equals) exactly when they are the same object and a subexpression repeated in a
+    program (e.g. one written by a code generator) takes no extra memory. The structural hash of each interned node is
+    cached in src.ast.interned_hashes (which keeps the node alive); like the hash of a StringValue, it depends only on the node's structure, so trees interned by
+    different factories (or not interned at all, see structural_hash()) hash alike.
+
+    Hash-consed trees are for inspecting and comparing programs (e.g. tests and analyses), not for evaluating them:
+    a shared LValue may appear in scopes that bind it to different declarations, so transform_lvalues refuses them;
+    also, a shared node keeps the location of its first occurrence. This runs hosted by CPython only (it relies on
+    tuples of mixed types as dictionary keys), so tiger-interpreter never imports it
+    """
+
+    def __init__(self):
+        self.nodes = {}  # structural keys to the one node with that structure
+        self.interned = {}  # id() of each interned node to the node, so it is not interned twice
+
+    def parse(self, text, source_file=None):
+        return self.intern(Parser(text, source_file).parse())
+
+    def intern(self, node):
+        """
+        Intern a tree bottom-up: the children of `node` are replaced with their interned versions and then `node`
+        itself is returned unless an equal node has been interned already, in which case that one is returned
+        """
+        if self.is_interned(node):
+            return node
+        for name in structural_fields(node):
+            setattr(node, name, self.intern_value(getattr(node, name)))
+        key = (node.__class__,) + tuple([self.key_of(getattr(node, name)) for name in structural_fields(node)])
+        if isinstance(node, StringValue):
+            key = (StringValue, node.get_string())  # ropes and flat strings with the same characters are equal
+        existing = self.nodes.get(key)
+        if existing is not None:
+            return existing
+        interned_hashes.put(node, structural_hash(node))
+        self.nodes[key] = node
+        self.interned[id(node)] = node
+        return node
+
+    def intern_value(self, value):
+        if isinstance(value, Program):
+            return self.intern(value)
+        elif isinstance(value, list):
+            return [self.intern_value(v) for v in value]
+        elif isinstance(value, dict):
+            interned = value.__class__()  # keep the field order of OrderedDicts
+            for k in value:
+                interned[k] = self.intern_value(value[k])
+            return interned
+        else:
+            return value
+
+    def is_interned(self, node):
+        return self.interned.get(id(node)) is node
+
+    def key_of(self, value):
+        """Children are already interned, so they are keyed by identity"""
+        if isinstance(value, Program):
+            return id(value)
+        elif isinstance(value, list):
+            return tuple([self.key_of(v) for v in value])
+        elif isinstance(value, dict):
+            return tuple([(k, self.key_of(value[k])) for k in value])
+        elif callable(value):
+            return id(value)  # e.g. the function of a native function declaration
+        else:
+            return value
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+def structural_fields(node):
+    """The names of the fields of a node that make up its structure, from its base class down"""
+    fields = []
+    for cls in reversed(node.__class__.__mro__):
+        for name in getattr(cls, '_attrs_', []):
+            if name not in NON_STRUCTURAL_FIELDS and name not in fields:
+                fields.append(name)
+    return fields
+
+
+def structural_hash(value):
+    """
+    A hash of the structure of a tree, using (but not setting) the hash cached in interned nodes; never 0, which marks
+    a node whose hash has not been computed
+    """
+    if isinstance(value, Program):
+        cached = interned_hashes.get(value)
+        if cached != 0:
+            return cached
+        if isinstance(value, StringValue):
+            parts = (StringValue.__name__, value.get_string())
+        else:
+            parts = (value.__class__.__name__,) + tuple([structural_hash(getattr(value, name))
+                                                         for name in structural_fields(value)])
+        return hash(parts) or 1
+    elif isinstance(value, list):
+        return hash(tuple([structural_hash(v) for v in value]))
+    elif isinstance(value, dict):
+        return hash(tuple([(k, structural_hash(value[k])) for k in value]))
+    elif callable(value):
+        return hash(value.__name__)
+    else:
+        return hash(value)
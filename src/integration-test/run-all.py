@@ -0,0 +1,44 @@
+import argparse
+import subprocess
+import sys
+
+from src.benchmark.pool import DEFAULT_JOBS, PinnedPool
+
+"""
+Run an integration test script (e.g. rpython-evaluating.sh) or benchmark script (e.g. benchmark.sh) on each of the
+given Tiger programs, `--jobs` at a time, printing each script's output in the order of the programs and exiting with
+code 1 if any of them failed
+"""
+
+
+def run_script(script, program, prefix=None):
+    process = subprocess.Popen((prefix or []) + [script, program], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output, _ = process.communicate()
+    return process.returncode, output.decode('utf-8', 'replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run an integration test script on many Tiger programs in parallel')
+    parser.add_argument('script', help='the test script to run on each program')
+    parser.add_argument('programs', nargs='+', help='the Tiger programs to test')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='number of tests to run at the same time')
+    parser.add_argument('--pin', action='store_true',
+                        help='pin each script (and the processes it starts) to its own CPU, e.g. when it times them')
+    args = parser.parse_args()
+
+    # tests compare outputs rather than timings so, unless asked to, there is no need to pin them to CPUs
+    pool = PinnedPool(args.jobs, pin=args.pin)
+    results = pool.map(lambda program, prefix: run_script(args.script, program, prefix), args.programs)
+
+    failures = 0
+    for code, output in results:
+        sys.stdout.write(output)
+        if code != 0:
+            failures += 1
+    if failures:
+        print('Failed: %d of %d tests' % (failures, len(results)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+try:
+    from rpython.rlib.jit import set_param
+    from rpython.rlib.unroll import unrolling_iterable
+except ImportError:
+    def set_param(driver, name, value):
+        pass
+
+
+    def unrolling_iterable(iterable):
+        return iterable
+
+"""
+The RPython JIT parameters (see PARAMETERS in rpython/rlib/jit.py) that can be set from the command line
+"""
+TUNABLE_PARAMETERS = ['threshold', 'function_threshold', 'trace_eagerness', 'trace_limit', 'inlining',
+                      'loop_longevity', 'decay', 'retrace_limit', 'max_unroll_loops', 'max_unroll_recursion',
+                      'disable_unrolling']
+unrolling_tunable_parameters = unrolling_iterable(TUNABLE_PARAMETERS)
+
+
+class JitParameterError(Exception):
+    def __init__(self, reason):
+        self.reason = reason
+
+    def to_string(self):
+        return self.reason
+
+
+class JitParameter:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def to_string(self):
+        return '%s=%d' % (self.name, self.value)
+
+
+def parse_jit_parameters(text):
+    """Parse a 'name=value,name=value' string of integer JIT parameters, e.g. 'threshold=200,trace_limit=12000'"""
+    parameters = []
+    for pair in text.split(','):
+        parts = pair.split('=')
+        if len(parts) != 2:
+            raise JitParameterError("Expected a name=value pair: %s" % pair)
+        name = parts[0].strip()
+        if name not in TUNABLE_PARAMETERS:
+            raise JitParameterError("Unknown JIT parameter %s; expected one of: %s" % (
+                name, ', '.join(TUNABLE_PARAMETERS)))
+        try:
+            value = int(parts[1].strip())
+        except ValueError:
+            raise JitParameterError("Expected an integer value: %s" % pair)
+        parameters.append(JitParameter(name, value))
+    return parameters
+
+
+def apply_jit_parameters(parameters):
+    """Set the parameters on all JIT drivers; set_param needs a constant name, hence the unrolled comparison"""
+    for parameter in parameters:
+        for name in unrolling_tunable_parameters:
+            if parameter.name == name:
+                set_param(None, name, parameter.value)
@@ -0,0 +1,201 @@
+import time
+
+try:
+    from rpython.rlib.jit import JitHookInterface, Counters
+    from rpython.rlib import jit_hooks
+    from rpython.rlib.objectmodel import compute_unique_id, we_are_translated
+except ImportError:
+    class JitHookInterface(object):
+        pass
+
+
+    Counters = None
+    jit_hooks = None
+
+
+    def compute_unique_id(x):
+        return id(x)
+
+
+    def we_are_translated():
+        return False
+
+
+def counter_index(name):
+    """Look up a counter of RPython's meta-interpreter at import time, see Counters in rpython/rlib/jit.py"""
+    return getattr(Counters, name) if Counters is not None else -1
+
+
+"""
+The reasons RPython's meta-interpreter gives for aborting a trace, paired with their counters (looked up here since
+RPython cannot translate a getattr() with a non-constant name)
+"""
+ABORT_REASONS = ['ABORT_TOO_LONG', 'ABORT_BRIDGE', 'ABORT_BAD_LOOP', 'ABORT_ESCAPE', 'ABORT_FORCE_QUASIIMMUT']
+ABORT_COUNTERS = [(reason, counter_index(reason)) for reason in ABORT_REASONS]
+TOTAL_COMPILED_LOOPS = counter_index('TOTAL_COMPILED_LOOPS')
+TOTAL_COMPILED_BRIDGES = counter_index('TOTAL_COMPILED_BRIDGES')
+TRACING = counter_index('TRACING')
+BACKEND = counter_index('BACKEND')
+
+"""
+Number of loops to list in the 'hottest_loops' section of the summary
+"""
+NUMBER_OF_HOTTEST_LOOPS = 10
+
+
+def json_string(s):
+    """Quote a string for JSON (RPython has no json module)"""
+    escaped = []
+    for c in s:
+        if c == '"':
+            escaped.append('\\"')
+        elif c == '\\':
+            escaped.append('\\\\')
+        elif c == '\n':
+            escaped.append('\\n')
+        elif c == '\t':
+            escaped.append('\\t')
+        elif ord(c) < 32:
+            escaped.append('\\u%04x' % ord(c))
+        else:
+            escaped.append(c)
+    return '"' + ''.join(escaped) + '"'
+
+
+def json_counts(counts):
+    """Format a dictionary of string keys to integer counts as a JSON object"""
+    members = []
+    for key, count in counts.items():
+        members.append('%s: %d' % (json_string(key), count))
+    return '{' + ', '.join(members) + '}'
+
+
+def increment(counts, key, amount=1):
+    counts[key] = counts.get(key, 0) + amount
+
+
+class LoopEntries:
+    def __init__(self, location, entries):
+        self.location = location
+        self.entries = entries
+
+
+class JitStatistics(JitHookInterface):
+    """
+    Collects what the JIT did while the program ran (installed as the JIT hook interface in jitpolicy() of
+    tiger_interpreter.py) and summarizes it as JSON: loops and bridges compiled, trace aborts by reason and by green key,
+    guard failures (i.e. bridge entries) per green key of the loop the guard belongs to, time spent tracing and in the
+    backend, and the locations (see ast.get_location) of the most-entered loops
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start = 0.0
+        self.end = 0.0
+        self.aborts_by_location = {}  # green key representation -> number of aborted traces
+        self.loop_locations = {}  # loop token number -> green key representation
+        self.bridge_locations = {}  # unique id of the failing guard's descr -> green key representation of its loop
+
+    def enable(self):
+        self.enabled = True
+        if we_are_translated():
+            jit_hooks.stats_set_debug(None, True)  # necessary for counting loop and bridge entries
+        self.start = time.time()
+
+    def disable(self):
+        self.end = time.time()
+        self.enabled = False
+
+    # JitHookInterface methods
+
+    def are_hooks_enabled(self):
+        return self.enabled
+
+    def on_abort(self, reason, jitdriver, greenkey, greenkey_repr, logops, operations):
+        increment(self.aborts_by_location, greenkey_repr)
+
+    def on_trace_too_long(self, jitdriver, greenkey, greenkey_repr):
+        increment(self.aborts_by_location, greenkey_repr)
+
+    def before_compile(self, debug_info):
+        pass
+
+    def after_compile(self, debug_info):
+        self.loop_locations[debug_info.looptoken.number] = debug_info.get_greenkey_repr()
+
+    def before_compile_bridge(self, debug_info):
+        pass
+
+    def after_compile_bridge(self, debug_info):
+        location = self.loop_locations.get(debug_info.looptoken.number, '<unknown>')
+        self.bridge_locations[compute_unique_id(debug_info.fail_descr)] = location
+
+    # summary
+
+    def counter(self, index):
+        if we_are_translated():
+            return jit_hooks.stats_get_counter_value(None, index)
+        return 0
+
+    def seconds(self, index):
+        if we_are_translated():
+            return jit_hooks.stats_get_times_value(None, index)
+        return 0.0
+
+    def loop_entries(self):
+        """Return the guard failures per green key and the loops sorted by how often they were entered"""
+        guard_failures = {}
+        loops = []
+        if we_are_translated():
+            run_times = jit_hooks.stats_get_loop_run_times(None)
+            for i in range(len(run_times)):
+                run_time = run_times[i]
+                if run_time.type == 'b':
+                    increment(guard_failures, self.bridge_locations.get(run_time.number, '<unknown>'),
+                              run_time.counter)
+                elif run_time.type == 'e':
+                    location = self.loop_locations.get(run_time.number, '<unknown>')
+                    loops.append(LoopEntries(location, run_time.counter))
+        return guard_failures, self.hottest(loops)
+
+    @staticmethod
+    def hottest(loops):
+        hottest = []
+        while loops and len(hottest) < NUMBER_OF_HOTTEST_LOOPS:
+            index = 0
+            for i in range(len(loops)):
+                if loops[i].entries > loops[index].entries:
+                    index = i
+            hottest.append(loops.pop(index))
+        return hottest
+
+    def to_json(self):
+        aborts = {}
+        for reason, index in ABORT_COUNTERS:
+            aborts[reason] = self.counter(index)
+        guard_failures, hottest_loops = self.loop_entries()
+        tracing = self.seconds(TRACING)
+        backend = self.seconds(BACKEND)
+        total = self.end - self.start
+        loops = []
+        for loop in hottest_loops:
+            loops.append('{"location": %s, "entries": %d}' % (json_string(loop.location), loop.entries))
+
+        members = [
+            '"jit": %s' % ('true' if we_are_translated() else 'false'),
+            '"loops": %d' % self.counter(TOTAL_COMPILED_LOOPS),
+            '"bridges": %d' % self.counter(TOTAL_COMPILED_BRIDGES),
+            '"aborts": %s' % json_counts(aborts),
+            '"aborts_by_location": %s' % json_counts(self.aborts_by_location),
+            '"guard_failures": %s' % json_counts(guard_failures),
+            '"tracing_seconds": %s' % repr(tracing),
+            '"backend_seconds": %s' % repr(backend),
+            # time not spent tracing or compiling, i.e. interpreting and running compiled code
+            '"other_seconds": %s' % repr(total - tracing - backend),
+            '"total_seconds": %s' % repr(total),
+            '"hottest_loops": [%s]' % ', '.join(loops),
+        ]
+        return '{' + ', '.join(members) + '}\n'
+
+
+jit_statistics = JitStatistics()
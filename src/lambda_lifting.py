@@ -0,0 +1,195 @@
+from src.ast import Program, Declaration, LValue, RecordLValue, ArrayLValue, Let, FunctionCall, FunctionDeclaration, \
+    FunctionParameter, TypeId
+from src.closures import ClosureAnalysis
+from src.environment import Environment
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class LiftedFunction:
+    """
+    A nested function moved to the top-level let by LambdaLifting, with the names of the parameters added to it
+    """
+
+    def __init__(self, name, added, location):
+        self.name = name
+        self.added = added
+        self.location = location
+
+    def to_string(self):
+        return 'lambda-lifting: function=%s added=[%s] location=%s' % (
+            self.name, ', '.join(self.added), self.location.to_string() if self.location is not None else '<unknown>')
+
+
+def is_variable_read(node):
+    return isinstance(node, LValue) and not isinstance(node, RecordLValue) and not isinstance(node, ArrayLValue)
+
+
+class LambdaLifting:
+    """
+    Move the functions declared in nested lets (e.g. helpers declared inside another function) to the let at the root
+    of the program when the outer variables and parameters they capture are never assigned (see ClosureAnalysis): each
+    such captured declaration becomes an extra parameter of the function, every call passes the captured value as an
+    extra argument and the function body reads the parameter instead, from its own activation environment. Since a
+    lifted function must also be passed what the lifted functions it calls capture, the extra parameters are computed
+    until nothing changes (as for mutually-recursive helpers). Variables declared in the root let are read directly
+    and never become parameters. Nested lets are renumbered so that their environments have no slots for the
+    functions moved out of them
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.program = program
+        self.candidates = []
+        self.candidate_keys = {}  # note that AST nodes are keyed by identity since they are compared structurally
+        self.extra = {}  # the captured declarations each candidate is passed, keyed by the candidate
+        self.lifted = []
+
+    def run(self):
+        """
+        :return: the list of LiftedFunction, e.g. for reporting
+        """
+        root = self.program
+        if not isinstance(root, Let):
+            return self.lifted
+        self.find_candidates(root)
+        if not self.candidates:
+            return self.lifted
+        self.find_extra_parameters(root)
+
+        self.add_arguments()
+        lets = {}
+        for function in self.candidates:
+            added = self.add_parameters(function)
+            parent = function.parent
+            assert isinstance(parent, Let)
+            parent.declarations = [d for d in parent.declarations if d is not function]
+            lets[compute_unique_id(parent)] = parent
+            root.declarations.append(function)
+            function.parent = root
+            self.lifted.append(LiftedFunction(function.name, added, function.location))
+        lets[compute_unique_id(root)] = root
+        for let in lets.values():
+            self.renumber(let)
+        return self.lifted
+
+    def find_candidates(self, root):
+        for closure in ClosureAnalysis(root).analyze():
+            function = closure.function
+            if function.parent is root:
+                continue
+            liftable = True
+            for declaration in closure.captured:
+                if declaration.parent is not root and closure.is_mutable(declaration):
+                    liftable = False
+            if liftable:
+                self.candidates.append(function)
+                self.candidate_keys[compute_unique_id(function)] = True
+
+    def find_extra_parameters(self, root):
+        inside = {}  # the declarations within each candidate, which it need not be passed
+        calls = {}  # the candidates each candidate calls, outside of the candidates nested in it
+        for function in self.candidates:
+            key = compute_unique_id(function)
+            declared = {}
+            for parameter in function.parameters:
+                declared[compute_unique_id(parameter)] = True
+            for node in DepthFirstAstIterator(function.body):
+                if isinstance(node, Declaration):
+                    declared[compute_unique_id(node)] = True
+            inside[key] = declared
+
+            self.extra[key] = []
+            calls[key] = []
+            for node in self.nodes_of(function):
+                if is_variable_read(node):
+                    declaration = node.declaration
+                    if declaration.parent is not root and compute_unique_id(declaration) not in declared:
+                        self.add_extra(function, declaration)
+                elif isinstance(node, FunctionCall) and compute_unique_id(node.declaration) in self.candidate_keys:
+                    calls[key].append(node.declaration)
+
+        changed = True
+        while changed:
+            changed = False
+            for function in self.candidates:
+                key = compute_unique_id(function)
+                for called in calls[key]:
+                    for declaration in self.extra[compute_unique_id(called)]:
+                        if compute_unique_id(declaration) not in inside[key] and self.add_extra(function, declaration):
+                            changed = True
+
+    def add_extra(self, function, declaration):
+        extra = self.extra[compute_unique_id(function)]
+        for existing in extra:
+            if existing is declaration:
+                return False
+        extra.append(declaration)
+        return True
+
+    def nodes_of(self, function):
+        """:return: the nodes of a function body, except those of the candidates nested in it (lifted separately)"""
+        nodes = []
+        stack = [function.body]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if isinstance(node, FunctionDeclaration) and compute_unique_id(node) in self.candidate_keys:
+                continue
+            children = node.children()
+            for i in range(len(children) - 1, -1, -1):
+                stack.append(children[i])
+        return nodes
+
+    def add_arguments(self):
+        """Pass the captured values at every call of a candidate; add_parameters rebinds those made inside candidates"""
+        for node in DepthFirstAstIterator(self.program):
+            if isinstance(node, FunctionCall) and compute_unique_id(node.declaration) in self.candidate_keys:
+                arguments = [argument for argument in node.arguments]
+                for declaration in self.extra[compute_unique_id(node.declaration)]:
+                    argument = LValue(declaration.name, None, declaration)
+                    argument.location = node.location
+                    arguments.append(argument)
+                node.arguments = arguments
+
+    def add_parameters(self, function):
+        """:return: the names of the parameters added to the function, which its body now reads instead"""
+        parameters = {}
+        added = []
+        for declaration in self.extra[compute_unique_id(function)]:
+            type_id = declaration.type
+            if isinstance(type_id, TypeId):
+                type_id = TypeId(type_id.name, type_id.declaration)
+            parameter = FunctionParameter(declaration.name, type_id, function, len(function.parameters))
+            parameter.location = declaration.location
+            function.parameters.append(parameter)
+            parameters[compute_unique_id(declaration)] = parameter
+            added.append(parameter.name)
+        if parameters:
+            for node in self.nodes_of(function):
+                if is_variable_read(node):
+                    parameter = parameters.get(compute_unique_id(node.declaration), None)
+                    if parameter is not None:
+                        node.declaration = parameter
+                        node.name = parameter.name
+        function.environment = Environment.empty(None, len(function.parameters))
+        return added
+
+    @staticmethod
+    def renumber(let):
+        for i in range(len(let.declarations)):
+            let.declarations[i].index = i
+        let.environment = Environment.empty(None, len(let.declarations))
+
+
+def lift_functions(program):
+    """
+    Move nested functions that only read the variables they capture to the top-level let (see LambdaLifting)
+    :return: the list of LiftedFunction
+    """
+    return LambdaLifting(program).run()
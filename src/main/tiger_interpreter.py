@@ -1,7 +1,134 @@
+import os
 import sys
 
-from src.native_functions import read_file, create_native_functions, create_empty_environment
+from src.ast import jitpolicy  # the translator looks for jitpolicy() in the target module
+from src.closures import analyze_closures
+from src.common_subexpressions import eliminate_common_subexpressions
+from src.dead_code import eliminate_dead_code
+from src.escape_analysis import scalar_replace_records
+from src.jit_parameters import parse_jit_parameters, apply_jit_parameters, JitParameterError
+from src.jit_stats import jit_statistics
+from src.lambda_lifting import lift_functions
+from src.memory_stats import memory_statistics
+from src.memoization import memoize_pure_functions, DEFAULT_CAPACITY
+from src.native_functions import read_file, create_native_functions, create_empty_environment, STDERR_FD
 from src.parser import Parser, ParseError
+from src.profiler import profiler
+from src.ssa.passes import optimize_program
+
+USAGE = "Usage: ./tiger-interpreter [--dce] [--dce-report] [--scalar-replace] [--cse] [--cse-report] " \
+        "[--lambda-lift] [--lambda-lift-report] [--ssa] [--ssa-report] [--closure-report] [--memoize[=capacity]] " \
+        "[--memoize-report] [--profile] [--profile-stacks=file] [--jit-stats] [--mem-stats] [--jit name=value,...] " \
+        "program.tig"
+
+
+class Options:
+    """
+    The command-line options of the interpreter; see parse_options()
+    """
+
+    def __init__(self):
+        self.file = None
+        self.dce = False
+        self.dce_report = False
+        self.scalar_replace = False
+        self.cse = False
+        self.cse_report = False
+        self.lambda_lift = False
+        self.lambda_lift_report = False
+        self.ssa = False
+        self.ssa_report = False
+        self.closure_report = False
+        self.memoize = False
+        self.memoize_capacity = DEFAULT_CAPACITY
+        self.memoize_report = False
+        self.profile = False
+        self.profile_stacks = 'profile.folded'
+        self.jit_stats = False
+        self.mem_stats = False
+        self.jit_parameters = []
+
+
+class OptionError(Exception):
+    def __init__(self, reason):
+        self.reason = reason
+
+    def to_string(self):
+        return self.reason
+
+
+def parse_options(argv):
+    """Parse the interpreter flags (which must appear before the program file name)"""
+    options = Options()
+    i = 1
+    while i < len(argv):
+        argument = argv[i]
+        i += 1
+        if options.file is not None:
+            raise OptionError("Unexpected argument after the program file name: %s" % argument)
+        elif argument == '--dce':
+            options.dce = True
+        elif argument == '--dce-report':
+            options.dce = True
+            options.dce_report = True
+        elif argument == '--scalar-replace':
+            options.scalar_replace = True
+        elif argument == '--cse':
+            options.cse = True
+        elif argument == '--cse-report':
+            options.cse = True
+            options.cse_report = True
+        elif argument == '--lambda-lift':
+            options.lambda_lift = True
+        elif argument == '--lambda-lift-report':
+            options.lambda_lift = True
+            options.lambda_lift_report = True
+        elif argument == '--ssa':
+            options.ssa = True
+        elif argument == '--ssa-report':
+            options.ssa = True
+            options.ssa_report = True
+        elif argument == '--closure-report':
+            options.closure_report = True
+        elif argument == '--memoize':
+            options.memoize = True
+        elif argument.startswith('--memoize='):
+            options.memoize = True
+            try:
+                options.memoize_capacity = int(argument[len('--memoize='):])
+            except ValueError:
+                raise OptionError("Expected an integer capacity: %s" % argument)
+            if options.memoize_capacity <= 0:
+                raise OptionError("Expected a positive capacity: %s" % argument)
+        elif argument == '--memoize-report':
+            options.memoize = True
+            options.memoize_report = True
+        elif argument == '--profile':
+            options.profile = True
+        elif argument.startswith('--profile-stacks='):
+            options.profile = True
+            options.profile_stacks = argument[len('--profile-stacks='):]
+        elif argument == '--jit-stats':
+            options.jit_stats = True
+        elif argument == '--mem-stats':
+            options.mem_stats = True
+        elif argument == '--jit' or argument.startswith('--jit='):
+            if argument == '--jit':
+                if i >= len(argv):
+                    raise OptionError("Expected JIT parameters after --jit, e.g. --jit threshold=200,trace_limit=12000")
+                text = argv[i]
+                i += 1
+            else:
+                text = argument[len('--jit='):]
+            try:
+                options.jit_parameters.extend(parse_jit_parameters(text))
+            except JitParameterError as e:
+                raise OptionError(e.to_string())
+        elif argument.startswith('--'):
+            raise OptionError("Unknown option: %s" % argument)
+        else:
+            options.file = argument
+    return options
 
 
 def main(argv):
@@ -9,29 +136,100 @@ def main(argv):
 
     # check for arguments
     try:
-        file = argv[1]
-    except IndexError:
+        options = parse_options(argv)
+    except OptionError as e:
+        print("%s\n%s" % (e.to_string(), USAGE))
+        return 40
+    if options.file is None:
         print("Expected one file name argument to be passed, e.g. ./tiger-interpreter program.tig")
         return 40
 
-    program_contents = read_file(argv[1])
+    program_contents = read_file(options.file)
 
     # set up environment
     environment = create_empty_environment()
 
     # parse input program
     try:
-        program = Parser(program_contents, argv[1]).parse(create_native_functions())
+        program = Parser(program_contents, options.file).parse(create_native_functions())
     except ParseError as e:
         print("Parse failure: %s" % e.to_string())
         return 42
 
+    # remove unused declarations and stores
+    removed_code = []
+    if options.dce:
+        removed_code = eliminate_dead_code(program)
+
+    # keep the fields of records that do not escape in let slots
+    if options.scalar_replace:
+        scalar_replace_records(program)
+
+    # evaluate repeated pure expressions once
+    eliminated_expressions = []
+    if options.cse:
+        eliminated_expressions = eliminate_common_subexpressions(program)
+
+    # move nested functions to the top level, passing what they capture as arguments
+    lifted_functions = []
+    if options.lambda_lift:
+        lifted_functions = lift_functions(program)
+
+    # optimize the functions in SSA form
+    ssa_reports = []
+    if options.ssa:
+        ssa_reports = optimize_program(program)
+
+    # find what each function captures from its enclosing scopes
+    closures = []
+    if options.closure_report:
+        closures = analyze_closures(program)
+
+    # cache the results of pure functions
+    memoization_tables = []
+    if options.memoize:
+        memoization_tables = memoize_pure_functions(program, options.memoize_capacity)
+
     # evaluate the program
+    apply_jit_parameters(options.jit_parameters)
+    profiler.enabled = options.profile
+    if options.jit_stats:
+        jit_statistics.enable()
+    if options.mem_stats:
+        memory_statistics.enable()
     result = program.evaluate(environment)
+    if options.mem_stats:
+        memory_statistics.disable()
+    if options.jit_stats:
+        jit_statistics.disable()
+    profiler.enabled = False
 
     # print the result and exit
     if result:
         print(result.to_string())
+    if options.dce_report:
+        for removed in removed_code:
+            os.write(STDERR_FD, removed.to_string() + "\n")
+    if options.cse_report:
+        for eliminated in eliminated_expressions:
+            os.write(STDERR_FD, eliminated.to_string() + "\n")
+    if options.lambda_lift_report:
+        for lifted in lifted_functions:
+            os.write(STDERR_FD, lifted.to_string() + "\n")
+    if options.ssa_report:
+        for report in ssa_reports:
+            os.write(STDERR_FD, report.to_string() + "\n")
+    for closure in closures:
+        os.write(STDERR_FD, closure.to_string() + "\n")
+    if options.memoize_report:
+        for table in memoization_tables:
+            os.write(STDERR_FD, table.to_string() + "\n")
+    if options.profile:
+        profiler.report(options.profile_stacks)
+    if options.jit_stats:
+        os.write(STDERR_FD, jit_statistics.to_json())
+    if options.mem_stats:
+        os.write(STDERR_FD, memory_statistics.to_json())
     return 0
 
 
@@ -42,3 +240,8 @@ if __name__ == "__main__":
 
 def target(*args):
     return main, None
+
+
+def get_gchooks():
+    """The translator installs these GC hooks (like jitpolicy(), it looks for this function in the target module)"""
+    return memory_statistics
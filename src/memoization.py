@@ -0,0 +1,163 @@
+from collections import OrderedDict
+
+from src.ast import FunctionDeclaration, FunctionCall, NativeFunctionDeclaration, LValue, RecordLValue, ArrayLValue, \
+    Assign, Declaration, VariableDeclaration, IntegerValue, TypeId, Program
+from src.scopes import DepthFirstAstIterator
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+"""
+Native functions that neither print nor modify their arguments; calls to these do not prevent memoization
+"""
+PURE_NATIVE_FUNCTIONS = ['size', 'substring', 'ord', 'chr', 'concat', 'arrayEquals']
+
+"""
+Number of results kept per function before the least-recently used ones are evicted
+"""
+DEFAULT_CAPACITY = 10000
+
+
+class MemoizationTable:
+    """
+    A bounded least-recently-used cache of the results of a pure function, keyed by its (integer) argument values
+    """
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY):
+        assert capacity > 0
+        self.name = name
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(environment, number_of_arguments):
+        """Build a key from the integer arguments stored in the first slots of an activation environment"""
+        parts = []
+        for i in range(number_of_arguments):
+            value = environment.get(i)
+            assert isinstance(value, IntegerValue)
+            parts.append(str(value.integer))
+        return ','.join(parts)
+
+    def get(self, key):
+        """Return the cached result (marking it most-recently used) or None if it is not cached"""
+        result = self.results.get(key, None)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            del self.results[key]
+            self.results[key] = result
+        return result
+
+    def put(self, key, result):
+        if len(self.results) >= self.capacity:
+            for oldest in self.results:
+                del self.results[oldest]
+                self.evictions += 1
+                break
+        self.results[key] = result
+
+    def to_string(self):
+        return 'memoize: function=%s hits=%d misses=%d evictions=%d size=%d' % (
+            self.name, self.hits, self.misses, self.evictions, len(self.results))
+
+
+def is_int_type(type_id):
+    return isinstance(type_id, TypeId) and type_id.name == 'int'
+
+
+def is_constant(declaration):
+    """Outer variables may only be read by a pure function if they are initialized to a literal and never assigned"""
+    return isinstance(declaration, VariableDeclaration) and isinstance(declaration.expression, IntegerValue)
+
+
+class PurityAnalysis:
+    """
+    Find the functions whose result depends only on their integer arguments: they take and return ints, only assign to
+    variables declared inside themselves, only read outer variables that are integer constants, and only call other
+    pure functions (including a few side-effect-free natives). Since functions may be (mutually) recursive, all
+    candidate functions are assumed pure and the impure ones are removed until nothing changes
+    """
+
+    def __init__(self, program):
+        assert isinstance(program, Program)
+        self.functions = []
+        self.assigned = {}  # declarations assigned to anywhere in the program
+        for node in DepthFirstAstIterator(program):
+            if isinstance(node, FunctionDeclaration):
+                self.functions.append(node)
+            elif isinstance(node, Assign):
+                self.assigned[compute_unique_id(node.lvalue.declaration)] = True
+
+    def find_pure_functions(self):
+        pure = {}  # note that AST nodes are keyed by identity since they are compared structurally by equals()
+        for function in self.functions:
+            if is_int_type(function.return_type) and self.has_int_parameters(function):
+                pure[compute_unique_id(function)] = True
+
+        changed = True
+        while changed:
+            changed = False
+            for function in self.functions:
+                if compute_unique_id(function) in pure and not self.is_pure(function, pure):
+                    del pure[compute_unique_id(function)]
+                    changed = True
+
+        return [function for function in self.functions if compute_unique_id(function) in pure]
+
+    @staticmethod
+    def has_int_parameters(function):
+        for parameter in function.parameters:
+            if not is_int_type(parameter.type):
+                return False
+        return True
+
+    def is_pure(self, function, pure):
+        local = {compute_unique_id(function): True}
+        for parameter in function.parameters:
+            local[compute_unique_id(parameter)] = True
+        nodes = [node for node in DepthFirstAstIterator(function.body)]
+        for node in nodes:
+            if isinstance(node, Declaration):
+                local[compute_unique_id(node)] = True
+
+        for node in nodes:
+            if isinstance(node, Assign):
+                if compute_unique_id(node.lvalue.declaration) not in local:
+                    return False
+            elif isinstance(node, LValue) and not isinstance(node, RecordLValue) \
+                    and not isinstance(node, ArrayLValue):
+                declaration = node.declaration
+                key = compute_unique_id(declaration)
+                if key not in local and (node.next is not None or not is_constant(declaration)
+                                         or key in self.assigned):
+                    return False
+            elif isinstance(node, FunctionCall):
+                declaration = node.declaration
+                key = compute_unique_id(declaration)
+                if isinstance(declaration, NativeFunctionDeclaration):
+                    if declaration.name not in PURE_NATIVE_FUNCTIONS:
+                        return False
+                elif key not in local and key not in pure:
+                    return False
+        return True
+
+
+def memoize_pure_functions(program, capacity=DEFAULT_CAPACITY):
+    """
+    Attach a memoization table to each pure function in the program (see PurityAnalysis); FunctionCall.evaluate will
+    then consult the table before evaluating the function body
+    :return: the list of memoization tables, e.g. for reporting statistics
+    """
+    tables = []
+    for function in PurityAnalysis(program).find_pure_functions():
+        function.memoization = MemoizationTable(function.name, capacity)
+        tables.append(function.memoization)
+    return tables
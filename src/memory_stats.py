@@ -0,0 +1,121 @@
+import os
+
+try:
+    from rpython.memory.gc.hook import GcHooks
+    from rpython.rlib.objectmodel import we_are_translated
+    from rpython.rlib.rarithmetic import intmask
+except ImportError:
+    class GcHooks(object):
+        pass
+
+
+    def we_are_translated():
+        return False
+
+
+    def intmask(x):
+        return int(x)
+
+
+class MemoryStatistics(GcHooks):
+    """
+    Counts what a Tiger program allocates while it is evaluated: Value objects by subclass (counted in their
+    constructors, see ast.py) and environment levels (counted where Let and FunctionCall push them); once translated, it
+    is also installed as the GC hooks (see get_gchooks() in tiger_interpreter.py) to count collections and their pauses.
+    As with the profiler, when it is not enabled the only cost is checking a quasi-immutable flag
+    """
+    _immutable_fields_ = ['enabled?']
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.integer_values = 0
+        self.string_values = 0
+        self.array_values = 0
+        self.array_elements = 0
+        self.record_values = 0
+        self.environment_levels = 0
+        self.minor_collections = 0
+        self.major_collection_steps = 0
+        self.major_collections = 0
+        self.pause_ticks = 0
+        self.maximum_pause_ticks = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # GcHooks methods (durations are in read_timestamp() ticks)
+
+    def is_gc_minor_enabled(self):
+        return self.enabled
+
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+        self.minor_collections += 1
+        self.pause(intmask(duration))
+
+    def is_gc_collect_step_enabled(self):
+        return self.enabled
+
+    def on_gc_collect_step(self, duration, oldstate, newstate):
+        self.major_collection_steps += 1
+        self.pause(intmask(duration))
+
+    def is_gc_collect_enabled(self):
+        return self.enabled
+
+    def on_gc_collect(self, num_major_collects, arenas_count_before, arenas_count_after, arenas_bytes,
+                      rawmalloc_bytes_before, rawmalloc_bytes_after):
+        self.major_collections += 1
+
+    def pause(self, ticks):
+        self.pause_ticks += ticks
+        if ticks > self.maximum_pause_ticks:
+            self.maximum_pause_ticks = ticks
+
+    # summary
+
+    def to_json(self):
+        members = [
+            '"gc_hooks": %s' % ('true' if we_are_translated() else 'false'),
+            '"peak_rss_kb": %d' % read_peak_rss_kb(),
+            '"integer_values": %d' % self.integer_values,
+            '"string_values": %d' % self.string_values,
+            '"array_values": %d' % self.array_values,
+            '"array_elements": %d' % self.array_elements,
+            '"record_values": %d' % self.record_values,
+            '"environment_levels": %d' % self.environment_levels,
+            '"gc_minor_collections": %d' % self.minor_collections,
+            '"gc_major_collection_steps": %d' % self.major_collection_steps,
+            '"gc_major_collections": %d' % self.major_collections,
+            '"gc_pause_ticks": %d' % self.pause_ticks,
+            '"gc_maximum_pause_ticks": %d' % self.maximum_pause_ticks,
+        ]
+        return '{' + ', '.join(members) + '}\n'
+
+
+def read_peak_rss_kb(path='/proc/self/status'):
+    """The peak resident set size (VmHWM) of this process in kilobytes, or -1 if the OS does not report it"""
+    try:
+        fd = os.open(path, os.O_RDONLY, 0o777)
+    except OSError:
+        return -1
+    text = ''
+    while True:
+        read = os.read(fd, 4096)
+        if len(read) == 0:
+            break
+        text += read
+    os.close(fd)
+    for line in text.split('\n'):
+        if line.startswith('VmHWM:'):
+            digits = [c for c in line if c.isdigit()]
+            return int(''.join(digits)) if digits else -1
+    return -1
+
+
+memory_statistics = MemoryStatistics()
@@ -1,8 +1,9 @@
 import os
 
-from src.ast import IntegerValue, FunctionParameter, TypeId, StringValue, \
-    NativeNoArgumentFunctionDeclaration, NativeOneArgumentFunctionDeclaration, NativeFunctionDeclaration, Let, \
-    TypeDeclaration
+from src.ast import IntegerValue, FunctionParameter, TypeId, StringValue, ArrayValue, \
+    NativeNoArgumentFunctionDeclaration, NativeOneArgumentFunctionDeclaration, NativeTwoArgumentFunctionDeclaration, \
+    NativeThreeArgumentFunctionDeclaration, NativeFiveArgumentFunctionDeclaration, NativeFunctionDeclaration, Let, \
+    TypeDeclaration, InterpretationError
 from src.environment import Environment
 
 try:
@@ -37,11 +38,99 @@ def tiger_print(value):
     if isinstance(value, IntegerValue):
         os.write(STDOUT_FD, str(value.integer))
     elif isinstance(value, StringValue):
-        os.write(STDOUT_FD, value.string)
+        os.write(STDOUT_FD, value.get_string())
     else:
         raise ValueError('Unknown value type %s' % value.__class__.__name__)
 
 
+def tiger_concat(left, right):
+    """Native function to concatenate two strings; the result is a rope that is only flattened when its characters are
+    needed (e.g. by print, substring, ord)"""
+    assert isinstance(left, StringValue)
+    assert isinstance(right, StringValue)
+    return StringValue.concatenate(left, right)
+
+
+def tiger_size(value):
+    """Native function returning the number of characters in a string; this does not flatten ropes"""
+    assert isinstance(value, StringValue)
+    return IntegerValue(value.length)
+
+
+def tiger_substring(value, first, n):
+    """Native function returning the n characters of a string starting at (zero-based) index first"""
+    assert isinstance(value, StringValue)
+    assert isinstance(first, IntegerValue)
+    assert isinstance(n, IntegerValue)
+    start = first.integer
+    end = start + n.integer
+    if start < 0 or n.integer < 0 or end > value.length:
+        raise InterpretationError('Substring (%d, %d) is out of bounds for a string of length %d' % (
+            start, n.integer, value.length))
+    return StringValue(value.get_string()[start:end])
+
+
+def tiger_ord(value):
+    """Native function returning the character code of the first character of a string (or -1 if it is empty)"""
+    assert isinstance(value, StringValue)
+    if value.length == 0:
+        return IntegerValue(-1)
+    return IntegerValue(ord(value.get_string()[0]))
+
+
+def tiger_chr(value):
+    """Native function returning the single-character string for a character code"""
+    assert isinstance(value, IntegerValue)
+    if not 0 <= value.integer < 256:
+        raise InterpretationError('Character code %d is out of range' % value.integer)
+    return StringValue(chr(value.integer))
+
+
+def tiger_array_fill(array, value):
+    """Native function to set every element of an array to the same value; this writes the array storage directly
+    instead of evaluating an assignment per element"""
+    assert isinstance(array, ArrayValue)
+    for i in range(array.length):
+        array.array[i] = value
+    return None
+
+
+def tiger_array_copy(source, source_position, destination, destination_position, n):
+    """Native function to copy n elements from one array to another (or to a different position of the same array),
+    like Java's System.arraycopy"""
+    assert isinstance(source, ArrayValue)
+    assert isinstance(source_position, IntegerValue)
+    assert isinstance(destination, ArrayValue)
+    assert isinstance(destination_position, IntegerValue)
+    assert isinstance(n, IntegerValue)
+    source_start = source_position.integer
+    destination_start = destination_position.integer
+    length = n.integer
+    if source_start < 0 or destination_start < 0 or length < 0 or source_start + length > source.length \
+            or destination_start + length > destination.length:
+        raise InterpretationError('Array copy of %d elements from %d (length %d) to %d (length %d) is out of bounds' % (
+            length, source_start, source.length, destination_start, destination.length))
+    # the slice is copied before it is assigned so overlapping copies within the same array are correct
+    destination.array[destination_start:destination_start + length] = source.array[source_start:source_start + length]
+    return None
+
+
+def tiger_array_equals(left, right):
+    """Native function comparing the elements of two arrays (not their identity); returns 1 if they are all equal"""
+    assert isinstance(left, ArrayValue)
+    assert isinstance(right, ArrayValue)
+    if left is right:
+        return IntegerValue(1)
+    if left.length != right.length:
+        return IntegerValue(0)
+    for i in range(left.length):
+        left_element = left.array[i]
+        right_element = right.array[i]
+        if left_element is not right_element and (left_element is None or not left_element.equals(right_element)):
+            return IntegerValue(0)
+    return IntegerValue(1)
+
+
 class Timestamp:
     """
     Number of ticks (RPython); wall clock time (Python)
@@ -81,13 +170,40 @@ def create_native_functions():
                                                           None, tiger_print)
     time_go_function = NativeNoArgumentFunctionDeclaration('timeGo', integer_type, tiger_start_timer)
     time_stop_function = NativeNoArgumentFunctionDeclaration('timeStop', integer_type, tiger_stop_timer)
-    return [native_types, print_function, time_go_function, time_stop_function]
+    concat_function = NativeTwoArgumentFunctionDeclaration('concat', [FunctionParameter('s1', string_type),
+                                                                      FunctionParameter('s2', string_type)],
+                                                           string_type, tiger_concat)
+    size_function = NativeOneArgumentFunctionDeclaration('size', [FunctionParameter('s', string_type)], integer_type,
+                                                         tiger_size)
+    substring_function = NativeThreeArgumentFunctionDeclaration('substring', [FunctionParameter('s', string_type),
+                                                                              FunctionParameter('first', integer_type),
+                                                                              FunctionParameter('n', integer_type)],
+                                                                string_type, tiger_substring)
+    ord_function = NativeOneArgumentFunctionDeclaration('ord', [FunctionParameter('s', string_type)], integer_type,
+                                                        tiger_ord)
+    chr_function = NativeOneArgumentFunctionDeclaration('chr', [FunctionParameter('i', integer_type)], string_type,
+                                                        tiger_chr)
+    array_fill_function = NativeTwoArgumentFunctionDeclaration('arrayFill', [FunctionParameter('a', None),
+                                                                             FunctionParameter('v', None)],
+                                                               None, tiger_array_fill)
+    array_copy_function = NativeFiveArgumentFunctionDeclaration('arrayCopy', [FunctionParameter('src', None),
+                                                                              FunctionParameter('srcPos', integer_type),
+                                                                              FunctionParameter('dst', None),
+                                                                              FunctionParameter('dstPos', integer_type),
+                                                                              FunctionParameter('n', integer_type)],
+                                                                None, tiger_array_copy)
+    array_equals_function = NativeTwoArgumentFunctionDeclaration('arrayEquals', [FunctionParameter('a', None),
+                                                                                 FunctionParameter('b', None)],
+                                                                 integer_type, tiger_array_equals)
+    return [native_types, print_function, time_go_function, time_stop_function, concat_function, size_function,
+            substring_function, ord_function, chr_function, array_fill_function, array_copy_function,
+            array_equals_function]
 
 
 def create_environment_with_natives():
     """Convenience method to add all native functions to the environment"""
-    environment = Environment.empty().push(4)
     native_functions = create_native_functions()
+    environment = Environment.empty().push(len(native_functions))
     for i in range(len(native_functions)):
         environment.set(i, native_functions[i])
     return environment  # TODO remove this
@@ -102,7 +218,9 @@ def list_native_environment_names(env):
     """List the names of native functions in the environment; this expects all names to be in the current level"""
     assert isinstance(env, Environment)
     names = []
-    for exp in env.expressions:
+    parent_size = env.parent.size() if env.parent is not None else 0
+    for i in range(env.size() - parent_size):  # size() counts the slots of the parent levels too
+        exp = env.get(i)
         if isinstance(exp, NativeFunctionDeclaration):
             names.append(exp.name)
     return names
@@ -5,7 +5,7 @@ from src.ast import NilValue, IntegerValue, StringValue, ArrayCreation, TypeId,
     TypeDeclaration, ArrayType, VariableDeclaration, FunctionDeclaration, RecordType, Sequence, Multiply, Divide, Add, \
     Subtract, GreaterThanOrEquals, LessThanOrEquals, Equals, NotEquals, GreaterThan, LessThan, \
     And, Or, FunctionParameter
-from src.scopes import transform_lvalues
+from src.scopes import transform_lvalues, DepthFirstAstIterator
 from src.tokenizer import Tokenizer
 from src.tokens import NumberToken, IdentifierToken, KeywordToken, SymbolToken, StringToken
 
@@ -62,9 +62,16 @@ OPERATORS = {
 }
 
 
+BUILT_IN_TYPE_NAMES = ['int', 'string']  # see native_functions.create_native_functions()
+
+
 class Parser:
     def __init__(self, text, source_file=None):
         self.tokenizer = Tokenizer(text, source_file)
+        self.strings = {}  # interned string literals, see string()
+        self.integers = {}  # interned integer literals, see integer()
+        self.nil = NilValue()  # the one nil literal
+        self.type_ids = {}  # interned built-in type names in type annotations, see shared_type_id()
 
     def parse(self, native_function_declarations=None):
         expression = self.expression()
@@ -109,11 +116,11 @@ class Parser:
         if self.__accept_type(KeywordToken):
             token = self.__peek()
             if token.value == 'type':
-                return self.type_declaration()
+                return self.locate(self.type_declaration(), token.location)
             elif token.value == 'var':
-                return self.variable_declaration()
+                return self.locate(self.variable_declaration(), token.location)
             elif token.value == 'function':
-                return self.function_declaration()
+                return self.locate(self.function_declaration(), token.location)
             elif token.value == 'import':
                 return self.import_declaration()
             else:
@@ -149,26 +156,31 @@ class Parser:
             self.__next()  # consume operator
             operation = token.value
             inner_precedence = PRECEDENCE[token.value]
+            operator_token = token
             right = self.expression_without_precedence()
             token = self.__peek()
             while self.is_operator(token) and self.precedence(token) >= inner_precedence:
                 right = self.expression_with_precedence(right, PRECEDENCE[token.value])
                 token = self.__peek()
-            left = self.operation(operation, left, right)
+            left = self.locate(self.operation(operation, left, right), operator_token.location)
         return left
 
     def expression_without_precedence(self):
+        token = self.__peek()
+        expression = self.unlocated_expression_without_precedence()
+        return self.locate(expression, token.location if token else None)
+
+    def unlocated_expression_without_precedence(self):
         if self.__accept_and_consume(KeywordToken('nil')):
-            return NilValue()
+            return self.nil
         elif self.__accept_type(NumberToken):
             token = self.__next()
-            return IntegerValue.from_string(token.value)
+            return self.integer(token.value)
         elif self.__accept_and_consume(SymbolToken('-')):
             token = self.__next()
-            return IntegerValue.from_string('-' + token.value)
+            return self.integer('-' + token.value)
         elif self.__accept_type(StringToken):
-            token = self.__next()
-            return StringValue(token.value)
+            return self.string()
         elif self.__accept(SymbolToken('(')):
             return self.sequence()
         elif self.__accept_type(IdentifierToken):
@@ -193,7 +205,7 @@ class Parser:
             return None
 
     def for_do(self):
-        self.__expect(KeywordToken('for'))
+        for_token = self.__expect(KeywordToken('for'))
         var = self.__expect_type(IdentifierToken)
         self.__expect(SymbolToken(':='))
         start = self.expression()
@@ -201,7 +213,11 @@ class Parser:
         end = self.expression()
         self.__expect(KeywordToken('do'))
         body = self.expression()
-        return For(var.value, start, end, body)
+        for_loop = For(var.value, start, end, body)
+        # the nodes of the while-loop that For() is converted to were not parsed so they take the location of the 'for'
+        for node in DepthFirstAstIterator(for_loop.while_expression):
+            self.locate(node, for_token.location)
+        return for_loop
 
     def function_call(self):
         function_id = self.id()
@@ -254,6 +270,15 @@ class Parser:
     def import_declaration(self):
         raise NotImplementedError
 
+    def integer(self, text):
+        """Intern integer literals, like string(); IntegerValues are immutable so one node can stand for all occurrences"""
+        try:
+            return self.integers[text]
+        except KeyError:
+            integer = IntegerValue.from_string(text)
+            self.integers[text] = integer
+            return integer
+
     def is_declaration(self):
         token = self.__peek()
         return isinstance(token, KeywordToken) and token.value in ['type', 'var', 'function', 'import']
@@ -298,6 +323,13 @@ class Parser:
         operator_class = OPERATORS[operation]
         return operator_class(left, right)
 
+    @staticmethod
+    def locate(expression, location):
+        """Record the source location of a parsed node (unless it already has one, e.g. an interned string literal)"""
+        if expression is not None and expression.location is None:
+            expression.location = location
+        return expression
+
     def parameters(self):
         if self.__accept_type(IdentifierToken):
             parameters = []
@@ -347,10 +379,36 @@ class Parser:
         self.__expect(SymbolToken(')'))
         return Sequence(exps)
 
+    def shared_type_id(self, name):
+        """
+        Annotations with the built-in types (e.g. the 'int' of 'var a : int') are interned by name: they are never
+        evaluated and always resolve to the native type declarations. Other type names may be declared again in nested
+        scopes, so each of their uses keeps its own TypeId to bind to its own declaration
+        """
+        if name not in BUILT_IN_TYPE_NAMES:
+            return TypeId(name)
+        try:
+            return self.type_ids[name]
+        except KeyError:
+            type_id = TypeId(name)
+            self.type_ids[name] = type_id
+            return type_id
+
+    def string(self):
+        """Intern string literals so that all occurrences of the same literal share a StringValue (and its cached hash);
+        comparisons of a literal with itself then succeed on identity"""
+        token = self.__expect_type(StringToken)
+        try:
+            return self.strings[token.value]
+        except KeyError:
+            string = StringValue(token.value)
+            self.strings[token.value] = string
+            return string
+
     def type(self):
         token = self.__next()
         if self.__accept_type(IdentifierToken, token):
-            return TypeId(token.value)
+            return self.shared_type_id(token.value)
         elif self.__accept(SymbolToken('{'), token):
             type_fields = self.type_fields()
             self.__expect(SymbolToken('}'))
@@ -387,7 +445,7 @@ class Parser:
 
     def type_id(self):
         type_id = self.__expect_type(IdentifierToken)
-        return TypeId(type_id.value)
+        return self.shared_type_id(type_id.value)
 
     def variable_declaration(self):
         self.__expect(KeywordToken('var'))
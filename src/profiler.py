@@ -0,0 +1,186 @@
+import inspect
+import os
+
+import src.ast
+from src.ast import Program, FunctionCall, NilValue, IntegerValue, StringValue
+from src.native_functions import read_timestamp, STDERR_FD
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+    from rpython.rlib.listsort import make_timsort_class
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+    def make_timsort_class():
+        class TimSort(object):
+            def __init__(self, list):
+                self.list = list
+
+            def lt(self, a, b):
+                return a < b
+
+            def sort(self):
+                self.list.sort(cmp=lambda a, b: -1 if self.lt(a, b) else (1 if self.lt(b, a) else 0))
+
+        return TimSort
+
+
+class ProfileEntry:
+    """
+    The accumulated measurements of one AST node: how many times it was evaluated, the ticks spent evaluating it
+    (including its children, counted only when its outermost recursive evaluation returns) and the ticks spent in the
+    node itself.
+    The parser shares literals between all their occurrences (see Parser.integer()), so a literal is measured per node
+    it is evaluated in and located there
+    """
+
+    def __init__(self, node, located):
+        self.node = node
+        self.located = located  # the node whose location is reported
+        self.count = 0
+        self.total_ticks = 0
+        self.self_ticks = 0
+        self.depth = 0  # the number of evaluations of the node currently on the stack
+
+    def location(self):
+        return self.located.location.to_string() if self.located.location is not None else '<unknown>'
+
+    def to_string(self):
+        return '%d\t%d\t%d\t%s\t%s' % (self.count, self.self_ticks, self.total_ticks, self.location(),
+                                    self.node.__class__.__name__)
+
+
+class ProfileFrame:
+    """
+    An AST node currently being evaluated; path is the semicolon-separated list of function calls leading to it
+    """
+
+    def __init__(self, node, entry, start, path):
+        self.node = node
+        self.entry = entry
+        self.start = start
+        self.child_ticks = 0
+        self.path = path
+
+
+BaseEntrySort = make_timsort_class()
+
+
+class EntrySort(BaseEntrySort):
+    def lt(self, a, b):
+        return a.self_ticks > b.self_ticks  # descending by self time
+
+
+class Profiler:
+    """
+    A counting profiler: when enabled, every AST node evaluation is timed with read_timestamp() and attributed to the
+    node (see ProfileEntry) and to the stack of function calls it was evaluated in (for flame graphs)
+    """
+    _immutable_fields_ = ['enabled?']
+
+    ROOT_FRAME = 'main'
+
+    def __init__(self):
+        self.enabled = False
+        self.entries = {}  # (unique id of node, unique id of the parent of a literal or 0) -> ProfileEntry
+        self.stack = []  # of ProfileFrame
+        self.stacks = {}  # function call path -> self ticks
+
+    def reset(self):
+        self.entries = {}
+        self.stack = []
+        self.stacks = {}
+
+    def enter(self, node):
+        path = self.stack[-1].path if self.stack else Profiler.ROOT_FRAME
+        if isinstance(node, FunctionCall):
+            path = path + ';' + node.name
+        entry = self.entry(node)
+        entry.depth += 1
+        self.stack.append(ProfileFrame(node, entry, read_timestamp(), path))
+
+    def entry(self, node):
+        located = node
+        if isinstance(node, (NilValue, IntegerValue, StringValue)) and self.stack:
+            located = self.stack[-1].node  # the parent of a shared literal, see ProfileEntry
+        key = (compute_unique_id(node), compute_unique_id(located) if located is not node else 0)
+        entry = self.entries.get(key, None)
+        if entry is None:
+            entry = ProfileEntry(node, located)
+            self.entries[key] = entry
+        return entry
+
+    def exit(self, node):
+        frame = self.stack.pop()
+        elapsed = read_timestamp() - frame.start
+        self_ticks = elapsed - frame.child_ticks
+        if self.stack:
+            self.stack[-1].child_ticks += elapsed
+
+        entry = frame.entry
+        entry.count += 1
+        entry.depth -= 1
+        if entry.depth == 0:
+            entry.total_ticks += elapsed  # nested evaluations are already part of the outermost one
+        entry.self_ticks += self_ticks
+
+        self.stacks[frame.path] = self.stacks.get(frame.path, 0) + self_ticks
+
+    def sorted_entries(self):
+        entries = self.entries.values()
+        EntrySort(entries).sort()
+        return entries
+
+    def flat_profile(self):
+        lines = ['count\tself_ticks\ttotal_ticks\tlocation\tnode']  # tab-separated, sorted by self ticks
+        for entry in self.sorted_entries():
+            lines.append(entry.to_string())
+        return '\n'.join(lines) + '\n'
+
+    def collapsed_stacks(self):
+        """Format the function call paths as 'main;f;g ticks' lines, e.g. for Brendan Gregg's flamegraph.pl"""
+        lines = []
+        for path, ticks in self.stacks.items():
+            lines.append('%s %d' % (path, ticks))
+        return '\n'.join(lines) + '\n'
+
+    def report(self, stacks_file):
+        os.write(STDERR_FD, self.flat_profile())
+        fd = os.open(stacks_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.write(fd, self.collapsed_stacks())
+        os.close(fd)
+
+
+profiler = Profiler()
+
+
+def profile_evaluate(method):
+    """Wrap an evaluate method to record its evaluation in the profiler (if the profiler is enabled)"""
+
+    def evaluate(self, env):
+        if not profiler.enabled:
+            return method(self, env)
+        profiler.enter(self)
+        try:
+            result = method(self, env)
+        finally:
+            profiler.exit(self)
+        return result
+
+    return evaluate
+
+
+def inject_profiling_into_evaluate_methods(module):
+    """
+    Unlike rpythonizer.inject_logging_into_evaluate_methods, this wrapping is done once, at import time, so that RPython
+    translates the wrapped methods; when the profiler is not enabled the only cost is checking a quasi-immutable flag
+    """
+    for name in dir(module):
+        klass = getattr(module, name)
+        if inspect.isclass(klass) and issubclass(klass, Program) and 'evaluate' in klass.__dict__:
+            setattr(klass, 'evaluate', profile_evaluate(klass.__dict__['evaluate']))
+
+
+inject_profiling_into_evaluate_methods(src.ast)
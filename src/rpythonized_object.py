@@ -1,5 +1,6 @@
-class RPythonizedObject:
+class RPythonizedObject(object):
     _attrs_ = []
+    __slots__ = _attrs_  # subclasses that also declare __slots__ have no per-instance __dict__ in CPython
 
     def __init__(self): pass
 
@@ -16,11 +17,20 @@ class RPythonizedObject:
         return isinstance(other, self.__class__)
         # TODO inline
 
+    def has_different_hash(self, other):
+        """Whether a hash cached in both objects shows they are not equal without comparing them; see Program"""
+        return False
+
     def __eq__(self, other):
-        return self.equals(other)
+        return object_equals(self, other)
 
     def __ne__(self, other):
-        return not self.equals(other)
+        return not object_equals(self, other)
+
+
+def object_equals(obj1, obj2):
+    """Compare two objects using .equals(), unless they are the same object or their cached hashes differ"""
+    return obj1 is obj2 or (not obj1.has_different_hash(obj2) and obj1.equals(obj2))
 
 
 def list_equals(list1, list2):
@@ -29,7 +39,7 @@ def list_equals(list1, list2):
         return False
     else:
         for i in range(len(list1)):
-            if not list1[i].equals(list2[i]):
+            if not object_equals(list1[i], list2[i]):
                 print("not equal: %s" % list1[i].to_string())
                 return False
     return True
@@ -41,16 +51,16 @@ def dict_equals(dict1, dict2):
         return False
     else:
         for i in dict1:
-            if not dict1[i].equals(dict2[i]):
+            if not object_equals(dict1[i], dict2[i]):
                 return False
     return True
 
 
 def nullable_equals(obj1, obj2):
-    if obj1 is None and obj2 is None:
+    if obj1 is obj2:
         return True
     elif obj1 is not None and obj2 is not None:
-        return obj1.equals(obj2)
+        return object_equals(obj1, obj2)
     else:
         return False
 
@@ -78,15 +78,87 @@ def add_attrs(klass):
 
 
 def add_binary_operation_equals(klass):
+    from src.rpythonized_object import object_equals
     func_name = 'equals'
     if func_name not in klass.__dict__:
         def func(self, other):
-            return isinstance(other, klass) and self.left.equals(other.left) and self.right.equals(other.right)
+            return isinstance(other, klass) and object_equals(self.left, other.left) \
+                   and object_equals(self.right, other.right)
 
         setattr(klass, func_name, func)
         print('Added %s to %s' % (func_name, klass.__name__))
 
 
+def add_accept_methods(klass):
+    """
+    Add the accept() and accept_exit() methods of the traversals of src/visitor.py to an AST class; they call the
+    visitor's methods named after the class, e.g. enter_Let() and exit_Let(), so that dispatching on the class of a node
+    is a single method call
+    """
+    enter_name = 'enter_' + klass.__name__
+    exit_name = 'exit_' + klass.__name__
+
+    def accept(self, visitor):
+        return getattr(visitor, enter_name)(self)
+
+    def accept_exit(self, visitor):
+        return getattr(visitor, exit_name)(self)
+
+    setattr(klass, 'accept', accept)
+    setattr(klass, 'accept_exit', accept_exit)
+
+
+def add_default_visitor_methods(visitor_class, klass, root_class):
+    """
+    Add the enter_<class>() and exit_<class>() methods that visitor_class does not define for an AST class: they call
+    those of its parent class (e.g. enter_Add() calls enter_BinaryOperation()), up to root_class, so that visitors only
+    override the methods of the classes they handle
+    """
+    if klass is root_class:
+        return
+    parent = klass.__bases__[0]
+    parent_enter_name = 'enter_' + parent.__name__
+    parent_exit_name = 'exit_' + parent.__name__
+
+    def enter(self, node):
+        return getattr(self, parent_enter_name)(node)
+
+    def exit(self, node):
+        return getattr(self, parent_exit_name)(node)
+
+    if 'enter_' + klass.__name__ not in visitor_class.__dict__:
+        setattr(visitor_class, 'enter_' + klass.__name__, enter)
+    if 'exit_' + klass.__name__ not in visitor_class.__dict__:
+        setattr(visitor_class, 'exit_' + klass.__name__, exit)
+
+
+def bind_visitor_methods(visitor_class, classes, root_class):
+    """
+    Set the enter_<class>() and exit_<class>() methods of visitor_class for each AST class to the method it defines (or
+    inherits from a visitor class that defines it) for the class or its nearest parent class, so that visiting a node
+    does not go through the default methods of add_default_visitor_methods(); only the methods defined with their own
+    name (e.g. def enter_Let) count as defined
+    """
+    for klass in classes:
+        for prefix in ['enter_', 'exit_']:
+            ancestor = klass
+            method = find_visitor_method(visitor_class, prefix + ancestor.__name__)
+            while method is None and ancestor is not root_class:
+                ancestor = ancestor.__bases__[0]
+                method = find_visitor_method(visitor_class, prefix + ancestor.__name__)
+            assert method is not None, 'Expected %s to define %s' % (visitor_class.__name__, prefix + root_class.__name__)
+            setattr(visitor_class, prefix + klass.__name__, method)
+
+
+def find_visitor_method(visitor_class, name):
+    import inspect
+    for klass in inspect.getmro(visitor_class):
+        method = klass.__dict__.get(name)
+        if method is not None and getattr(method, '__name__', None) == name:
+            return method
+    return None
+
+
 def always_equals_false(self, other):
     return False
 
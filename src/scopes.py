@@ -1,6 +1,6 @@
-from src.ast import Exp, Sequence, FunctionDeclaration, FunctionCall, Let, BinaryOperation, LValue, Program, \
-    TypeDeclaration, ArrayCreation, VariableDeclaration, For, While, If, Assign, \
-    RecordCreation, ArrayLValue, RecordLValue, TypeId, Declaration, FunctionParameter, NativeFunctionDeclaration
+from src.ast import Exp, FunctionDeclaration, Let, Program, TypeDeclaration, VariableDeclaration, Declaration, \
+    FunctionParameter, NativeFunctionDeclaration, interned_hashes
+from src.visitor import AstVisitor, bind_methods
 
 
 def transform_lvalues(exp, existing_declarations=None):
@@ -10,10 +10,11 @@ def transform_lvalues(exp, existing_declarations=None):
     :return: nothing, but alter each LValue in the AST to contain a path to its declaration
     """
     assert isinstance(exp, Program)
+    if interned_hashes.get(exp) != 0:
+        raise ScopeError('Hash-consed ASTs share nodes between scopes and cannot be bound; parse without a '
+                         'HashConsingFactory to evaluate')
 
-    transformer = LValueTransformer(existing_declarations or [])
-    for node in DepthFirstAstIterator(exp):
-        transformer.transform(node)
+    LValueTransformer(existing_declarations or []).visit(exp)
 
     # we must also transform any declarations passed, e.g. in case they contain lvalues internally
     if isinstance(existing_declarations, list):
@@ -39,7 +40,8 @@ class ScopeError(Exception):
 
 class ExitScope(Exp):
     """
-    Used for marking when the depth-first iterator exits a scope
+    Used for marking when the depth-first iterator exits a scope (the visitors of src/visitor.py have exit methods
+    instead)
     NOTE: this must subclass expression to satisfy RPython, not for any other reason.
     """
     #_attrs_ = ['expression']
@@ -72,50 +74,9 @@ class DepthFirstAstIterator:
             raise StopIteration()
 
     def push_children_of(self, expression):
-        if isinstance(expression, Sequence):
-            self.push_several(expression.expressions)
-        elif isinstance(expression, FunctionDeclaration):
+        if isinstance(expression, Let) or isinstance(expression, FunctionDeclaration):
             self.push_one(ExitScope(expression))  # so we know when we are leaving the scope of this expression
-            self.push_one(expression.body)
-            self.push_several(expression.parameters)
-        elif isinstance(expression, FunctionCall):
-            self.push_several(expression.arguments)
-        elif isinstance(expression, Let):
-            self.push_one(ExitScope(expression))  # so we know when we are leaving the scope of this expression
-            self.push_several(expression.expressions)
-            self.push_several(expression.declarations)
-        elif isinstance(expression, BinaryOperation):
-            self.push_one(expression.right)
-            self.push_one(expression.left)
-        elif isinstance(expression, TypeDeclaration):
-            self.push_one(expression.type)
-        elif isinstance(expression, VariableDeclaration):
-            self.push_one(expression.expression)
-            if expression.type:
-                self.push_one(expression.type)
-        elif isinstance(expression, ArrayCreation):
-            self.push_one(expression.initial_value_expression)
-            self.push_one(expression.length_expression)
-        elif isinstance(expression, RecordCreation):
-            self.push_several(expression.fields.values())
-            self.push_one(expression.type_id)
-        elif isinstance(expression, For):
-            self.push_one(expression.while_expression)  # this should be body but For() has been converted to a While
-        elif isinstance(expression, While):
-            self.push_one(expression.body)
-            self.push_one(expression.condition)
-        elif isinstance(expression, If):
-            self.push_one(expression.body_if_false)
-            self.push_one(expression.body_if_true)
-            self.push_one(expression.condition)
-        elif isinstance(expression, Assign):
-            self.push_one(expression.expression)
-            self.push_one(expression.lvalue)
-        elif isinstance(expression, LValue):
-            if expression.next:
-                self.push_one(expression.next)
-            if isinstance(expression, ArrayLValue):
-                self.push_one(expression.expression)
+        self.push_several(expression.children())
 
     def push_one(self, expression):
         assert not isinstance(expression, list)
@@ -128,7 +89,7 @@ class DepthFirstAstIterator:
             self.stack.append(expressions[i])
 
 
-class LValueTransformer:
+class LValueTransformer(AstVisitor):
     """
     Transforms LValues to maintain a path to their declaring scope; this path uses the tuple (hops, index), where hops
     is the number of hops to traverse to the declaring scope and index is the location within that scope. This class
@@ -139,36 +100,49 @@ class LValueTransformer:
         self.scopes = existing_declarations or []
         assert isinstance(self.scopes, list)
 
-    def transform(self, node):
-        if isinstance(node, Let):
-            self.scopes.append(node)
-            for i in range(len(node.declarations)):
-                declaration = node.declarations[i]
-                assert isinstance(declaration, Declaration)
-                declaration.parent = node
-                declaration.index = i
-        elif isinstance(node, FunctionDeclaration):
-            self.scopes.append(node)
-            for i in range(len(node.parameters)):
-                parameter = node.parameters[i]
-                assert isinstance(parameter, FunctionParameter)
-                parameter.parent = node
-                parameter.index = i
-        elif isinstance(node, LValue):
-            if isinstance(node, ArrayLValue):
-                # if an expression is used to index into the array, it will be transformed as we iterate over the tree
-                pass
-            elif isinstance(node, RecordLValue):
-                # TODO eventually store records as arrays and index into the array here
-                pass
-            else:
-                node.declaration = self.find_declaration(node.name, [VariableDeclaration, FunctionParameter])
-        elif isinstance(node, FunctionCall):
-            node.declaration = self.find_declaration(node.name, [FunctionDeclaration, NativeFunctionDeclaration])
-        elif isinstance(node, TypeId):
-            node.declaration = self.find_declaration(node.name, [TypeDeclaration])
-        elif isinstance(node, ExitScope):
-            self.scopes.pop()
+    def enter_Let(self, node):
+        self.scopes.append(node)
+        for i in range(len(node.declarations)):
+            declaration = node.declarations[i]
+            assert isinstance(declaration, Declaration)
+            declaration.parent = node
+            declaration.index = i
+        return True
+
+    def exit_Let(self, node):
+        self.scopes.pop()
+
+    def enter_FunctionDeclaration(self, node):
+        self.scopes.append(node)
+        for i in range(len(node.parameters)):
+            parameter = node.parameters[i]
+            assert isinstance(parameter, FunctionParameter)
+            parameter.parent = node
+            parameter.index = i
+        return True
+
+    def exit_FunctionDeclaration(self, node):
+        self.scopes.pop()
+
+    def enter_LValue(self, node):
+        node.declaration = self.find_declaration(node.name, [VariableDeclaration, FunctionParameter])
+        return True
+
+    def enter_ArrayLValue(self, node):
+        # if an expression is used to index into the array, it will be transformed as we iterate over the tree
+        return True
+
+    def enter_RecordLValue(self, node):
+        # TODO eventually store records as arrays and index into the array here
+        return True
+
+    def enter_FunctionCall(self, node):
+        node.declaration = self.find_declaration(node.name, [FunctionDeclaration, NativeFunctionDeclaration])
+        return True
+
+    def enter_TypeId(self, node):
+        node.declaration = self.find_declaration(node.name, [TypeDeclaration])
+        return True
 
     def find_declaration(self, name, expected_types):
         declaration = self.find(name, self.scopes)
@@ -201,3 +175,6 @@ class LValueTransformer:
                 raise ScopeError('Unknown scope type; should be a Let or FunctionDeclaration: %s' % scope)
 
         raise ScopeError('Unable to find the name %s in the enclosing scopes' % name)
+
+
+bind_methods(LValueTransformer)
@@ -0,0 +1,546 @@
+from src.ast import IntegerValue, StringValue, NilValue, NativeFunctionDeclaration, Multiply, Divide, Add, Subtract, \
+    GreaterThanOrEquals, LessThanOrEquals, Equals, NotEquals, GreaterThan, LessThan, And, Or
+from src.memoization import PURE_NATIVE_FUNCTIONS
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+"""
+The mnemonic of each binary operator, for printing
+"""
+OPERATOR_MNEMONICS = [(Multiply, 'mul'), (Divide, 'div'), (Add, 'add'), (Subtract, 'sub'), (GreaterThanOrEquals, 'ge'),
+                      (LessThanOrEquals, 'le'), (Equals, 'eq'), (NotEquals, 'ne'), (GreaterThan, 'gt'),
+                      (LessThan, 'lt'), (And, 'and'), (Or, 'or')]
+
+
+def operator_mnemonic(operator):
+    for operator_class, mnemonic in OPERATOR_MNEMONICS:
+        if operator is operator_class:
+            return mnemonic
+    return operator.__name__
+
+
+class IrError(Exception):
+    """
+    Raised when a program cannot be lowered to (or raised from) the IR or when the IR is malformed (see verifier.py)
+    """
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def to_string(self):
+        return self.reason
+
+    def __str__(self):
+        return self.to_string()
+
+
+# VALUES
+
+
+class Value:
+    """
+    An SSA value: defined exactly once, by a constant, a function parameter or an instruction, and then used as the
+    operand of any number of instructions
+    """
+
+    def __init__(self):
+        self.number = -1  # assigned by Function.number_values(), for printing
+
+    def name(self):
+        return 'v%d' % self.number
+
+    def operand_string(self):
+        return self.name()
+
+
+class Constant(Value):
+    """
+    A literal: an IntegerValue, StringValue or NilValue, or None for the absence of a value (e.g. the value of an
+    assignment or of an if-then without an else)
+    """
+
+    def __init__(self, value):
+        Value.__init__(self)
+        self.value = value
+
+    def same_as(self, other):
+        if self.value is None or other.value is None:
+            return self.value is None and other.value is None
+        return self.value.equals(other.value)
+
+    def operand_string(self):
+        if self.value is None:
+            return 'none'
+        elif isinstance(self.value, IntegerValue):
+            return '%d' % self.value.integer
+        elif isinstance(self.value, StringValue):
+            return '"%s"' % self.value.get_string()
+        elif isinstance(self.value, NilValue):
+            return 'nil'
+        return self.value.to_string()
+
+
+class Parameter(Value):
+    """
+    The value passed for a parameter of the function; the parameter's later assignments define new values
+    """
+
+    def __init__(self, declaration, index):
+        Value.__init__(self)
+        self.declaration = declaration
+        self.index = index
+
+    def operand_string(self):
+        return '%s(%s)' % (self.name(), self.declaration.name)
+
+
+# INSTRUCTIONS
+
+
+class Instruction(Value):
+    """
+    An instruction of a basic block; its operands are Values. Instructions without side effects (see is_pure()) may
+    be removed when their value is unused
+    """
+    mnemonic = 'instruction'
+
+    def __init__(self, operands):
+        Value.__init__(self)
+        self.operands = operands
+        self.block = None
+
+    def is_pure(self):
+        return True
+
+    def is_terminator(self):
+        return False
+
+    def has_value(self):
+        return True
+
+    def replace_operand(self, old, new):
+        replaced = 0
+        for i in range(len(self.operands)):
+            if self.operands[i] is old:
+                self.operands[i] = new
+                replaced += 1
+        return replaced
+
+    def detail_string(self):
+        return ''
+
+    def to_string(self):
+        operands = ', '.join([operand.operand_string() for operand in self.operands])
+        text = '%s%s %s' % (self.mnemonic, self.detail_string(), operands)
+        if self.has_value():
+            return '%s = %s' % (self.name(), text.strip())
+        return text.strip()
+
+
+class Phi(Instruction):
+    """
+    The value of a variable at the start of a block with several predecessors: operands[i] is the value flowing in
+    from block.predecessors[i]
+    """
+    mnemonic = 'phi'
+
+    def __init__(self, variable_name):
+        Instruction.__init__(self, [])
+        self.variable_name = variable_name  # for printing only
+
+    def detail_string(self):
+        return '[%s]' % self.variable_name
+
+
+class Copy(Instruction):
+    """
+    A new name for an existing value, e.g. for each assignment of a variable (see CopyPropagation)
+    """
+    mnemonic = 'copy'
+
+    def __init__(self, source, variable_name):
+        Instruction.__init__(self, [source])
+        self.variable_name = variable_name
+
+    def source(self):
+        return self.operands[0]
+
+    def detail_string(self):
+        return '[%s]' % self.variable_name
+
+
+class BinaryOp(Instruction):
+    """
+    One of the AST's binary operations (e.g. Add), given as its class so that constants are folded with the same code
+    that evaluates it
+    """
+    mnemonic = 'binary'
+
+    def __init__(self, operator, left, right):
+        Instruction.__init__(self, [left, right])
+        self.operator = operator
+
+    def to_string(self):
+        return '%s = %s %s, %s' % (self.name(), operator_mnemonic(self.operator), self.operands[0].operand_string(),
+                                   self.operands[1].operand_string())
+
+
+class Load(Instruction):
+    """
+    A read of a variable that is not in SSA form: one declared outside of the function (e.g. a global)
+    """
+    mnemonic = 'load'
+
+    def __init__(self, declaration):
+        Instruction.__init__(self, [])
+        self.declaration = declaration
+
+    def detail_string(self):
+        return ' %s' % self.declaration.name
+
+
+class Store(Instruction):
+    mnemonic = 'store'
+
+    def __init__(self, declaration, value):
+        Instruction.__init__(self, [value])
+        self.declaration = declaration
+
+    def is_pure(self):
+        return False
+
+    def has_value(self):
+        return False
+
+    def detail_string(self):
+        return ' %s,' % self.declaration.name
+
+
+class Call(Instruction):
+    mnemonic = 'call'
+
+    def __init__(self, declaration, arguments):
+        Instruction.__init__(self, arguments)
+        self.declaration = declaration
+
+    def is_pure(self):
+        declaration = self.declaration
+        return isinstance(declaration, NativeFunctionDeclaration) and declaration.name in PURE_NATIVE_FUNCTIONS
+
+    def detail_string(self):
+        return ' %s' % self.declaration.name
+
+
+class NewRecord(Instruction):
+    """
+    A record creation; operands holds the field values in the order of names (that of the record type)
+    """
+    mnemonic = 'record'
+
+    def __init__(self, type_id, names, values):
+        Instruction.__init__(self, values)
+        self.type_id = type_id
+        self.names = names
+
+    def detail_string(self):
+        return ' %s{%s}' % (self.type_id.name, ', '.join(self.names))
+
+
+class NewArray(Instruction):
+    mnemonic = 'array'
+
+    def __init__(self, type_id, length, initial_value):
+        Instruction.__init__(self, [length, initial_value])
+        self.type_id = type_id
+
+    def detail_string(self):
+        return ' %s' % self.type_id.name
+
+
+class GetField(Instruction):
+    mnemonic = 'getfield'
+
+    def __init__(self, record, field):
+        Instruction.__init__(self, [record])
+        self.field = field
+
+    def detail_string(self):
+        return ' .%s' % self.field
+
+
+class SetField(Instruction):
+    mnemonic = 'setfield'
+
+    def __init__(self, record, field, value):
+        Instruction.__init__(self, [record, value])
+        self.field = field
+
+    def is_pure(self):
+        return False
+
+    def has_value(self):
+        return False
+
+    def detail_string(self):
+        return ' .%s' % self.field
+
+
+class GetElement(Instruction):
+    mnemonic = 'getelement'
+
+    def __init__(self, array, index):
+        Instruction.__init__(self, [array, index])
+
+
+class SetElement(Instruction):
+    mnemonic = 'setelement'
+
+    def __init__(self, array, index, value):
+        Instruction.__init__(self, [array, index, value])
+
+    def is_pure(self):
+        return False
+
+    def has_value(self):
+        return False
+
+
+# TERMINATORS
+
+
+class Terminator(Instruction):
+    def is_pure(self):
+        return False
+
+    def is_terminator(self):
+        return True
+
+    def has_value(self):
+        return False
+
+    def successors(self):
+        return []
+
+    def replace_successor(self, old, new):
+        pass
+
+
+class Jump(Terminator):
+    mnemonic = 'jump'
+
+    def __init__(self, target):
+        Terminator.__init__(self, [])
+        self.target = target
+
+    def successors(self):
+        return [self.target]
+
+    def replace_successor(self, old, new):
+        if self.target is old:
+            self.target = new
+
+    def to_string(self):
+        return 'jump %s' % self.target.name()
+
+
+class Branch(Terminator):
+    """
+    Jump to if_true when the (integer) condition is not 0 and to if_false otherwise; lowering records the block where
+    the two sides of an if meet again as join (None for the branch of a loop) so that the IR can be raised back to
+    structured control flow
+    """
+    mnemonic = 'branch'
+
+    def __init__(self, condition, if_true, if_false, join=None):
+        Terminator.__init__(self, [condition])
+        self.if_true = if_true
+        self.if_false = if_false
+        self.join = join
+
+    def condition(self):
+        return self.operands[0]
+
+    def successors(self):
+        return [self.if_true, self.if_false]
+
+    def replace_successor(self, old, new):
+        if self.if_true is old:
+            self.if_true = new
+        if self.if_false is old:
+            self.if_false = new
+
+    def to_string(self):
+        return 'branch %s, %s, %s' % (self.operands[0].operand_string(), self.if_true.name(), self.if_false.name())
+
+
+class Return(Terminator):
+    mnemonic = 'return'
+
+    def __init__(self, value):
+        Terminator.__init__(self, [value])
+
+    def value(self):
+        return self.operands[0]
+
+
+# BLOCKS AND FUNCTIONS
+
+
+class Block:
+    """
+    A basic block: phis, then instructions, then one terminator. A block that heads a loop records the block the loop
+    exits to as loop_exit (see Branch.join)
+    """
+
+    def __init__(self, number):
+        self.number = number
+        self.instructions = []
+        self.predecessors = []
+        self.loop_exit = None
+
+    def name(self):
+        return 'b%d' % self.number
+
+    def terminator(self):
+        if self.instructions and self.instructions[-1].is_terminator():
+            return self.instructions[-1]
+        return None
+
+    def successors(self):
+        terminator = self.terminator()
+        return terminator.successors() if terminator is not None else []
+
+    def phis(self):
+        return [instruction for instruction in self.instructions if isinstance(instruction, Phi)]
+
+    def append(self, instruction):
+        assert self.terminator() is None, 'cannot append to a terminated block'
+        instruction.block = self
+        self.instructions.append(instruction)
+        return instruction
+
+    def insert_phi(self, phi):
+        phi.block = self
+        self.instructions.insert(0, phi)
+        return phi
+
+    def remove(self, instruction):
+        self.instructions = [i for i in self.instructions if i is not instruction]
+        instruction.block = None
+
+    def predecessor_index(self, predecessor):
+        for i in range(len(self.predecessors)):
+            if self.predecessors[i] is predecessor:
+                return i
+        return -1
+
+    def remove_predecessor(self, predecessor):
+        """Forget the edge from a predecessor, along with the values its phis received along it"""
+        i = self.predecessor_index(predecessor)
+        assert i >= 0
+        del self.predecessors[i]
+        for phi in self.phis():
+            del phi.operands[i]
+
+    def to_string(self):
+        lines = ['%s:%s' % (self.name(), ' ; preds=%s' % ', '.join([p.name() for p in self.predecessors])
+                                         if self.predecessors else '')]
+        for instruction in self.instructions:
+            lines.append('  ' + instruction.to_string())
+        return '\n'.join(lines)
+
+
+class Function:
+    """
+    The control-flow graph of a Tiger function body (or of the body of the program's top-level let, see
+    lowering.py): its blocks, the first of which is the entry
+    """
+
+    def __init__(self, name, declaration=None):
+        self.name = name
+        self.declaration = declaration  # the FunctionDeclaration or, for the program body, the top-level Let
+        self.parameters = []
+        self.blocks = []
+        self.next_block_number = 0
+
+    def entry(self):
+        return self.blocks[0]
+
+    def new_block(self):
+        block = Block(self.next_block_number)
+        self.next_block_number += 1
+        self.blocks.append(block)
+        return block
+
+    @staticmethod
+    def add_edge(source, target):
+        target.predecessors.append(source)
+
+    def instructions(self):
+        return [instruction for block in self.blocks for instruction in block.instructions]
+
+    def uses(self):
+        """:return: for each value (by identity), the instructions that use it, once per use"""
+        uses = {}
+        for instruction in self.instructions():
+            for operand in instruction.operands:
+                key = compute_unique_id(operand)
+                if key not in uses:
+                    uses[key] = []
+                uses[key].append(instruction)
+        return uses
+
+    def replace_all_uses(self, old, new):
+        replaced = 0
+        for instruction in self.instructions():
+            replaced += instruction.replace_operand(old, new)
+        return replaced
+
+    def reachable_blocks(self):
+        """:return: the blocks reachable from the entry, in depth-first pre-order"""
+        seen = {}
+        order = []
+        stack = [self.entry()]
+        while stack:
+            block = stack.pop()
+            if compute_unique_id(block) in seen:
+                continue
+            seen[compute_unique_id(block)] = True
+            order.append(block)
+            successors = block.successors()
+            for i in range(len(successors) - 1, -1, -1):
+                stack.append(successors[i])
+        return order
+
+    def remove_unreachable_blocks(self):
+        """:return: the number of blocks removed; the edges they started are removed from their successors"""
+        reachable = {}
+        for block in self.reachable_blocks():
+            reachable[compute_unique_id(block)] = True
+        removed = [block for block in self.blocks if compute_unique_id(block) not in reachable]
+        for block in removed:
+            for successor in block.successors():
+                if compute_unique_id(successor) in reachable:
+                    successor.remove_predecessor(block)
+        self.blocks = [block for block in self.blocks if compute_unique_id(block) in reachable]
+        return len(removed)
+
+    def number_values(self):
+        number = 0
+        for parameter in self.parameters:
+            parameter.number = number
+            number += 1
+        for instruction in self.instructions():
+            if instruction.has_value():
+                instruction.number = number
+                number += 1
+        return number
+
+    def to_string(self):
+        self.number_values()
+        header = 'function %s(%s):' % (self.name, ', '.join([p.operand_string() for p in self.parameters]))
+        return '\n'.join([header] + [block.to_string() for block in self.blocks])
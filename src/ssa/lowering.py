@@ -0,0 +1,364 @@
+from src.ast import Program, Value as AstValue, IntegerValue, StringValue, NilValue, LValue, RecordLValue, ArrayLValue, \
+    Assign, Sequence, Let, FunctionCall, If, While, For, Break, BinaryOperation, ArrayCreation, RecordCreation, \
+    RecordType, TypeDeclaration, VariableDeclaration, FunctionDeclaration
+from src.scopes import DepthFirstAstIterator
+from src.ssa.ir import IrError, Function, Constant, Parameter, Phi, Copy, BinaryOp, Load, Store, Call, NewRecord, \
+    NewArray, GetField, SetField, GetElement, SetElement, Jump, Branch, Return
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+"""
+The name of the main function, i.e. of the body of the program's top-level let
+"""
+MAIN = '$main'
+
+
+class Lowering:
+    """
+    Lower the body of a function from the resolved AST (see scopes.transform_lvalues) to a control-flow graph in SSA
+    form, constructed directly as in Braun et al., "Simple and Efficient Construction of Static Single Assignment Form":
+    each assignment of a variable declared in the function (or of one of its parameters) defines a new value, and
+    reading a variable looks up its value in the current block or, recursively, in the block's predecessors, adding a
+    phi where several predecessors meet. Phis are only completed once all the predecessors of a block are known (the
+    block is sealed), which for a loop header is after its body. Variables declared outside of the function are read
+    and written with Load and Store. The value of a while loop (that of its last iteration, as While.evaluate returns
+    it) is tracked as a variable of its own.
+
+    A function cannot be lowered if it declares functions (their bodies read its variables from the environments of
+    its lets, which the IR does not keep) or record types (RecordCreation.evaluate finds the type in the environment
+    of the declaring let) or if it breaks outside of a loop
+    """
+
+    def __init__(self, name, declaration):
+        self.function = Function(name, declaration)
+        self.current = None
+        self.definitions = {}  # for each variable, the value it has at the end of each block
+        self.sealed = {}
+        self.incomplete = {}  # for each unsealed block, the (variable, name, phi) to complete once it is sealed
+        self.local = {}  # the declarations in SSA form
+        self.local_types = {}
+        self.loops = []  # (header, exit) of the enclosing loops
+
+    def lower_function(self, declaration):
+        assert isinstance(declaration, FunctionDeclaration)
+        self.start_entry()
+        for i in range(len(declaration.parameters)):
+            parameter = declaration.parameters[i]
+            value = Parameter(parameter, i)
+            self.function.parameters.append(value)
+            self.local[compute_unique_id(parameter)] = True
+            self.write_variable(compute_unique_id(parameter), self.current, value)
+        return self.finish(self.lower(declaration.body))
+
+    def lower_expressions(self, expressions):
+        """Lower the body of a let whose declarations are kept (e.g. the top-level let of the program)"""
+        self.start_entry()
+        value = Constant(None)
+        for expression in expressions:
+            value = self.lower(expression)
+        return self.finish(value)
+
+    def start_entry(self):
+        self.current = self.function.new_block()
+        self.seal(self.current)
+
+    def finish(self, value):
+        self.emit(Return(value))
+        self.function.remove_unreachable_blocks()
+        return self.function
+
+    # VARIABLES
+
+    def write_variable(self, variable, block, value):
+        if variable not in self.definitions:
+            self.definitions[variable] = {}
+        self.definitions[variable][compute_unique_id(block)] = value
+
+    def read_variable(self, variable, name, block):
+        # follow single predecessors iteratively since straight-line code may span many blocks
+        visited = []
+        value = None
+        while True:
+            definitions = self.definitions.get(variable, None)
+            if definitions is not None and compute_unique_id(block) in definitions:
+                value = definitions[compute_unique_id(block)]
+                break
+            elif compute_unique_id(block) not in self.sealed:
+                value = block.insert_phi(Phi(name))
+                self.incomplete[compute_unique_id(block)].append((variable, name, value))
+                self.write_variable(variable, block, value)
+                break
+            elif len(block.predecessors) == 0:
+                value = Constant(None)  # read before any assignment, e.g. in unreachable code
+                self.write_variable(variable, block, value)
+                break
+            elif len(block.predecessors) == 1:
+                visited.append(block)
+                block = block.predecessors[0]
+            else:
+                phi = block.insert_phi(Phi(name))
+                self.write_variable(variable, block, phi)  # before reading the predecessors, which may loop back
+                self.add_phi_operands(variable, name, phi)
+                value = phi
+                break
+        for block in visited:
+            self.write_variable(variable, block, value)
+        return value
+
+    def add_phi_operands(self, variable, name, phi):
+        for predecessor in phi.block.predecessors:
+            phi.operands.append(self.read_variable(variable, name, predecessor))
+
+    def seal(self, block):
+        key = compute_unique_id(block)
+        for variable, name, phi in self.incomplete.get(key, []):
+            self.add_phi_operands(variable, name, phi)
+        self.incomplete[key] = []
+        self.sealed[key] = True
+
+    def new_block(self):
+        block = self.function.new_block()
+        self.incomplete[compute_unique_id(block)] = []
+        return block
+
+    def is_local(self, declaration):
+        return compute_unique_id(declaration) in self.local
+
+    def read_declaration(self, declaration):
+        if self.is_local(declaration):
+            return self.read_variable(compute_unique_id(declaration), declaration.name, self.current)
+        return self.emit(Load(declaration))
+
+    def assign_declaration(self, declaration, value):
+        if self.is_local(declaration):
+            copy = self.emit(Copy(value, declaration.name))
+            self.write_variable(compute_unique_id(declaration), self.current, copy)
+        else:
+            self.emit(Store(declaration, value))
+
+    # CONTROL FLOW
+
+    def emit(self, instruction):
+        return self.current.append(instruction)
+
+    def jump(self, target):
+        self.emit(Jump(target))
+        Function.add_edge(self.current, target)
+
+    def branch(self, condition, if_true, if_false, join):
+        self.emit(Branch(condition, if_true, if_false, join))
+        Function.add_edge(self.current, if_true)
+        Function.add_edge(self.current, if_false)
+        self.seal(if_true)
+        self.seal(if_false)
+
+    # EXPRESSIONS
+
+    def lower(self, node):
+        """:return: the Value of the expression (a Constant(None) if it has none)"""
+        if isinstance(node, IntegerValue) or isinstance(node, StringValue) or isinstance(node, NilValue):
+            return Constant(node)
+        elif isinstance(node, AstValue):
+            raise IrError('unexpected value in the AST: %s' % node.__class__.__name__)
+        elif isinstance(node, LValue):
+            return self.lower_read(node)
+        elif isinstance(node, Assign):
+            self.lower_assign(node)
+            return Constant(None)
+        elif isinstance(node, Sequence):
+            value = Constant(None)
+            for expression in node.expressions:
+                value = self.lower(expression)
+            return value
+        elif isinstance(node, Let):
+            return self.lower_let(node)
+        elif isinstance(node, FunctionCall):
+            arguments = [self.lower(argument) for argument in node.arguments]
+            return self.emit(Call(node.declaration, arguments))
+        elif isinstance(node, If):
+            return self.lower_if(node)
+        elif isinstance(node, While):
+            return self.lower_while(node)
+        elif isinstance(node, For):
+            self.lower(node.while_expression)
+            return Constant(None)  # see For.evaluate
+        elif isinstance(node, Break):
+            if not self.loops:
+                raise IrError('break outside of a loop')
+            self.jump(self.loops[-1][1])
+            self.current = self.new_block()  # the code after a break is unreachable
+            self.seal(self.current)
+            return Constant(None)
+        elif isinstance(node, BinaryOperation):
+            left = self.lower(node.left)
+            right = self.lower(node.right)
+            return self.emit(BinaryOp(node.__class__, left, right))
+        elif isinstance(node, ArrayCreation):
+            length = self.lower(node.length_expression)
+            initial_value = self.lower(node.initial_value_expression)
+            return self.emit(NewArray(node.type_id, length, initial_value))
+        elif isinstance(node, RecordCreation):
+            return self.lower_record_creation(node)
+        raise IrError('cannot lower %s' % node.__class__.__name__)
+
+    def lower_read(self, lvalue):
+        value = self.read_declaration(lvalue.declaration)
+        link = lvalue.next
+        while link is not None:
+            value = self.lower_link(value, link)
+            link = link.next
+        return value
+
+    def lower_link(self, value, link):
+        if isinstance(link, ArrayLValue):
+            index = self.lower(link.expression)
+            return self.emit(GetElement(value, index))
+        elif isinstance(link, RecordLValue):
+            return self.emit(GetField(value, link.name))
+        raise IrError('expected an array- or record-lvalue')
+
+    def lower_assign(self, assign):
+        # as in Assign.evaluate, the value is evaluated before the destination
+        value = self.lower(assign.expression)
+        lvalue = assign.lvalue
+        if lvalue.next is None:
+            self.assign_declaration(lvalue.declaration, value)
+            return
+        destination = self.read_declaration(lvalue.declaration)
+        link = lvalue.next
+        while link.next is not None:
+            destination = self.lower_link(destination, link)
+            link = link.next
+        if isinstance(link, ArrayLValue):
+            index = self.lower(link.expression)
+            self.emit(SetElement(destination, index, value))
+        elif isinstance(link, RecordLValue):
+            self.emit(SetField(destination, link.name, value))
+        else:
+            raise IrError('expected an array- or record-lvalue')
+
+    def lower_let(self, let):
+        for declaration in let.declarations:
+            if isinstance(declaration, VariableDeclaration):
+                value = self.lower(declaration.expression)
+                self.local[compute_unique_id(declaration)] = True
+                self.assign_declaration(declaration, value)
+            elif isinstance(declaration, TypeDeclaration):
+                self.local_types[compute_unique_id(declaration)] = True
+            elif isinstance(declaration, FunctionDeclaration):
+                raise IrError('declares function %s' % declaration.name)
+        value = Constant(None)
+        for expression in let.expressions:
+            value = self.lower(expression)
+        return value
+
+    def lower_if(self, node):
+        condition = self.lower(node.condition)
+        if_true = self.new_block()
+        if_false = self.new_block()
+        join = self.new_block()
+        self.branch(condition, if_true, if_false, join)
+
+        self.current = if_true
+        true_value = self.lower(node.body_if_true)
+        self.jump(join)
+        self.current = if_false
+        false_value = Constant(None)
+        if node.body_if_false is not None:
+            false_value = self.lower(node.body_if_false)
+        self.jump(join)
+
+        self.seal(join)
+        self.current = join
+        if is_none(true_value) and is_none(false_value):
+            return Constant(None)
+        phi = join.insert_phi(Phi('$if'))
+        phi.operands = [true_value, false_value]  # in the order of the jumps to join
+        return phi
+
+    def lower_while(self, node):
+        result = compute_unique_id(node)  # the value of the loop
+        self.write_variable(result, self.current, Constant(None))
+        header = self.new_block()
+        self.jump(header)
+        exit_block = self.new_block()
+        header.loop_exit = exit_block
+
+        self.current = header
+        condition = self.lower(node.condition)
+        body = self.new_block()
+        exit_edge = self.new_block()  # so that no edge goes from a branch to a block with several predecessors
+        self.branch(condition, body, exit_edge, None)
+
+        self.loops.append((header, exit_block))
+        self.current = body
+        value = self.lower(node.body)
+        self.write_variable(result, self.current, value)
+        self.jump(header)
+        self.loops.pop()
+
+        self.current = exit_edge
+        self.jump(exit_block)
+        self.seal(header)
+        self.seal(exit_block)
+        self.current = exit_block
+        return self.read_variable(result, '$while', exit_block)
+
+    def lower_record_creation(self, node):
+        declaration = node.type_id.declaration
+        if compute_unique_id(declaration) in self.local_types:
+            raise IrError('declares record type %s' % declaration.name)
+        if not isinstance(declaration, TypeDeclaration) or not isinstance(declaration.type, RecordType):
+            raise IrError('creates a record of unknown type %s' % node.type_id.name)
+        names = []
+        values = []
+        for name in declaration.type.field_types:  # in the order of RecordCreation.evaluate
+            if name not in node.fields:
+                raise IrError('misses field %s of record type %s' % (name, declaration.name))
+            names.append(name)
+            values.append(self.lower(node.fields[name]))
+        return self.emit(NewRecord(node.type_id, names, values))
+
+
+def is_none(value):
+    return isinstance(value, Constant) and value.value is None
+
+
+def lower_function(declaration):
+    """
+    :return: the SSA Function of a Tiger function (see Lowering); raises IrError if it cannot be lowered
+    """
+    return Lowering(declaration.name, declaration).lower_function(declaration)
+
+
+def lower_main(let):
+    """
+    :return: the SSA Function of the body of a let (e.g. the top-level let of a program) whose declarations are kept
+    """
+    return Lowering(MAIN, let).lower_expressions(let.expressions)
+
+
+def lower_program(program):
+    """
+    Lower each function of a program and the body of its top-level let
+    :return: the list of lowered Functions and the list of (name, reason) of the functions that could not be lowered
+    """
+    assert isinstance(program, Program)
+    functions = []
+    skipped = []
+    for node in DepthFirstAstIterator(program):
+        if isinstance(node, FunctionDeclaration):
+            try:
+                functions.append(lower_function(node))
+            except IrError as e:
+                skipped.append((node.name, e.reason))
+    if isinstance(program, Let):
+        try:
+            functions.append(lower_main(program))
+        except IrError as e:
+            skipped.append((MAIN, e.reason))
+    return functions, skipped
@@ -0,0 +1,358 @@
+from src.ast import Program, IntegerValue, StringValue, NilValue
+from src.ssa.ir import Constant, Parameter, Instruction, Phi, Copy, BinaryOp, Call, Jump, Branch
+from src.ssa.lowering import lower_program
+from src.ssa.raising import raise_function
+from src.ssa.verifier import VerificationError, verify
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class Pass:
+    """
+    A transformation of a Function, see PassManager
+    """
+    name = 'pass'
+
+    def run(self, function):
+        """:return: the number of changes made to the function, e.g. for reporting"""
+        return 0
+
+
+def same_value(a, b):
+    return a is b or (isinstance(a, Constant) and isinstance(b, Constant) and a.same_as(b))
+
+
+def replace_instruction(function, instruction, value):
+    function.replace_all_uses(instruction, value)
+    instruction.block.remove(instruction)
+
+
+class CopyPropagation(Pass):
+    """
+    Replace the uses of each copy with its source and of each trivial phi--one whose operands are all the same value
+    or the phi itself, e.g. for a variable a loop does not assign--with that value, until none remain
+    """
+    name = 'copy-propagation'
+
+    def run(self, function):
+        changes = 0
+        changed = True
+        while changed:
+            changed = False
+            for block in function.blocks:
+                for instruction in [i for i in block.instructions]:
+                    replacement = None
+                    if isinstance(instruction, Copy):
+                        replacement = instruction.source()
+                    elif isinstance(instruction, Phi):
+                        replacement = self.trivial_phi_value(instruction)
+                    if replacement is not None:
+                        replace_instruction(function, instruction, replacement)
+                        changes += 1
+                        changed = True
+        return changes
+
+    @staticmethod
+    def trivial_phi_value(phi):
+        """:return: the only value the phi can have, or None"""
+        value = None
+        for operand in phi.operands:
+            if operand is phi or (value is not None and same_value(operand, value)):
+                continue
+            elif value is not None:
+                return None
+            value = operand
+        if value is None:
+            return Constant(None)  # the phi only has itself as operand: the variable is never assigned
+        return value
+
+
+"""
+The lattice of SparseConditionalConstantPropagation: a value is not known yet (TOP), a constant or overdefined
+"""
+TOP = 0
+CONSTANT = 1
+BOTTOM = 2
+
+
+class SparseConditionalConstantPropagation(Pass):
+    """
+    The sparse conditional constant propagation of Wegman and Zadeck, "Constant Propagation with Conditional
+    Branches": values are optimistically assumed constant until shown otherwise and blocks unreachable until an
+    executable edge reaches them, so that a constant branch condition keeps the values of the branch not taken from
+    reaching the phis after it (and loops that only ever assign constants keep them constant). Binary operations and
+    pure native calls on constants are folded by evaluating them as the interpreter would (an operation that would
+    fail, e.g. a division by zero, is left for the interpreter). Then the uses of constant values are replaced with
+    constants, branches on constants become jumps and the blocks that are no longer reachable are removed
+    """
+    name = 'sccp'
+
+    def __init__(self):
+        self.kinds = {}
+        self.constants = {}
+        self.executable_blocks = {}
+        self.executable_edges = {}
+        self.uses = {}
+        self.flow_worklist = []  # (predecessor, block) edges
+        self.value_worklist = []  # instructions whose operands changed
+
+    def run(self, function):
+        self.kinds = {}
+        self.constants = {}
+        self.executable_blocks = {}
+        self.executable_edges = {}
+        self.uses = function.uses()
+        self.flow_worklist.append((None, function.entry()))
+        while self.flow_worklist or self.value_worklist:
+            while self.flow_worklist:
+                predecessor, block = self.flow_worklist.pop()
+                self.visit_edge(predecessor, block)
+            while self.value_worklist:
+                instruction = self.value_worklist.pop()
+                if compute_unique_id(instruction.block) in self.executable_blocks:
+                    self.visit(instruction)
+        return self.rewrite(function)
+
+    # PROPAGATION
+
+    def visit_edge(self, predecessor, block):
+        if predecessor is not None:
+            edge = (compute_unique_id(predecessor), compute_unique_id(block))
+            if edge in self.executable_edges:
+                return
+            self.executable_edges[edge] = True
+        first_visit = compute_unique_id(block) not in self.executable_blocks
+        self.executable_blocks[compute_unique_id(block)] = True
+        for instruction in block.instructions:
+            if isinstance(instruction, Phi):
+                self.visit(instruction)
+            elif first_visit:
+                self.visit(instruction)
+
+    def is_executable(self, predecessor, block):
+        return (compute_unique_id(predecessor), compute_unique_id(block)) in self.executable_edges
+
+    def lattice(self, value):
+        """:return: the (kind, constant) of a value"""
+        if isinstance(value, Constant):
+            return CONSTANT, value.value
+        elif isinstance(value, Parameter):
+            return BOTTOM, None
+        key = compute_unique_id(value)
+        return self.kinds.get(key, TOP), self.constants.get(key, None)
+
+    def visit(self, instruction):
+        if isinstance(instruction, Jump):
+            self.flow_worklist.append((instruction.block, instruction.target))
+        elif isinstance(instruction, Branch):
+            kind, constant = self.lattice(instruction.condition())
+            if kind == CONSTANT and isinstance(constant, IntegerValue):
+                target = instruction.if_true if constant.integer != 0 else instruction.if_false
+                self.flow_worklist.append((instruction.block, target))
+            elif kind != TOP:
+                self.flow_worklist.append((instruction.block, instruction.if_true))
+                self.flow_worklist.append((instruction.block, instruction.if_false))
+        elif instruction.has_value():
+            kind, constant = self.evaluate(instruction)
+            self.update(instruction, kind, constant)
+
+    def evaluate(self, instruction):
+        if isinstance(instruction, Phi):
+            kind, constant = TOP, None
+            predecessors = instruction.block.predecessors
+            for i in range(len(predecessors)):
+                if self.is_executable(predecessors[i], instruction.block):
+                    kind, constant = meet(kind, constant, self.lattice(instruction.operands[i]))
+            return kind, constant
+        elif isinstance(instruction, Copy):
+            return self.lattice(instruction.source())
+        elif isinstance(instruction, BinaryOp) or (isinstance(instruction, Call) and instruction.is_pure()):
+            values = []
+            for operand in instruction.operands:
+                kind, constant = self.lattice(operand)
+                if kind == BOTTOM or (kind == CONSTANT and constant is None):
+                    return BOTTOM, None
+                values.append(constant)
+            for operand in instruction.operands:
+                if self.lattice(operand)[0] == TOP:
+                    return TOP, None
+            folded = fold(instruction, values)
+            if folded is None:
+                return BOTTOM, None
+            return CONSTANT, folded
+        return BOTTOM, None
+
+    def update(self, instruction, kind, constant):
+        key = compute_unique_id(instruction)
+        old_kind, old_constant = self.lattice(instruction)
+        if old_kind == kind and (kind != CONSTANT or same_constant(old_constant, constant)):
+            return
+        self.kinds[key] = kind
+        self.constants[key] = constant
+        for user in self.uses.get(key, []):
+            self.value_worklist.append(user)
+
+    # REWRITING
+
+    def rewrite(self, function):
+        changes = 0
+        for block in function.blocks:
+            if compute_unique_id(block) not in self.executable_blocks:
+                continue
+            for instruction in [i for i in block.instructions]:
+                if instruction.has_value():
+                    kind, constant = self.lattice(instruction)
+                    if kind == CONSTANT and instruction.is_pure():
+                        replace_instruction(function, instruction, Constant(constant))
+                        changes += 1
+            terminator = block.terminator()
+            if isinstance(terminator, Branch):
+                kind, constant = self.lattice(terminator.condition())
+                if kind == CONSTANT and isinstance(constant, IntegerValue):
+                    taken, not_taken = terminator.if_true, terminator.if_false
+                    if constant.integer == 0:
+                        taken, not_taken = not_taken, taken
+                    not_taken.remove_predecessor(block)
+                    block.remove(terminator)
+                    block.append(Jump(taken))
+                    changes += 1
+        changes += function.remove_unreachable_blocks()
+        return changes
+
+
+def meet(kind, constant, other):
+    other_kind, other_constant = other
+    if kind == TOP:
+        return other_kind, other_constant
+    elif other_kind == TOP:
+        return kind, constant
+    elif kind == BOTTOM or other_kind == BOTTOM:
+        return BOTTOM, None
+    elif same_constant(constant, other_constant):
+        return kind, constant
+    return BOTTOM, None
+
+
+def same_constant(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return a.equals(b)
+
+
+def fold(instruction, values):
+    """:return: the constant result of an operation on constants, evaluated as the interpreter would, or None"""
+    try:
+        if isinstance(instruction, BinaryOp):
+            result = instruction.operator(values[0], values[1]).evaluate(None)
+        else:
+            assert isinstance(instruction, Call)
+            result = instruction.declaration.call(values)
+    except Exception:
+        return None  # e.g. a division by zero, which must still fail when the program runs
+    if isinstance(result, IntegerValue) or isinstance(result, StringValue) or isinstance(result, NilValue):
+        return result
+    return None
+
+
+class DeadValueElimination(Pass):
+    """
+    Remove the pure instructions whose values are never used (including phis that only use each other, e.g. the
+    value of a loop nobody reads): live values are those used by instructions with side effects, transitively. Note
+    that, as in dead_code.py, removing a read of a record field or array element also removes the error it could
+    raise
+    """
+    name = 'dead-values'
+
+    def run(self, function):
+        live = {}
+        worklist = []
+        for instruction in function.instructions():
+            if not instruction.is_pure():
+                live[compute_unique_id(instruction)] = True
+                worklist.append(instruction)
+        while worklist:
+            instruction = worklist.pop()
+            for operand in instruction.operands:
+                if isinstance(operand, Instruction) and compute_unique_id(operand) not in live:
+                    live[compute_unique_id(operand)] = True
+                    worklist.append(operand)
+        removed = 0
+        for block in function.blocks:
+            for instruction in [i for i in block.instructions]:
+                if compute_unique_id(instruction) not in live:
+                    block.remove(instruction)
+                    removed += 1
+        return removed
+
+
+def default_passes():
+    return [CopyPropagation(), SparseConditionalConstantPropagation(), CopyPropagation(), DeadValueElimination()]
+
+
+class FunctionReport:
+    """
+    What the passes did to a function, or why it was not lowered
+    """
+
+    def __init__(self, name, skipped=None):
+        self.name = name
+        self.skipped = skipped
+        self.blocks = 0
+        self.values = 0
+        self.changes = []  # (pass name, number of changes)
+
+    def to_string(self):
+        if self.skipped is not None:
+            return 'ssa: function=%s skipped=%s' % (self.name, self.skipped)
+        changes = ' '.join(['%s=%d' % (name, n) for name, n in self.changes])
+        return 'ssa: function=%s blocks=%d values=%d %s' % (self.name, self.blocks, self.values, changes)
+
+
+class PassManager:
+    """
+    Run a list of passes, in order, over functions; the IR is verified before the first pass and after each pass (see
+    verifier.py) so that a pass breaking an invariant is reported by name rather than when the IR is raised
+    """
+
+    def __init__(self, passes=None, verify_each=True):
+        self.passes = passes if passes is not None else default_passes()
+        self.verify_each = verify_each
+
+    def run(self, function):
+        """:return: the FunctionReport of the function"""
+        report = FunctionReport(function.name)
+        verify(function)
+        for ir_pass in self.passes:
+            changes = ir_pass.run(function)
+            if self.verify_each:
+                try:
+                    verify(function)
+                except VerificationError as e:
+                    raise VerificationError('after %s: %s' % (ir_pass.name, e.reason))
+            report.changes.append((ir_pass.name, changes))
+        report.blocks = len(function.blocks)
+        report.values = function.number_values()
+        return report
+
+
+def optimize_program(program, pass_manager=None):
+    """
+    Lower the functions of a program (and the body of its top-level let) to SSA (see lowering.py), run the passes of
+    the pass manager over them and raise them back to the AST (see raising.py)
+    :return: the list of FunctionReport, e.g. for reporting
+    """
+    assert isinstance(program, Program)
+    pass_manager = pass_manager or PassManager()
+    functions, skipped = lower_program(program)
+    reports = []
+    for function in functions:
+        reports.append(pass_manager.run(function))
+        raise_function(function)
+    for name, reason in skipped:
+        reports.append(FunctionReport(name, reason))
+    return reports
+
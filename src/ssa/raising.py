@@ -0,0 +1,496 @@
+from src.ast import IntegerValue, StringValue, NilValue, LValue, RecordLValue, ArrayLValue, Assign, Sequence, Let, \
+    FunctionCall, If, While, Break, Divide, ArrayCreation, RecordCreation, TypeId, VariableDeclaration, FunctionDeclaration
+from src.environment import Environment
+from src.ssa.ir import IrError, Constant, Parameter, Instruction, Phi, Copy, BinaryOp, Load, Store, Call, NewRecord, \
+    NewArray, GetField, SetField, GetElement, SetElement, Jump, Branch, Return
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class Raising:
+    """
+    Raise a Function back to executable AST nodes: a let that declares one variable (a slot of its environment) per
+    SSA value, with each instruction assigning its slot and each phi assigned at the end of its predecessors (the
+    critical edges are split by lowering, and the copies of one edge are made through temporaries when they read the
+    phis they assign) unless the phi is coalesced with the value it copies (see coalesce). A value used once, e.g. by the next instruction of its block, is not given a slot but evaluated
+    as part of the expression of its use (see find_inlined), and an if whose join has a single phi evaluates to its
+    value, so that the expression trees of the original program are rebuilt. The control flow is rebuilt from the
+    structure recorded by lowering: a Branch with a join becomes an if, a block with a loop_exit heads a while loop
+    (using the loop's branch as the while condition when the loop exits from its header, unless breaks carry values to
+    the exit, see breaks_with_values) and jumps back to the header or to the exit become the end of the loop body and
+    breaks, after the copies to the phis of their target. Since the passes only remove edges (e.g. folding a branch),
+    the blocks still nest in this way
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.let = Let([], [])
+        self.slots = {}  # the VariableDeclaration holding each value
+        self.loops = []  # (header, exit) of the enclosing loops
+        self.live = {}
+        self.emitted = {}
+        self.uses = {}
+        self.inlined = {}  # the values evaluated as part of the expression of their only use
+        self.if_joins = {}  # the blocks joining the arms of an if
+        self.value_joins = {}  # those whose only phi is the value of the if
+        self.phi_expressions = {}  # the if expressions of inlined phis
+        self.coalesced = {}  # the phi whose slot each value coalesced with it is kept in
+        self.temporaries = 0
+
+    def raise_body(self):
+        """:return: an expression evaluating to the value the function returns: a let declaring the slots, if any"""
+        self.function.number_values()
+        self.uses = self.function.uses()
+        for block in self.function.blocks:
+            self.live[compute_unique_id(block)] = True
+            terminator = block.terminator()
+            if isinstance(terminator, Branch) and terminator.join is not None:
+                self.if_joins[compute_unique_id(terminator.join)] = True
+        for block in self.function.blocks:
+            self.find_inlined(block)
+        for block in self.function.blocks:
+            self.coalesce(block)
+        expressions = self.emit(self.function.entry(), None)
+        declarations = self.let.declarations
+        for i in range(len(declarations)):
+            declarations[i].index = i
+        if not declarations:
+            return sequence(expressions)
+        self.let.expressions = expressions
+        self.let.environment = Environment.empty(None, len(declarations))
+        return self.let
+
+    def is_live(self, block):
+        return block is not None and compute_unique_id(block) in self.live
+
+    # CONTROL FLOW
+
+    def emit(self, block, stop):
+        """:return: the expressions of the blocks from block (included) to stop (excluded)"""
+        expressions = []
+        while block is not None and block is not stop:
+            if block.loop_exit is not None and not (self.loops and self.loops[-1][0] is block):
+                block = self.emit_loop(block, expressions)
+                continue
+            self.mark_emitted(block)
+            self.emit_instructions(block, expressions)
+            terminator = block.terminator()
+            if isinstance(terminator, Return):
+                value = terminator.value()
+                expressions.append(self.expression(value, expressions))
+                block = None
+            elif isinstance(terminator, Jump):
+                self.emit_phi_copies(block, terminator.target, expressions)
+                block = self.follow(terminator.target, expressions)
+            elif isinstance(terminator, Branch):
+                join = terminator.join if self.is_live(terminator.join) else None
+                condition = self.expression(terminator.condition(), expressions)
+                phis = join.phis() if join is not None else []
+                if len(phis) == 1:
+                    # the arms evaluate to the value of the phi, e.g. if a < b then a else b
+                    self.value_joins[compute_unique_id(join)] = True
+                if_true = self.emit_edge(block, terminator.if_true, join)
+                if_false = self.emit_edge(block, terminator.if_false, join)
+                expression = If(condition, sequence(if_true), sequence(if_false))
+                if len(phis) != 1:
+                    expressions.append(expression)
+                elif self.is_inlined(phis[0]):
+                    self.phi_expressions[compute_unique_id(phis[0])] = expression
+                else:
+                    expressions.append(self.assign(self.slot(phis[0]), expression))
+                block = join
+            else:
+                raise IrError('block %s of %s is not terminated' % (block.name(), self.function.name))
+        return expressions
+
+    def emit_edge(self, branch, target, stop):
+        """:return: the expressions of a branch's target (see emit), after the copies to its phis if it still has any"""
+        expressions = []
+        self.emit_phi_copies(branch, target, expressions)
+        expressions.extend(self.emit(target, stop))
+        return expressions
+
+    def follow(self, target, expressions):
+        """:return: the block to continue with after jumping to target, or None if the jump ends the loop body"""
+        if self.loops:
+            header, exit_block = self.loops[-1]
+            if target is header:
+                return None
+            elif target is exit_block:
+                expressions.append(Break())
+                return None
+        return target
+
+    def emit_loop(self, header, expressions):
+        """:return: the block after the loop"""
+        exit_block = header.loop_exit if self.is_live(header.loop_exit) else None
+        self.loops.append((header, exit_block))
+        terminator = header.terminator()
+        if isinstance(terminator, Branch) and terminator.join is None \
+                and self.is_exit_edge(terminator.if_false, exit_block) and not self.breaks_with_values(exit_block):
+            # while condition do body; the exit edge (with its phi copies) follows the loop
+            self.mark_emitted(header)
+            condition = []
+            self.emit_instructions(header, condition)
+            condition.append(self.expression(terminator.condition(), condition))
+            body = self.emit_edge(header, terminator.if_true, None)
+            self.loops.pop()
+            expressions.append(While(sequence(condition), sequence(body)))
+            expressions.extend(self.emit_edge(header, terminator.if_false, exit_block))
+        else:
+            # while 1 do (...; break)
+            body = self.emit(header, None)
+            self.loops.pop()
+            expressions.append(While(IntegerValue(1), sequence(body)))
+        return exit_block
+
+    @staticmethod
+    def breaks_with_values(exit_block):
+        """
+        :return: whether breaks reach the exit block with copies to its phis, which the copies of the exit edge would
+        overwrite if they followed the loop; the loop is then a while 1 whose exit edge copies and breaks as well
+        """
+        return exit_block is not None and len(exit_block.predecessors) > 1 and len(exit_block.phis()) > 0
+
+    @staticmethod
+    def is_exit_edge(block, exit_block):
+        terminator = block.terminator()
+        return exit_block is not None and len(block.instructions) == 1 and isinstance(terminator, Jump) \
+               and terminator.target is exit_block
+
+    def mark_emitted(self, block):
+        key = compute_unique_id(block)
+        if key in self.emitted:
+            raise IrError('block %s of %s is not structured' % (block.name(), self.function.name))
+        self.emitted[key] = True
+
+    def emit_phi_copies(self, predecessor, successor, expressions):
+        i = successor.predecessor_index(predecessor)
+        if compute_unique_id(successor) in self.value_joins:
+            expressions.append(self.expression(successor.phis()[0].operands[i], expressions))
+            return
+        phis = []
+        sources = []
+        for phi in successor.phis():
+            source = phi.operands[i]
+            if self.representative(source) is not phi:  # a coalesced value is already in the phi's slot
+                phis.append(phi)
+                sources.append(source)
+        if not phis:
+            return
+        overlapping = False
+        for source in sources:
+            for phi in phis:
+                if self.representative(source) is phi:
+                    overlapping = True
+        if overlapping:
+            temporaries = []
+            for source in sources:
+                temporary = self.new_slot('$t%d' % self.temporaries)
+                self.temporaries += 1
+                expressions.append(self.assign(temporary, self.expression(source, expressions)))
+                temporaries.append(temporary)
+            for j in range(len(phis)):
+                expressions.append(self.assign(self.slot(phis[j]), self.read(temporaries[j])))
+        else:
+            for j in range(len(phis)):
+                expressions.append(self.assign(self.slot(phis[j]), self.expression(sources[j], expressions)))
+
+    # COALESCING
+
+    def coalesce(self, block):
+        """
+        Keep the values of the block that are copied to the phis of its successor in the slots of those phis, so that
+        the copies are not made, e.g. the body of a loop assigns its variables once rather than to a slot and then to
+        the phi of the loop header. A value is coalesced with a phi if it is defined in the predecessor the copy is made
+        at the end of, is only used in that block (or by the copy) and the phi is not read after the value is defined:
+        then the slot of the phi holds the value from its definition on, where it would hold it from the end of the
+        block. The phi of an if that evaluates to its value has no copies; nor do the arms of an inlined phi, evaluated
+        where the phi is used, so values in a block using one are not coalesced
+        """
+        terminator = block.terminator()
+        if not isinstance(terminator, Jump):
+            return
+        successor = terminator.target
+        i = successor.predecessor_index(block)
+        phis = successor.phis()
+        if i < 0 or not phis or (compute_unique_id(successor) in self.if_joins and len(phis) == 1):
+            return
+        for instruction in block.instructions:
+            if isinstance(instruction, Phi) and self.is_inlined(instruction):
+                return
+        positions = {}
+        for k in range(len(block.instructions)):
+            positions[compute_unique_id(block.instructions[k])] = k
+        for phi in phis:
+            value = phi.operands[i]
+            if not isinstance(value, Instruction) or isinstance(value, Phi) or value.block is not block \
+                    or self.is_inlined(value) or compute_unique_id(value) in self.coalesced:
+                continue
+            used_elsewhere = False
+            for user in self.uses.get(compute_unique_id(value), []):
+                if user is not phi and (isinstance(user, Phi) or user.block is not block):
+                    used_elsewhere = True
+            if not used_elsewhere and not self.is_read_after(phi, block, positions[compute_unique_id(value)], i):
+                self.coalesced[compute_unique_id(value)] = phi
+
+    def is_read_after(self, value, block, position, edge):
+        """
+        :return: whether the slot of a value is read in the block after the instruction at the position (including by
+        the expression trees rooted there and by the copies to the successor's phis made at the end of the block)
+        """
+        instructions = block.instructions
+        for k in range(position + 1, len(instructions)):
+            instruction = instructions[k]
+            if not isinstance(instruction, Phi) and not self.is_inlined(instruction) \
+                    and self.reads(instruction, value):
+                return True
+        for phi in block.terminator().target.phis():
+            source = phi.operands[edge]
+            if source is value or (isinstance(source, Instruction) and self.is_inlined(source)
+                                   and self.reads(source, value)):
+                return True
+        return False
+
+    def reads(self, instruction, value):
+        """:return: whether the expression tree of an instruction, with its inlined operands, reads the value"""
+        for operand in instruction.operands:
+            if operand is value:
+                return True
+            elif isinstance(operand, Instruction) and not isinstance(operand, Phi) and self.is_inlined(operand) \
+                    and self.reads(operand, value):
+                return True
+        return False
+
+    def representative(self, value):
+        """:return: the value whose slot holds the value: the phi it is coalesced with, if any"""
+        return self.coalesced.get(compute_unique_id(value), value)
+
+    # INSTRUCTIONS
+
+    def find_inlined(self, block):
+        """
+        Find the values of the block to evaluate as part of the expression of their only use: a later instruction of the
+        block or the copy to the only phi of the block it jumps to (copies to several phis may read each other's
+        phis), including the phi of an if (whose value is then the if expression, see emit). Since the use may itself
+        be inlined, the value is evaluated with the root of the expression tree it ends up in; each instruction in
+        between must then either be evaluated after it in that tree or have no side effects--and, if the value has
+        side effects (e.g. a call) and so is evaluated after it, also not fail nor read memory (see is_movable).
+        Records and arrays are not inlined where they are indexed into (only variables can be)
+        """
+        instructions = block.instructions
+        positions = {}
+        for i in range(len(instructions)):
+            positions[compute_unique_id(instructions[i])] = i
+        for i in range(len(instructions) - 1, -1, -1):  # the uses of a value are decided before the value
+            instruction = instructions[i]
+            if isinstance(instruction, Phi):
+                if i != 0 or len(block.phis()) != 1 or compute_unique_id(block) not in self.if_joins:
+                    continue
+            elif not instruction.has_value():
+                continue
+            root, j = self.find_root(instruction, block, positions)
+            if root is None or j <= i:
+                continue
+            order = {}
+            tree = []
+            self.tree_order(root, instruction, tree)
+            for k in range(len(tree)):
+                order[compute_unique_id(tree[k])] = k
+            position = order[compute_unique_id(instruction)]
+            inline = True
+            for k in range(i + 1, j):
+                between = instructions[k]
+                if order.get(compute_unique_id(between), -1) > position:
+                    continue  # evaluated after the value, as before
+                elif not between.is_pure() or not (is_pure(instruction) or is_movable(between)):
+                    inline = False
+            if inline:
+                self.inlined[compute_unique_id(instruction)] = True
+
+    def find_root(self, instruction, block, positions):
+        """
+        :return: the root of the expression tree the value would be evaluated in (or None if the value cannot be
+        inlined) and the position in the block where the root is evaluated
+        """
+        instructions = block.instructions
+        terminator = block.terminator()
+        source = None
+        user = instruction
+        while source is None or self.is_inlined(user):
+            users = self.uses.get(compute_unique_id(user), [])
+            if len(users) != 1:
+                return None, 0
+            source, user = user, users[0]
+            if is_located(user) and user.operands[0] is source:
+                return None, 0
+            if isinstance(user, Phi):
+                if not isinstance(terminator, Jump) or terminator.target is not user.block \
+                        or len(user.block.phis()) != 1:
+                    return None, 0
+                return source, len(instructions) - 1  # the copy is made before the jump
+            elif user.block is not block:
+                return None, 0
+        return user, positions[compute_unique_id(user)]
+
+    def tree_order(self, root, value, order):
+        """Append the instructions of the expression tree of root, assuming value is inlined, in evaluation order"""
+        operands = root.operands if not isinstance(root, Phi) else []  # an if, whose arms are emitted before
+        indices = range(len(operands))
+        if isinstance(root, SetField) or isinstance(root, SetElement):
+            indices = [len(operands) - 1] + range(len(operands) - 1)  # Assign.evaluate starts with the value
+        for i in indices:
+            operand = operands[i]
+            if isinstance(operand, Instruction) and (operand is value or self.is_inlined(operand)):
+                self.tree_order(operand, value, order)
+        order.append(root)
+
+    def is_inlined(self, instruction):
+        return compute_unique_id(instruction) in self.inlined
+
+    def emit_instructions(self, block, expressions):
+        for instruction in block.instructions:
+            if isinstance(instruction, Phi) or instruction.is_terminator() or self.is_inlined(instruction):
+                continue
+            expression = self.instruction_expression(instruction, expressions)
+            if instruction.has_value():
+                expressions.append(self.assign(self.slot(instruction), expression))
+            else:
+                expressions.append(expression)
+
+    def instruction_expression(self, instruction, expressions):
+        operands = instruction.operands
+        if isinstance(instruction, Copy):
+            return self.expression(operands[0], expressions)
+        elif isinstance(instruction, BinaryOp):
+            return instruction.operator(self.expression(operands[0], expressions),
+                                        self.expression(operands[1], expressions))
+        elif isinstance(instruction, Load):
+            return self.read(instruction.declaration)
+        elif isinstance(instruction, Store):
+            return self.assign(instruction.declaration, self.expression(operands[0], expressions))
+        elif isinstance(instruction, Call):
+            arguments = [self.expression(operand, expressions) for operand in operands]
+            return FunctionCall(instruction.declaration.name, arguments, instruction.declaration)
+        elif isinstance(instruction, NewRecord):
+            fields = {}
+            for i in range(len(instruction.names)):
+                fields[instruction.names[i]] = self.expression(operands[i], expressions)
+            return RecordCreation(copy_type_id(instruction.type_id), fields)
+        elif isinstance(instruction, NewArray):
+            return ArrayCreation(copy_type_id(instruction.type_id), self.expression(operands[0], expressions),
+                                 self.expression(operands[1], expressions))
+        elif isinstance(instruction, GetField):
+            return self.located(operands[0], RecordLValue(instruction.field), expressions)
+        elif isinstance(instruction, SetField):
+            return Assign(self.located(operands[0], RecordLValue(instruction.field), expressions),
+                          self.expression(operands[1], expressions))
+        elif isinstance(instruction, GetElement):
+            index = self.expression(operands[1], expressions)
+            return self.located(operands[0], ArrayLValue(index), expressions)
+        elif isinstance(instruction, SetElement):
+            index = self.expression(operands[1], expressions)
+            return Assign(self.located(operands[0], ArrayLValue(index), expressions),
+                          self.expression(operands[2], expressions))
+        raise IrError('cannot raise %s' % instruction.to_string())
+
+    def expression(self, value, expressions):
+        """:return: an expression reading the value, without side effects"""
+        if isinstance(value, Constant):
+            literal = value.value
+            if literal is None:
+                return Sequence([])  # evaluates to None
+            elif isinstance(literal, IntegerValue):
+                return IntegerValue(literal.integer)
+            elif isinstance(literal, NilValue):
+                return NilValue()
+            assert isinstance(literal, StringValue)
+            return literal
+        elif isinstance(value, Parameter):
+            return self.read(value.declaration)
+        elif isinstance(value, Phi) and self.is_inlined(value):
+            return self.phi_expressions[compute_unique_id(value)]
+        elif isinstance(value, Instruction) and self.is_inlined(value):
+            return self.instruction_expression(value, expressions)
+        elif isinstance(value, Instruction):
+            return self.read(self.slot(value))
+        raise IrError('cannot raise the value %s' % value.operand_string())
+
+    def located(self, value, link, expressions):
+        """:return: an lvalue reaching into the record or array value, e.g. v3.x or v3[v4]"""
+        if isinstance(value, Parameter):
+            declaration = value.declaration
+        elif isinstance(value, Instruction):
+            declaration = self.slot(value)
+        else:
+            # only variables can be indexed into, e.g. nil.x raises an error when evaluated
+            declaration = self.new_slot('$t%d' % self.temporaries)
+            self.temporaries += 1
+            expressions.append(self.assign(declaration, self.expression(value, expressions)))
+        return LValue(declaration.name, link, declaration)
+
+    # SLOTS
+
+    def slot(self, value):
+        value = self.representative(value)
+        key = compute_unique_id(value)
+        if key not in self.slots:
+            self.slots[key] = self.new_slot('$%s' % value.name())
+        return self.slots[key]
+
+    def new_slot(self, name):
+        declaration = VariableDeclaration(name, None, NilValue(), self.let, len(self.let.declarations))
+        self.let.declarations.append(declaration)
+        return declaration
+
+    @staticmethod
+    def read(declaration):
+        return LValue(declaration.name, None, declaration)
+
+    @staticmethod
+    def assign(declaration, expression):
+        return Assign(LValue(declaration.name, None, declaration), expression)
+
+
+def sequence(expressions):
+    return expressions[0] if len(expressions) == 1 else Sequence(expressions)
+
+
+def is_located(instruction):
+    """:return: whether the instruction indexes into its first operand, a record or an array"""
+    return isinstance(instruction, GetField) or isinstance(instruction, SetField) \
+           or isinstance(instruction, GetElement) or isinstance(instruction, SetElement)
+
+
+def is_pure(instruction):
+    """:return: whether the instruction has no side effects; the phi of an if has those of its arms"""
+    return not isinstance(instruction, Phi) and instruction.is_pure()
+
+
+def is_movable(instruction):
+    """:return: whether evaluating the instruction later cannot be observed: it cannot fail and reads no memory"""
+    return isinstance(instruction, Copy) or (isinstance(instruction, BinaryOp) and instruction.operator is not Divide)
+
+
+def copy_type_id(type_id):
+    return TypeId(type_id.name, type_id.declaration)
+
+
+def raise_function(function):
+    """
+    Replace the body of the function that was lowered to the given Function (or, for the body of a top-level let,
+    its expressions) with the AST raised from it (see Raising)
+    """
+    body = Raising(function).raise_body()
+    declaration = function.declaration
+    if isinstance(declaration, FunctionDeclaration):
+        declaration.body = body
+    elif isinstance(declaration, Let):
+        declaration.expressions = [body]
+    else:
+        raise IrError('cannot raise %s back to the AST' % function.name)
+    return body
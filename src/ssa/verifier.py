@@ -0,0 +1,188 @@
+from src.ssa.ir import IrError, Constant, Parameter, Instruction, Phi, Branch
+
+try:
+    from rpython.rlib.objectmodel import compute_unique_id
+except ImportError:
+    def compute_unique_id(x):
+        return id(x)
+
+
+class VerificationError(IrError):
+    pass
+
+
+class Verifier:
+    """
+    Check the invariants the passes and raising.py rely on: the entry block has no predecessors and every block is
+    reachable from it; each block starts with its phis and ends with its only terminator; the predecessors of each
+    block are exactly the blocks jumping to it and its phis have one operand per predecessor; a branch only jumps to
+    blocks without other predecessors (no critical edges); and each value is defined before it is used: in an earlier
+    instruction of the same block or in a block that dominates the use (for a phi operand, that dominates the end of
+    the corresponding predecessor)
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.blocks = {}
+        self.positions = {}  # the index of each instruction within its block
+        self.dominators = {}  # the immediate dominator of each block
+
+    def verify(self):
+        function = self.function
+        function.number_values()  # for the messages
+        if not function.blocks:
+            self.fail('has no blocks')
+        if function.entry().predecessors:
+            self.fail('has an entry block with predecessors')
+        for block in function.blocks:
+            self.blocks[compute_unique_id(block)] = block
+        for block in function.blocks:
+            self.verify_block(block)
+        for block in function.blocks:
+            self.verify_edges(block)
+        self.compute_dominators()
+        for block in function.blocks:
+            for instruction in block.instructions:
+                self.verify_operands(instruction)
+
+    def fail(self, reason):
+        raise VerificationError('function %s %s' % (self.function.name, reason))
+
+    def verify_block(self, block):
+        if not block.instructions or block.terminator() is None:
+            self.fail('has block %s without a terminator' % block.name())
+        phis = True
+        for i in range(len(block.instructions)):
+            instruction = block.instructions[i]
+            if instruction.block is not block:
+                self.fail('has an instruction in %s that belongs to another block: %s' % (
+                    block.name(), instruction.to_string()))
+            if instruction.is_terminator() and i != len(block.instructions) - 1:
+                self.fail('has a terminator in the middle of block %s' % block.name())
+            if isinstance(instruction, Phi):
+                if not phis:
+                    self.fail('has a phi after other instructions in block %s' % block.name())
+                if len(instruction.operands) != len(block.predecessors):
+                    self.fail('has a phi with %d operands in block %s, which has %d predecessors' % (
+                        len(instruction.operands), block.name(), len(block.predecessors)))
+            else:
+                phis = False
+            self.positions[compute_unique_id(instruction)] = i
+
+    def verify_edges(self, block):
+        successors = block.successors()
+        for successor in successors:
+            if compute_unique_id(successor) not in self.blocks:
+                self.fail('has block %s jumping to a removed block %s' % (block.name(), successor.name()))
+            if count(successor.predecessors, block) != count(successors, successor):
+                self.fail('has an edge from %s to %s missing from the predecessors' % (block.name(), successor.name()))
+            if isinstance(block.terminator(), Branch) and len(successor.predecessors) != 1:
+                self.fail('has a critical edge from %s to %s' % (block.name(), successor.name()))
+        for predecessor in block.predecessors:
+            if compute_unique_id(predecessor) not in self.blocks or count(predecessor.successors(), block) == 0:
+                self.fail('has a predecessor %s of %s that does not jump to it' % (predecessor.name(), block.name()))
+
+    def compute_dominators(self):
+        """The iterative algorithm of Cooper, Harvey and Kennedy, "A Simple, Fast Dominance Algorithm" """
+        order = self.postorder()
+        if len(order) != len(self.function.blocks):
+            self.fail('has unreachable blocks')
+        number = {}
+        for i in range(len(order)):
+            number[compute_unique_id(order[i])] = i
+        entry = self.function.entry()
+        self.dominators[compute_unique_id(entry)] = entry
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(order) - 1, -1, -1):
+                block = order[i]
+                if block is entry:
+                    continue
+                dominator = None
+                for predecessor in block.predecessors:
+                    if compute_unique_id(predecessor) not in self.dominators:
+                        continue
+                    if dominator is None:
+                        dominator = predecessor
+                    else:
+                        dominator = self.intersect(predecessor, dominator, number)
+                if self.dominators.get(compute_unique_id(block), None) is not dominator:
+                    self.dominators[compute_unique_id(block)] = dominator
+                    changed = True
+
+    def intersect(self, a, b, number):
+        while a is not b:
+            while number[compute_unique_id(a)] < number[compute_unique_id(b)]:
+                a = self.dominators[compute_unique_id(a)]
+            while number[compute_unique_id(b)] < number[compute_unique_id(a)]:
+                b = self.dominators[compute_unique_id(b)]
+        return a
+
+    def postorder(self):
+        order = []
+        visited = {}
+        stack = [(self.function.entry(), 0)]
+        visited[compute_unique_id(self.function.entry())] = True
+        while stack:
+            block, i = stack.pop()
+            successors = block.successors()
+            if i < len(successors):
+                stack.append((block, i + 1))
+                successor = successors[i]
+                if compute_unique_id(successor) not in visited:
+                    visited[compute_unique_id(successor)] = True
+                    stack.append((successor, 0))
+            else:
+                order.append(block)
+        return order
+
+    def dominates(self, a, b):
+        entry = self.function.entry()
+        while True:
+            if a is b:
+                return True
+            elif b is entry:
+                return False
+            b = self.dominators[compute_unique_id(b)]
+
+    def verify_operands(self, instruction):
+        block = instruction.block
+        for i in range(len(instruction.operands)):
+            operand = instruction.operands[i]
+            if isinstance(operand, Constant):
+                continue
+            elif isinstance(operand, Parameter):
+                if count(self.function.parameters, operand) == 0:
+                    self.fail('uses a parameter of another function in: %s' % instruction.to_string())
+                continue
+            elif not isinstance(operand, Instruction) or not operand.has_value():
+                self.fail('uses an operand that is not a value in: %s' % instruction.to_string())
+            definition = operand.block
+            if definition is None or compute_unique_id(operand) not in self.positions:
+                self.fail('uses a removed value in: %s' % instruction.to_string())
+            if isinstance(instruction, Phi):
+                if not self.dominates(definition, block.predecessors[i]):
+                    self.fail('has a phi operand that does not dominate predecessor %s: %s' % (
+                        block.predecessors[i].name(), instruction.to_string()))
+            elif definition is block:
+                if self.positions[compute_unique_id(operand)] >= self.positions[compute_unique_id(instruction)]:
+                    self.fail('uses a value before its definition in: %s' % instruction.to_string())
+            elif not self.dominates(definition, block):
+                self.fail('uses a value whose definition does not dominate it in: %s' % instruction.to_string())
+
+
+def count(items, item):
+    """:return: how many times the item (compared by identity) is in the list"""
+    n = 0
+    for other in items:
+        if other is item:
+            n += 1
+    return n
+
+
+def verify(function):
+    """
+    Check the invariants of a Function (see Verifier); raises VerificationError
+    """
+    Verifier(function).verify()
@@ -0,0 +1,68 @@
+import inspect
+import unittest
+
+import src.ast
+from src.ast import Program, For, IntegerValue, FunctionCall, LValue, Let
+from src.native_functions import create_native_functions
+from src.benchmark.ast_memory import measure
+from src.parser import Parser
+
+
+class TestAstRepresentation(unittest.TestCase):
+    def test_node_classes_declare_slots_consistent_with_attrs(self):
+        for name, klass in inspect.getmembers(src.ast, inspect.isclass):
+            if issubclass(klass, Program):
+                self.assertIn('__slots__', klass.__dict__, 'Expected %s to declare __slots__' % name)
+                self.assertEqual(klass.__dict__['_attrs_'], klass.__dict__['__slots__'], name)
+
+    def test_nodes_have_no_instance_dictionary(self):
+        program = Parser('let var a := 1 in a + 2 end').parse()
+
+        self.assertFalse(hasattr(program, '__dict__'))
+        self.assertFalse(hasattr(program.declarations[0].location, '__dict__'))
+        with self.assertRaises(AttributeError):
+            program.undeclared_attribute = 42
+
+    def test_literals_and_type_annotations_are_shared(self):
+        program = Parser('let var a : int := 1 var b : int := 1 in (nil; nil; 1; -1; -1) end').parse()
+
+        a, b = program.declarations
+        self.assertIs(a.expression, b.expression)
+        self.assertIs(a.type, b.type)
+        nil1, nil2, one, minus_one1, minus_one2 = program.expressions[0].expressions
+        self.assertIs(nil1, nil2)
+        self.assertIs(a.expression, one)
+        self.assertIs(minus_one1, minus_one2)
+
+    def test_declared_type_annotations_bind_to_their_own_declarations(self):
+        program = Parser("""let type t = int var a : t := 1 in
+          let type t = string var b : t := "b" in b end
+        end""").parse(create_native_functions())
+
+        outer_t, a = program.declarations
+        inner_t, b = program.expressions[0].declarations
+        self.assertIsNot(a.type, b.type)
+        self.assertIs(outer_t, a.type.declaration)
+        self.assertIs(inner_t, b.type.declaration)
+
+    def test_for_only_keeps_its_while_loop(self):
+        start, end, body = IntegerValue(1), IntegerValue(9), FunctionCall('f', [])
+        loop = For('i', start, end, body)
+
+        self.assertIsInstance(loop.while_expression, Let)
+        self.assertIs(start, loop.get_start())
+        self.assertIs(end, loop.get_end())
+        self.assertIs(body, loop.get_body())
+        self.assertEqual(For('i', IntegerValue(1), IntegerValue(9), FunctionCall('f', [])), loop)
+
+    def test_shared_nodes_are_measured_once(self):
+        _, nodes = measure(Parser('(1; 1; 1; 1)').parse())
+        _, nodes_with_variable = measure(Parser('(1; 1; 1; a)').parse())
+
+        self.assertEqual(2, nodes)  # the sequence and one literal
+        self.assertEqual(3, nodes_with_variable)
+        self.assertIsInstance(Parser('a').parse(), LValue)
+
+
+if __name__ == '__main__':
+    unittest.main()
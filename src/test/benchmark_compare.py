@@ -0,0 +1,53 @@
+import unittest
+from collections import OrderedDict
+
+from src.benchmark.compare import compare, load_pickled_results, load_runner_results, Sample
+from src.benchmark.measurement import BenchmarkMeasurement
+
+
+def perf_measurements(milliseconds, variance='1.00%'):
+    return {'task-clock': {'value': str(milliseconds), 'variance': variance}}
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def test_regression_beyond_threshold(self):
+        baseline = OrderedDict([('a', Sample.of([100, 101, 99, 100, 100])), ('b', Sample.of([50, 51, 49, 50, 50]))])
+        candidate = OrderedDict([('a', Sample.of([120, 121, 119, 120, 120])), ('b', Sample.of([50, 50, 51, 49, 50]))])
+
+        comparisons = compare(baseline, candidate, threshold=0.05)
+
+        self.assertEqual(['a'], [c.name for c in comparisons if c.regression])
+        self.assertAlmostEqual(0.2, comparisons[0].change)
+
+    def test_small_or_insignificant_changes_pass(self):
+        baseline = OrderedDict([('a', Sample.of([100, 140, 60, 100, 100]))])
+        candidate = OrderedDict([('a', Sample.of([110, 150, 70, 110, 110]))])  # +10% but noisy
+
+        self.assertFalse(compare(baseline, candidate, threshold=0.05)[0].regression)
+        self.assertFalse(compare(baseline, baseline, threshold=0.05)[0].regression)
+
+    def test_load_pickled_results(self):
+        program = 'src/benchmark/suite-single/queens.tig'
+        data = OrderedDict([('jit', [('bin/tiger-interpreter ' + program, perf_measurements(200.0))]),
+                            ('no-jit', [BenchmarkMeasurement('bin/tiger-interpreter-no-jit ' + program,
+                                                             perf_measurements(800.0, '2.00%'))])])
+
+        samples = load_pickled_results(data)
+
+        self.assertEqual(['jit queens', 'no-jit queens'], list(samples.keys()))
+        self.assertEqual(200.0, samples['jit queens'].mean)
+        self.assertAlmostEqual(16.0, samples['no-jit queens'].stdev)
+
+    def test_load_runner_results(self):
+        data = {'format_version': 1, 'results': {'bin/tiger-interpreter': {'sieve': {'invocations': [
+            {'ticks': [9, 5, 5], 'warmup_iterations': 1, 'steady_state_mean_ticks': 5.0},
+            {'ticks': [9, 7, 7], 'warmup_iterations': 1, 'steady_state_mean_ticks': 7.0}]}}}}
+
+        samples = load_runner_results(data)
+
+        self.assertEqual(6.0, samples['bin/tiger-interpreter sieve'].mean)
+        self.assertEqual(2, samples['bin/tiger-interpreter sieve'].n)
+
+
+if __name__ == '__main__':
+    unittest.main()
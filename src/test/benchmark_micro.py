@@ -0,0 +1,44 @@
+import unittest
+
+from src.ast import IntegerValue, RecordValue
+from src.benchmark.micro import measure, prepare_node, NODE_DECLARATIONS, NODE_EXPRESSIONS, SYNTHETIC_PROGRAMS, \
+    EVALUATION_PROGRAMS, parse
+from src.native_functions import create_native_functions, create_empty_environment
+
+
+class TestMicroBenchmarks(unittest.TestCase):
+    def test_measure_reports_each_repetition(self):
+        calls = []
+
+        ops_per_second = measure(lambda: calls.append(1), repetitions=3, minimum_seconds=0.001)
+
+        self.assertEqual(3, len(ops_per_second))
+        self.assertTrue(all([ops > 0 for ops in ops_per_second]))
+
+    def test_measure_runs_setup_for_each_operation(self):
+        inputs = []
+
+        measure(lambda x: self.assertEqual([], x), setup=lambda: inputs.append(1) or [], repetitions=2,
+                minimum_seconds=0.001)
+
+        self.assertTrue(len(inputs) > 2)
+
+    def test_prepared_nodes_evaluate(self):
+        node, environment = prepare_node(NODE_DECLARATIONS, NODE_EXPRESSIONS['LValue.evaluate (record field)'])
+        self.assertEqual(IntegerValue(2), node.evaluate(environment))
+
+        node, environment = prepare_node(NODE_DECLARATIONS, NODE_EXPRESSIONS['FunctionCall.evaluate (one argument)'])
+        self.assertEqual(IntegerValue(42), node.evaluate(environment))
+
+        node, environment = prepare_node(NODE_DECLARATIONS, NODE_EXPRESSIONS['RecordCreation.evaluate'])
+        self.assertIsInstance(node.evaluate(environment), RecordValue)
+
+    def test_synthetic_and_evaluation_programs_are_valid(self):
+        for text in SYNTHETIC_PROGRAMS.values():
+            parse(text, create_native_functions())
+        self.assertEqual(IntegerValue(500500), parse(EVALUATION_PROGRAMS['for-sum'], create_native_functions())
+                         .evaluate(create_empty_environment()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import subprocess
+import time
+import unittest
+
+from src.benchmark.pool import parse_cpu_list, PinnedPool
+
+
+class TestBenchmarkPool(unittest.TestCase):
+    def test_parse_cpu_list(self):
+        self.assertEqual([0, 1, 2, 3, 8, 10, 11], parse_cpu_list('0-3,8,10-11\n'))
+        self.assertEqual([], parse_cpu_list('\n'))
+
+    def test_results_keep_order(self):
+        pool = PinnedPool(4, pin=False)
+
+        results = pool.map(lambda item, prefix: (item, prefix), [3, 1, 2, 0, 5])
+
+        self.assertEqual([(3, []), (1, []), (2, []), (0, []), (5, [])], results)
+
+    def test_commands_run_in_parallel(self):
+        pool = PinnedPool(4, pin=False)
+
+        start = time.time()
+        pool.map(lambda seconds, prefix: subprocess.check_call(prefix + ['sleep', seconds]), ['0.5'] * 4)
+        elapsed = time.time() - start
+
+        self.assertLess(elapsed, 1.5)  # serially, this would take 2 seconds
+
+
+if __name__ == '__main__':
+    unittest.main()
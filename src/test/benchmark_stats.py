@@ -0,0 +1,100 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from src.benchmark.run import wrap_program, parse_ticks, summarize, geometric_means
+from src.benchmark.stats import median, confidence_interval, geometric_mean, detect_steady_state, standard_deviation, \
+    welch_t_test, changepoints
+
+
+class TestBenchmarkStats(unittest.TestCase):
+    def test_median(self):
+        self.assertEqual(2.0, median([3, 1, 2]))
+        self.assertEqual(2.5, median([4, 1, 3, 2]))
+
+    def test_standard_deviation(self):
+        self.assertAlmostEqual(1.0, standard_deviation([1, 2, 3]))
+        self.assertEqual(0.0, standard_deviation([5]))
+
+    def test_confidence_interval_contains_median(self):
+        values = [100, 102, 98, 101, 99, 103, 97, 100]
+        lower, upper = confidence_interval(values)
+
+        self.assertLessEqual(lower, median(values))
+        self.assertGreaterEqual(upper, median(values))
+        self.assertEqual((lower, upper), confidence_interval(values))  # seeded, so reproducible
+
+    def test_geometric_mean(self):
+        self.assertAlmostEqual(4.0, geometric_mean([2, 8]))
+
+    def test_steady_state_after_warmup(self):
+        ticks = [900, 400, 150, 101, 100, 99, 100, 101, 100]
+
+        self.assertEqual(3, detect_steady_state(ticks))
+
+    def test_no_steady_state(self):
+        ticks = [100, 200, 100, 200, 100, 200, 100, 200]
+
+        self.assertIsNone(detect_steady_state(ticks))
+
+    def test_changepoints(self):
+        generator = random.Random(42)
+        values = [generator.gauss(100, 1) for _ in range(30)] + [generator.gauss(50, 1) for _ in range(70)]
+
+        self.assertEqual([30], changepoints(values))
+        self.assertEqual([], changepoints(values[30:]))
+        self.assertEqual([], changepoints([7] * 50))
+
+    def test_welch_t_test(self):
+        t, p = welch_t_test(100, 5, 5, 110, 5, 5)
+
+        self.assertAlmostEqual(3.1623, t, places=4)
+        self.assertAlmostEqual(0.0133, p, places=4)  # two-sided, 8 degrees of freedom
+        self.assertEqual((0.0, 1.0), welch_t_test(100, 0, 5, 100, 0, 5))
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_wrap_program(self):
+        path = os.path.join(self.directory, 'a.tig')
+        with open(path, 'w') as f:
+            f.write('let var a := 0 in a end\n')
+
+        wrapped = wrap_program('a', path, 10, self.directory)
+
+        with open(wrapped, 'r') as f:
+            self.assertEqual('for i := 1 to 10\ndo (\n  timeGo();\n  let var a := 0 in a end;\n  timeStop()\n)\n',
+                             f.read())
+
+    def test_self_timing_program_is_not_wrapped(self):
+        path = os.path.join(self.directory, 'b.tig')
+        with open(path, 'w') as f:
+            f.write('(timeGo(); 42; timeStop())\n')
+
+        self.assertEqual(path, wrap_program('b', path, 10, self.directory))
+
+    def test_summaries_and_speedup(self):
+        self.assertEqual([10, 20], parse_ticks('10\nticks=10\nother\nticks=20\n'))
+
+        def invocation(ticks):
+            return {'wall_seconds': 1.0, 'ticks': ticks, 'warmup_iterations': 0,
+                    'steady_state_mean_ticks': float(sum(ticks)) / len(ticks)}
+
+        results = {'slow': {'p': {'summary': summarize([invocation([200, 200]), invocation([200, 200])])}},
+                   'fast': {'p': {'summary': summarize([invocation([50, 50]), invocation([50, 50])])}}}
+        means = geometric_means(OrderedDict([('slow', results['slow']), ('fast', results['fast'])]))
+
+        self.assertAlmostEqual(200.0, means['slow']['ticks'])
+        self.assertAlmostEqual(4.0, means['fast']['speedup'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import random
+import unittest
+
+from src.benchmark.warmup_analysis import analyze, classify, FLAT, WARMUP, SLOWDOWN, NO_STEADY_STATE, INCONSISTENT
+
+
+def noisy(center, n, generator):
+    return [generator.gauss(center, center * 0.01) for _ in range(n)]
+
+
+class TestWarmupAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.generator = random.Random(42)
+
+    def test_flat(self):
+        result = classify(noisy(100, 60, self.generator))
+
+        self.assertEqual(FLAT, result['classification'])
+        self.assertEqual(0, result['steady_state_iteration'])
+        self.assertEqual(0, result['time_to_steady_state'])
+
+    def test_warmup(self):
+        iterations = noisy(300, 10, self.generator) + noisy(100, 50, self.generator)
+
+        result = classify(iterations)
+
+        self.assertEqual(WARMUP, result['classification'])
+        self.assertEqual(10, result['steady_state_iteration'])
+        self.assertEqual(sum(iterations[:10]), result['time_to_steady_state'])
+        self.assertAlmostEqual(100, result['steady_state_mean'], delta=1)
+        lower, upper = result['steady_state_ci95']
+        self.assertTrue(lower <= result['steady_state_mean'] <= upper)
+
+    def test_slowdown(self):
+        result = classify(noisy(100, 20, self.generator) + noisy(150, 40, self.generator))
+
+        self.assertEqual(SLOWDOWN, result['classification'])
+        self.assertEqual(20, result['steady_state_iteration'])
+
+    def test_no_steady_state(self):
+        result = classify(noisy(100, 55, self.generator) + noisy(200, 5, self.generator))
+
+        self.assertEqual(NO_STEADY_STATE, result['classification'])
+        self.assertIsNone(result['steady_state_iteration'])
+
+    def test_inconsistent_invocations(self):
+        analysis = analyze([noisy(100, 60, self.generator),
+                            noisy(300, 10, self.generator) + noisy(100, 50, self.generator)])
+
+        self.assertEqual(INCONSISTENT, analysis['classification'])
+        self.assertEqual({FLAT: 1, WARMUP: 1}, dict(analysis['classifications']))
+        self.assertAlmostEqual(5, analysis['steady_state_iteration_mean'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from src.closures import analyze_closures
+from src.main.tiger_interpreter import parse_options
+from src.test.test_utilities import parse_program
+
+
+class TestClosureAnalysis(unittest.TestCase):
+    def closures(self, program):
+        closures = analyze_closures(parse_program(program))
+        return dict([(c.function.name, c) for c in closures])
+
+    def captured(self, closure):
+        return [(d.name, closure.is_mutable(d)) for d in closure.captured]
+
+    def test_free_variables(self):
+        closures = self.closures("""
+        let
+          var constant := 42
+          var counter := 0
+          function count(n: int): int = (counter := counter + n; counter + constant)
+          function pure(n: int): int = let var local := n in local * 2 end
+        in
+          count(pure(1))
+        end
+        """)
+        self.assertListEqual([('counter', True), ('constant', False)], self.captured(closures['count']))
+        self.assertListEqual([], self.captured(closures['pure']))
+        self.assertFalse(closures['pure'].captures_mutable())
+
+    def test_nested_functions(self):
+        closures = self.closures("""
+        let
+          var outer := 1
+          function f(a: int): int =
+            let
+              var b := a + 1
+              function g(c: int): int = a + b + c + outer + h()
+            in
+              g(b)
+            end
+          function h(): int = outer
+        in
+          f(1)
+        end
+        """)
+        self.assertListEqual([('outer', False)], self.captured(closures['f']))
+        self.assertListEqual(['h'], [d.name for d in closures['f'].called])
+        self.assertListEqual([('a', False), ('b', False), ('outer', False)], self.captured(closures['g']))
+        self.assertListEqual(['h'], [d.name for d in closures['g'].called])
+
+    def test_recursion_is_not_captured(self):
+        closures = self.closures('let function f(n: int): int = if n = 0 then 0 else f(n - 1) in f(3) end')
+        self.assertListEqual([], closures['f'].called)
+
+    def test_report(self):
+        closures = self.closures('let var x := 1 function f(): int = (x := 2; x) in f() end')
+        self.assertTrue(closures['f'].to_string().startswith('closure: function=f captured=[x(cell)] calls=[]'))
+        self.assertTrue(parse_options(['tiger-interpreter', '--closure-report', 'program.tig']).closure_report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+from src.ast import IntegerValue, LValue, Sequence
+from src.common_subexpressions import eliminate_common_subexpressions, TEMPORARY_PREFIX
+from src.main.tiger_interpreter import parse_options
+from src.native_functions import create_empty_environment
+from src.test.test_utilities import parse_program, assert_pass_preserves_result
+
+
+class TestCommonSubexpressionElimination(unittest.TestCase):
+    def eliminate(self, program):
+        """:return: the texts of the eliminated expressions after checking that the result is unchanged"""
+        _, eliminated = assert_pass_preserves_result(self, program, eliminate_common_subexpressions)
+        return [e.text for e in eliminated]
+
+    def test_arithmetic(self):
+        texts = self.eliminate('let var n := 3 var k := 4 in (n * 8 + k) * (n * 8 + k) end')
+        self.assertListEqual(['(n * 8) + k'], texts)
+
+    def test_record_and_array_reads(self):
+        texts = self.eliminate("""
+        let
+          type node = {val: int, next: node}
+          type nodes = array of node
+          var a := nodes[3] of node{val = 1, next = node{val = 42, next = nil}}
+          var i := 1
+        in
+          a[i].next.val + a[i].next.val * 2
+        end
+        """)
+        self.assertListEqual(['a[i].next.val'], texts)
+
+    def test_rewrite(self):
+        program = parse_program('let var a := 2 in a * 3 + a * 3 end')
+        eliminated = eliminate_common_subexpressions(program)
+        self.assertEqual(1, len(eliminated))
+        self.assertEqual(2, eliminated[0].occurrences)
+        self.assertEqual(2, len(program.declarations))
+        temporary = program.declarations[1]
+        self.assertTrue(temporary.name.startswith(TEMPORARY_PREFIX))
+        addition = program.expressions[0]
+        self.assertIsInstance(addition.left, Sequence)  # (t := a * 3; t)
+        self.assertIsInstance(addition.right, LValue)
+        self.assertIs(temporary, addition.right.declaration)
+
+    def test_nested_expressions_are_eliminated_separately(self):
+        texts = self.eliminate('let var n := 3 var j := 1 var k := 2 in (n * 8 + k) + (n * 8 + k) + (n * 8 + j) end')
+        self.assertListEqual(['(n * 8) + k', 'n * 8'], texts)
+
+    def test_assignment_between_occurrences(self):
+        texts = self.eliminate('let var n := 3 var m := 0 in m := n * 8; n := 4; m + n * 8 end')
+        self.assertListEqual([], texts)
+        texts = self.eliminate('let var n := 3 var m := 0 in m := n * 8; m := 4; m + n * 8 end')
+        self.assertListEqual(['n * 8'], texts)
+
+    def test_store_between_reads(self):
+        texts = self.eliminate("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+          var q := p
+          var s := 0
+        in
+          s := p.x; q.x := 5; s + p.x
+        end
+        """)
+        self.assertListEqual([], texts)
+
+    def test_call_between_occurrences(self):
+        texts = self.eliminate("""
+        let
+          var n := 3
+          function change(): int = (n := 4; 0)
+        in
+          n * 8 + change() + n * 8
+        end
+        """)
+        self.assertListEqual([], texts)
+
+    def test_branches_are_separate_blocks(self):
+        texts = self.eliminate("""
+        let
+          var n := 3
+          var s := 0
+        in
+          if n > 2 then s := n * 8 else s := 0;
+          for i := 1 to 3 do s := s + (i * n) * (i * n);
+          s + n * 8
+        end
+        """)
+        self.assertListEqual(['i * n'], texts)
+
+    def test_declarations_and_body_are_separate_blocks(self):
+        texts = self.eliminate('let var n := 3 var a := n * 8 var b := n * 8 in a + b + n * 8 end')
+        self.assertListEqual(['n * 8'], texts)
+
+    def test_function_without_let(self):
+        texts = self.eliminate('let function f(n: int): int = n * 8 + n * 8 in f(2) end')
+        self.assertListEqual([], texts)
+        texts = self.eliminate('let function f(n: int): int = let in n * 8 + n * 8 end in f(2) end')
+        self.assertListEqual(['n * 8'], texts)
+
+    def test_in_loop(self):
+        program = """
+        let
+          type ints = array of int
+          var a := ints[10] of 1
+          var sum := 0
+        in
+          for i := 0 to 8 do (a[i + 1] := a[i] + a[i + 1]; sum := sum + a[i] * a[i]);
+          sum
+        end
+        """
+        self.assertListEqual(['a[i]', 'i + 1'], self.eliminate(program))  # i + 1 indexes a read and a store
+        self.assertEqual(IntegerValue(285), parse_program(program).evaluate(create_empty_environment()))
+
+    def test_report_flag(self):
+        self.assertTrue(parse_options(['tiger-interpreter', '--cse-report', 'program.tig']).cse)
+        self.assertFalse(parse_options(['tiger-interpreter', 'program.tig']).cse)
+
+
+if __name__ == '__main__':
+    unittest.main()
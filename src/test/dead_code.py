@@ -0,0 +1,137 @@
+import unittest
+
+from src.ast import Let, Sequence, IntegerValue
+from src.dead_code import eliminate_dead_code
+from src.main.tiger_interpreter import parse_options
+from src.native_functions import create_empty_environment
+from src.test.test_utilities import parse_program, assert_pass_preserves_result
+
+
+class TestDeadCodeElimination(unittest.TestCase):
+    def eliminate(self, program):
+        """:return: the optimized program and the (kind, name) of the removed code after checking the result"""
+        optimized, removed = assert_pass_preserves_result(self, program, eliminate_dead_code)
+        return optimized, [(r.kind, r.name) for r in removed]
+
+    def declared_names(self, let):
+        return [d.name for d in let.declarations]
+
+    def test_unused_declarations(self):
+        program, removed = self.eliminate("""
+        let
+          type ints = array of int
+          var unused := ints[1000] of 0
+          var used := 42
+          function unusedFunction(): int = used
+          function usedFunction(): int = used + 1
+        in
+          usedFunction()
+        end
+        """)
+        self.assertListEqual([('variable', 'unused'), ('function', 'unusedFunction')], removed)
+        self.assertListEqual(['ints', 'used', 'usedFunction'], self.declared_names(program))
+        self.assertListEqual([0, 1, 2], [d.index for d in program.declarations])
+        self.assertEqual(IntegerValue(43), program.evaluate(create_empty_environment()))
+
+    def test_transitively_unused(self):
+        program, removed = self.eliminate("""
+        let
+          var a := 1
+          var b := a + 1
+          function even(n: int): int = if n = 0 then b else odd(n - 1)
+          function odd(n: int): int = if n = 0 then 0 else even(n - 1)
+        in
+          42
+        end
+        """)
+        self.assertListEqual([], self.declared_names(program))
+        self.assertEqual(4, len(removed))
+
+    def test_side_effects_are_kept(self):
+        program, removed = self.eliminate("""
+        let
+          var counter := 0
+          function count(): int = (counter := counter + 1; counter)
+          var unused := count()
+        in
+          counter
+        end
+        """)
+        self.assertListEqual([], removed)
+
+    def test_stores_to_unused_variables(self):
+        program, removed = self.eliminate("""
+        let
+          var written := 0
+          var read := 0
+        in
+          written := 1;
+          read := 2;
+          for i := 1 to 3 do written := i;
+          if read > 0 then written := read;
+          read
+        end
+        """)
+        self.assertListEqual([('variable', 'written'), ('store', 'written'), ('store', 'written'), ('store', 'written')],
+                             removed)
+        self.assertListEqual(['read'], self.declared_names(program))
+
+    def test_overwritten_stores(self):
+        program, removed = self.eliminate("""
+        let
+          var x := 0
+          var y := 0
+          function f(n: int): int = n
+        in
+          x := 1; y := 2; x := 3; y := x; x := 4; f(0); x := 5; x + y
+        end
+        """)
+        self.assertListEqual([('store', 'x'), ('store', 'y')], removed)  # the calls of f might read x
+        self.assertEqual(6, len(program.expressions))
+
+    def test_failing_code_is_kept(self):
+        program = parse_program('let var a := 1 in a := 10 / 0; a := 3; a end')
+        self.assertListEqual([], eliminate_dead_code(program))
+        self.assertRaises(ZeroDivisionError, program.evaluate, create_empty_environment())
+
+        for initializer in ['a[1000]', 'p.x', '1 / a[0]', 'chr(1000)', 'substring("abc", 5, 1)']:
+            program = parse_program("""
+            let
+              type ints = array of int
+              type point = {x: int, y: int}
+              var a := ints[10] of 0
+              var p: point := nil
+              var unused := %s
+            in
+              0
+            end
+            """ % initializer)
+            eliminate_dead_code(program)
+            self.assertIn('unused', self.declared_names(program))
+            self.assertRaises(Exception, program.evaluate, create_empty_environment())
+
+    def test_stores_into_records_are_kept(self):
+        program, removed = self.eliminate("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+          var q := p
+        in
+          p.x := 3; q.x
+        end
+        """)
+        self.assertListEqual([], removed)
+
+    def test_emptied_let_becomes_sequence(self):
+        program, removed = self.eliminate('let var a := 1 in let var b := 2 in a end end')
+        self.assertListEqual([('variable', 'b')], removed)
+        self.assertIsInstance(program, Let)
+        self.assertIsInstance(program.expressions[0], Sequence)
+
+    def test_option(self):
+        self.assertTrue(parse_options(['tiger-interpreter', '--dce-report', 'program.tig']).dce)
+        self.assertFalse(parse_options(['tiger-interpreter', 'program.tig']).dce)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from src.environments.environment_immutable_level_for_bindings import Environment as ImmutableLevelEnvironment
+from src.environments.environment_level_for_bindings import Environment as LevelEnvironment
+from src.environments.environment_without_display import IndexedEnvironment
+
+
+class TestEnvironmentImplementations(unittest.TestCase):
+    """
+    Check that each implementation selectable in environment.py supports the index-based protocol used by the AST
+    """
+    IMPLEMENTATIONS = [LevelEnvironment, ImmutableLevelEnvironment, IndexedEnvironment]
+
+    def test_push_set_get_pop(self):
+        for implementation in self.IMPLEMENTATIONS:
+            outer = implementation.empty(None, 1)
+            outer.set(0, 'a')
+            inner = outer.push(2)
+            inner.set(1, 'b')
+
+            self.assertEqual('b', inner.get(1), implementation.__module__)
+            self.assertIsNone(inner.get(0), implementation.__module__)
+            self.assertEqual(3, inner.size(), implementation.__module__)
+            self.assertIs(outer, inner.pop(), implementation.__module__)
+            self.assertEqual('a', outer.get(0), implementation.__module__)
+
+
+if __name__ == '__main__':
+    unittest.main()
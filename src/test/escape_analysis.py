@@ -0,0 +1,134 @@
+import unittest
+
+from src.ast import Sequence
+from src.escape_analysis import EscapeAnalysis, scalar_replace_records
+from src.main.tiger_interpreter import parse_options
+from src.memory_stats import memory_statistics
+from src.native_functions import create_empty_environment
+from src.test.test_utilities import parse_program
+
+
+class TestEscapeAnalysis(unittest.TestCase):
+    def non_escaping_names(self, program):
+        return [v.declaration.name for v in EscapeAnalysis(parse_program(program)).find_non_escaping()]
+
+    def evaluate(self, program):
+        """:return: the result and the number of records allocated"""
+        memory_statistics.reset()
+        memory_statistics.enable()
+        try:
+            result = program.evaluate(create_empty_environment())
+        finally:
+            memory_statistics.disable()
+        return result, memory_statistics.record_values
+
+    def replace(self, text):
+        """:return: the optimized program and the names of the replaced variables after checking the result"""
+        expected, _ = self.evaluate(parse_program(text))
+        program = parse_program(text)
+        replaced = scalar_replace_records(program)
+        actual, records = self.evaluate(program)
+        self.assertEqual(expected, actual)
+        return program, [d.name for d in replaced], records
+
+    def test_escapes(self):
+        names = self.non_escaping_names("""
+        let
+          type point = {x: int, y: int}
+          var local := point{x = 1, y = 2}
+          var passed := point{x = 1, y = 2}
+          var aliased := point{x = 1, y = 2}
+          var copy := point{x = 1, y = 2}
+          var compared := point{x = 1, y = 2}
+          var nulled := point{x = 1, y = 2}
+          function f(p: point): int = p.x
+        in
+          local.x := local.y + f(passed);
+          copy := aliased;
+          nulled := nil;
+          if compared = nil then 0 else local.x
+        end
+        """)
+        self.assertListEqual(['local'], names)
+
+    def test_reads_and_stores(self):
+        program, replaced, records = self.replace("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+        in
+          p.x := p.x + p.y; p.x * 10 + p.y
+        end
+        """)
+        self.assertListEqual(['p'], replaced)
+        self.assertListEqual(['point', 'p.x', 'p.y'], [d.name for d in program.declarations])
+        self.assertListEqual([0, 1, 2], [d.index for d in program.declarations])
+        self.assertEqual(0, records)
+
+    def test_new_records(self):
+        program, replaced, records = self.replace("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 0, y = 0}
+        in
+          for i := 1 to 10 do p := point{x = p.x + i, y = p.y - i};
+          p.x - p.y
+        end
+        """)
+        self.assertListEqual(['p'], replaced)
+        self.assertEqual(0, records)
+
+    def test_new_record_reading_assigned_field(self):
+        program, replaced, _ = self.replace("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+        in
+          p := point{x = p.y, y = p.x};
+          p.x * 10 + p.y
+        end
+        """)
+        self.assertListEqual(['p'], replaced)
+        self.assertIsInstance(program.expressions[0], Sequence)
+        self.assertEqual(4, len(program.expressions[0].expressions))  # through temporaries
+
+    def test_nested_records_and_functions(self):
+        program, replaced, records = self.replace("""
+        let
+          type node = {value: int, next: node}
+          var list := node{value = 1, next = node{value = 2, next = nil}}
+          function second(): int = list.next.value
+        in
+          list.value + second()
+        end
+        """)
+        self.assertListEqual(['list'], replaced)
+        self.assertEqual(1, records)  # the next node escapes to the field list.next
+
+    def test_new_record_outside_of_statements(self):
+        names = self.non_escaping_names("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+        in
+          if (p := point{x = 3, y = 4}; p.x > 0) then 1 else 0
+        end
+        """)
+        self.assertListEqual(['p'], names)
+        names = self.non_escaping_names("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+          function f(n: int): int = 0
+        in
+          f(p := point{x = 3, y = 4})
+        end
+        """)
+        self.assertListEqual([], names)
+
+    def test_option(self):
+        self.assertTrue(parse_options(['tiger-interpreter', '--scalar-replace', 'program.tig']).scalar_replace)
+
+
+if __name__ == '__main__':
+    unittest.main()
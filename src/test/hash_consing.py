@@ -0,0 +1,85 @@
+import sys
+import unittest
+
+from src.ast import Add, IntegerValue, LValue, Let, Sequence, Program, interned_hashes
+from src.benchmark.ast_memory import measure
+from src.hash_consing import HashConsingFactory, structural_hash
+from src.parser import Parser
+from src.scopes import ScopeError, transform_lvalues
+
+
+class TestHashConsing(unittest.TestCase):
+    def test_identical_subtrees_are_shared(self):
+        program = HashConsingFactory().parse('(a[i].next + 1; a[i].next + 1; a[i].next + 2)')
+        self.assertIsInstance(program, Sequence)
+        first, second, third = program.expressions
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertIs(first.left, third.left)
+
+    def test_equality_is_identity(self):
+        factory = HashConsingFactory()
+        text = 'let var x := 1 function f(y: int): int = y + x in f(x) * f(x + 1) end'
+        a = factory.parse(text)
+        b = factory.parse(text)
+        self.assertIs(a, b)
+        self.assertIsNot(a, factory.parse(text.replace('x + 1', 'x + 2')))
+
+    def test_interned_tree_equals_parsed_tree(self):
+        text = 'let type point = {x: int, y: int} var p := point{x = 1, y = 2} in ' \
+               'for i := 0 to 9 do p.x := p.x + i; "abc" end'
+        self.assertEqual(Parser(text).parse(), HashConsingFactory().parse(text))
+
+    def test_structural_hash_is_cached_and_independent_of_the_factory(self):
+        text = 'if a < b then f(a, "s") else -1'
+        interned = HashConsingFactory().parse(text)
+        self.assertNotEqual(0, interned_hashes.get(interned))
+        self.assertEqual(interned_hashes.get(interned), interned_hashes.get(HashConsingFactory().parse(text)))
+        self.assertEqual(interned_hashes.get(interned), structural_hash(Parser(text).parse()))
+        self.assertNotEqual(interned_hashes.get(interned), structural_hash(Parser(text.replace('<', '>')).parse()))
+        self.assertEqual(0, interned_hashes.get(Parser(text).parse()))
+
+    def test_nodes_have_no_hash_field(self):
+        self.assertEqual(['location'], Program._attrs_)
+
+    def test_different_cached_hashes_are_unequal_without_comparing(self):
+        a = HashConsingFactory().parse('f(1 + 2, x)')
+        b = HashConsingFactory().parse('f(1 + 3, x)')
+        self.assertTrue(a.has_different_hash(b))
+        self.assertFalse(a == b)
+        self.assertTrue(a != b)
+        self.assertFalse(a != a)
+
+        parsed = Parser('f(1 + 2, x)').parse()  # not interned, so compared structurally
+        self.assertFalse(a.has_different_hash(parsed))
+        self.assertEqual(a, parsed)
+        interned_hashes.put(parsed.arguments[0], interned_hashes.get(a.arguments[0]) + 1)  # only the hash differs
+        self.assertNotEqual(a, parsed)
+        self.assertFalse(Sequence([a]).equals(Sequence([parsed])))
+
+    def test_locations_do_not_affect_sharing(self):
+        factory = HashConsingFactory()
+        parsed = factory.parse('1 + x')
+        built = factory.intern(Add(IntegerValue(1), LValue('x')))
+        self.assertIs(parsed, built)
+
+    def test_duplicates_take_no_extra_memory(self):
+        once = 'let var a := 0 in a := a * 2 + 1 end'
+        twice = 'let var a := 0 in a := a * 2 + 1; a := a * 2 + 1 end'
+        factory = HashConsingFactory()
+        program_once, program_twice = factory.parse(once), factory.parse(twice)
+        size_once, nodes_once = measure(program_once)
+        size_twice, nodes_twice = measure(program_twice)
+        self.assertEqual(nodes_once, nodes_twice)
+        growth = sys.getsizeof(program_twice.expressions) - sys.getsizeof(program_once.expressions)
+        self.assertEqual(size_once + growth, size_twice)  # only the list of the let's expressions is longer
+
+    def test_hash_consed_trees_cannot_be_bound(self):
+        program = HashConsingFactory().parse('let var a := 1 in a end')
+        self.assertIsInstance(program, Let)
+        with self.assertRaises(ScopeError):
+            transform_lvalues(program)
+
+
+if __name__ == '__main__':
+    unittest.main()
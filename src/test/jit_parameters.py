@@ -0,0 +1,68 @@
+import unittest
+
+import src.ast
+from src.jit_parameters import parse_jit_parameters, JitParameterError
+from src.main.tiger_interpreter import parse_options, OptionError
+from src.native_functions import create_empty_environment
+from src.test.test_utilities import parse_program
+
+
+class RecordingJitDriver:
+    """Record the merge points and back-edges of While.evaluate, with the loop condition's value at each"""
+
+    def __init__(self):
+        self.events = []
+
+    def jit_merge_point(self, **kw):
+        self.events.append(('merge', kw['value'].integer))
+
+    def can_enter_jit(self, **kw):
+        self.events.append(('enter', kw['value'].integer))
+
+
+class TestJitParameters(unittest.TestCase):
+    def test_parse_parameters(self):
+        parameters = parse_jit_parameters('threshold=200, function_threshold=400,trace_limit=12000')
+
+        self.assertEqual(['threshold=200', 'function_threshold=400', 'trace_limit=12000'],
+                         [p.to_string() for p in parameters])
+
+    def test_unknown_parameter(self):
+        self.assertRaises(JitParameterError, parse_jit_parameters, 'thresold=200')
+
+    def test_non_integer_value(self):
+        self.assertRaises(JitParameterError, parse_jit_parameters, 'threshold=high')
+        self.assertRaises(JitParameterError, parse_jit_parameters, 'threshold')
+
+    def test_command_line_option(self):
+        options = parse_options(['tiger-interpreter', '--jit=trace_limit=6000', 'program.tig'])
+
+        self.assertEqual('program.tig', options.file)
+        self.assertEqual(['trace_limit=6000'], [p.to_string() for p in options.jit_parameters])
+        self.assertRaises(OptionError, parse_options, ['tiger-interpreter', '--jit=enable_opts=1', 'program.tig'])
+
+    def test_separate_command_line_argument(self):
+        options = parse_options(['tiger-interpreter', '--jit', 'inlining=0,loop_longevity=4000', 'program.tig'])
+
+        self.assertEqual('program.tig', options.file)
+        self.assertEqual(['inlining=0', 'loop_longevity=4000'], [p.to_string() for p in options.jit_parameters])
+        self.assertRaises(OptionError, parse_options, ['tiger-interpreter', '--jit'])
+
+
+class TestWhileJitDriver(unittest.TestCase):
+    def test_back_edge_is_followed_by_the_merge_point(self):
+        program = parse_program('let var i := 0 in while i < 2 do i := i + 1; i end')
+        driver = RecordingJitDriver()
+        original, src.ast.while_jitdriver = src.ast.while_jitdriver, driver
+        try:
+            program.evaluate(create_empty_environment())
+        finally:
+            src.ast.while_jitdriver = original
+
+        # compiled code entered at a back-edge resumes at the merge point, which must test the condition, even when
+        # it is already false
+        self.assertEqual([('merge', 1), ('enter', 1), ('merge', 1), ('enter', 0), ('merge', 0)], driver.events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import unittest
+
+from src.ast import While, get_location
+from src.jit_stats import JitStatistics, json_string
+from src.native_functions import create_native_functions
+from src.parser import Parser
+
+
+class FakeLoopToken:
+    def __init__(self, number):
+        self.number = number
+
+
+class FakeDebugInfo:
+    def __init__(self, number, greenkey_repr=None, fail_descr=None):
+        self.looptoken = FakeLoopToken(number)
+        self.greenkey_repr = greenkey_repr
+        self.fail_descr = fail_descr
+
+    def get_greenkey_repr(self):
+        return self.greenkey_repr
+
+
+class TestJitStats(unittest.TestCase):
+    def test_json_string_escaping(self):
+        s = 'a "quoted"\\ string\n\twith \x01 control characters'
+
+        self.assertEqual(s, json.loads(json_string(s)))
+
+    def test_summary_is_json(self):
+        statistics = JitStatistics()
+        statistics.enable()
+        statistics.on_abort(0, None, None, 'While at test.tig:3', None, None)
+        statistics.on_trace_too_long(None, None, 'While at test.tig:3')
+        statistics.after_compile(FakeDebugInfo(1, 'While at test.tig:5'))
+        statistics.after_compile_bridge(FakeDebugInfo(1, fail_descr=object()))
+        statistics.disable()
+
+        summary = json.loads(statistics.to_json())
+
+        self.assertFalse(summary['jit'])  # the counters are only available once translated
+        self.assertEqual(0, summary['loops'])
+        self.assertEqual({'While at test.tig:3': 2}, summary['aborts_by_location'])
+        self.assertIn('ABORT_TOO_LONG', summary['aborts'])
+        self.assertEqual(['While at test.tig:5'], list(statistics.bridge_locations.values()))
+        self.assertGreaterEqual(summary['total_seconds'], 0.0)
+        self.assertEqual([], summary['hottest_loops'])
+
+    def test_hottest_loops_are_sorted(self):
+        class Loop:
+            def __init__(self, entries):
+                self.entries = entries
+
+        loops = [Loop(1), Loop(100), Loop(10)]
+
+        self.assertEqual([100, 10, 1], [loop.entries for loop in JitStatistics.hottest(loops)])
+
+    def test_location_of_green_key(self):
+        program = Parser("""let var a := 0 in
+        while a < 10 do a := a + 1
+        end""", 'test.tig').parse(create_native_functions())
+        loop = program.expressions[0]  # the green key of while_jitdriver
+
+        self.assertTrue(isinstance(loop, While))
+        self.assertEqual('While at test.tig:2', get_location(loop))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+
+from src.ast import IntegerValue, FunctionDeclaration
+from src.lambda_lifting import lift_functions
+from src.main.tiger_interpreter import parse_options
+from src.memoization import memoize_pure_functions
+from src.native_functions import create_empty_environment
+from src.test.test_utilities import parse_program, assert_pass_preserves_result
+
+
+class TestLambdaLifting(unittest.TestCase):
+    def lift(self, program):
+        """:return: the lifted program and the (name, added parameters) of the lifted functions after checking it"""
+        lifted, functions = assert_pass_preserves_result(self, program, lift_functions)
+        return lifted, [(f.name, f.added) for f in functions]
+
+    def test_read_only_captures_become_parameters(self):
+        program, lifted = self.lift("""
+        let
+          var total := 0
+          function sum(n: int, step: int): int =
+            let
+              var limit := n * 2
+              function add(i: int): int = if i > limit then 0 else i + add(i + step)
+            in
+              total := add(0); total
+            end
+        in
+          sum(10, 3)
+        end
+        """)
+        self.assertListEqual([('add', ['limit', 'step'])], lifted)
+        self.assertListEqual(['total', 'sum', 'add'], [d.name for d in program.declarations])
+        self.assertListEqual([0, 1, 2], [d.index for d in program.declarations])
+        add = program.declarations[2]
+        self.assertIs(program, add.parent)
+        self.assertListEqual(['i', 'limit', 'step'], [p.name for p in add.parameters])
+        self.assertListEqual(['limit'], [d.name for d in program.declarations[1].body.declarations])
+
+    def test_mutable_captures_are_not_lifted(self):
+        program, lifted = self.lift("""
+        let
+          function count(n: int): int =
+            let
+              var calls := 0
+              function step(i: int): int = (calls := calls + 1; if i = 0 then calls else step(i - 1))
+            in
+              step(n)
+            end
+        in
+          count(5)
+        end
+        """)
+        self.assertListEqual([], lifted)
+
+    def test_transitive_captures(self):
+        program, lifted = self.lift("""
+        let
+          function f(a: int, b: int): int =
+            let
+              function even(n: int): int = if n = 0 then a else odd(n - 1)
+              function odd(n: int): int = if n = 0 then b else even(n - 1)
+              function g(n: int): int = even(n) * 10
+            in
+              g(3) + g(4)
+            end
+        in
+          f(1, 2)
+        end
+        """)
+        self.assertListEqual([('even', ['a', 'b']), ('odd', ['b', 'a']), ('g', ['a', 'b'])], lifted)
+        self.assertEqual(IntegerValue(30), program.evaluate(create_empty_environment()))
+
+    def test_nested_lifted_functions(self):
+        program, lifted = self.lift("""
+        let
+          var global := 100
+          function outer(x: int): int =
+            let
+              function middle(y: int): int =
+                let
+                  function inner(z: int): int = x + y + z + global
+                in
+                  inner(1)
+                end
+            in
+              middle(2)
+            end
+        in
+          outer(3)
+        end
+        """)
+        self.assertListEqual([('middle', ['x']), ('inner', ['x', 'y'])], lifted)
+        self.assertListEqual(['global', 'outer', 'middle', 'inner'], [d.name for d in program.declarations])
+        for declaration in program.declarations[1:]:
+            self.assertIsInstance(declaration, FunctionDeclaration)
+            self.assertIs(program, declaration.parent)
+
+    def test_lifting_enables_memoization(self):
+        program = """
+        let
+          function f(k: int): int =
+            let
+              function fib(n: int): int = if n < 2 then n * k else fib(n - 1) + fib(n - 2)
+            in
+              fib(20)
+            end
+        in
+          f(2)
+        end
+        """
+        self.assertListEqual(['f'], [t.name for t in memoize_pure_functions(parse_program(program))])  # fib reads k
+        lifted = parse_program(program)
+        lift_functions(lifted)
+        self.assertListEqual(['f', 'fib'], [t.name for t in memoize_pure_functions(lifted)])
+        self.assertEqual(IntegerValue(13530), lifted.evaluate(create_empty_environment()))
+
+    def test_option(self):
+        self.assertTrue(parse_options(['tiger-interpreter', '--lambda-lift-report', 'program.tig']).lambda_lift)
+        self.assertFalse(parse_options(['tiger-interpreter', 'program.tig']).lambda_lift)
+
+
+if __name__ == '__main__':
+    unittest.main()
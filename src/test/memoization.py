@@ -0,0 +1,95 @@
+import unittest
+
+from src.ast import IntegerValue
+from src.environment import Environment
+from src.main.tiger_interpreter import parse_options
+from src.memoization import PurityAnalysis, MemoizationTable, memoize_pure_functions
+from src.test.test_utilities import parse_program
+
+
+class TestMemoization(unittest.TestCase):
+    def pure_function_names(self, program):
+        return [f.name for f in PurityAnalysis(parse_program(program)).find_pure_functions()]
+
+    def test_recursive_function_is_pure(self):
+        names = self.pure_function_names("""
+        let
+          function fib(n:int) : int = if n <= 1 then n else fib(n - 1) + fib(n - 2)
+        in
+          fib(10)
+        end
+        """)
+
+        self.assertListEqual(['fib'], names)
+
+    def test_mutually_recursive_functions_are_pure(self):
+        names = self.pure_function_names("""
+        let
+          function even(n:int) : int = if n = 0 then 1 else odd(n - 1)
+          function odd(n:int) : int = if n = 0 then 0 else even(n - 1)
+        in
+          even(10)
+        end
+        """)
+
+        self.assertListEqual(['even', 'odd'], names)
+
+    def test_impure_functions(self):
+        names = self.pure_function_names("""
+        let
+          var counter := 0
+          var constant := 42
+          function prints(n:int) : int = (print("..."); n)
+          function assigns(n:int) : int = (counter := n; n)
+          function readsMutable(n:int) : int = n + counter
+          function readsConstant(n:int) : int = n + constant
+          function callsImpure(n:int) : int = prints(n)
+          function takesString(s:string) : int = 42
+          function usesLocals(n:int) : int = let var sum := 0 in for i := 1 to n do sum := sum + i; sum end
+        in
+          0
+        end
+        """)
+
+        self.assertListEqual(['readsConstant', 'usesLocals'], names)
+
+    def test_memoized_evaluation(self):
+        program = parse_program("""
+        let
+          function fib(n:int) : int = if n <= 1 then n else fib(n - 1) + fib(n - 2)
+        in
+          fib(20)
+        end
+        """)
+        tables = memoize_pure_functions(program)
+
+        result = program.evaluate(Environment.empty())
+
+        self.assertEqual(IntegerValue(6765), result)
+        self.assertEqual(1, len(tables))
+        self.assertEqual(21, tables[0].misses)
+        self.assertEqual(18, tables[0].hits)
+
+    def test_least_recently_used_eviction(self):
+        table = MemoizationTable('f', 2)
+        table.put('1', IntegerValue(1))
+        table.put('2', IntegerValue(2))
+        table.get('1')
+        table.put('3', IntegerValue(3))
+
+        self.assertEqual(IntegerValue(1), table.get('1'))
+        self.assertIsNone(table.get('2'))
+        self.assertEqual(1, table.evictions)
+
+    def test_report_option(self):
+        options = parse_options(['tiger-interpreter', '--memoize-report', 'program.tig'])
+        self.assertTrue(options.memoize)
+        self.assertTrue(options.memoize_report)
+        options = parse_options(['tiger-interpreter', '--memoize=8', 'program.tig'])
+        self.assertTrue(options.memoize)
+        self.assertEqual(8, options.memoize_capacity)
+        self.assertFalse(options.memoize_report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import unittest
+
+from src.memory_stats import memory_statistics, MemoryStatistics, read_peak_rss_kb
+from src.native_functions import create_native_functions, create_empty_environment
+from src.parser import Parser
+
+
+class TestMemoryStats(unittest.TestCase):
+    def setUp(self):
+        memory_statistics.reset()
+
+    def tearDown(self):
+        memory_statistics.disable()
+        memory_statistics.reset()
+
+    def evaluate(self, source):
+        program = Parser(source).parse(create_native_functions())
+        memory_statistics.enable()
+        try:
+            return program.evaluate(create_empty_environment())
+        finally:
+            memory_statistics.disable()
+
+    def test_allocations_by_value_type(self):
+        self.evaluate("""
+        let
+          type point = {x: int, y: int}
+          type ints = array of int
+          var a := ints[10] of 0
+          function f(p: point): int = p.x + p.y
+        in
+          for i := 1 to 5 do (a[i] := f(point{x = i, y = 1}); concat("a", "b"));
+          a[3]
+        end
+        """)
+
+        self.assertEqual(1, memory_statistics.array_values)
+        self.assertEqual(10, memory_statistics.array_elements)
+        self.assertEqual(5, memory_statistics.record_values)
+        self.assertEqual(5, memory_statistics.string_values)
+        self.assertEqual(1 + 1 + 5, memory_statistics.environment_levels)  # the let, the for loop and each call
+        self.assertGreaterEqual(memory_statistics.integer_values, 5 + 5)  # at least each call result and increment
+
+    def test_nothing_is_counted_when_disabled(self):
+        program = Parser('let var a := 1 + 2 in a end').parse(create_native_functions())
+        program.evaluate(create_empty_environment())
+
+        self.assertEqual(0, memory_statistics.integer_values)
+        self.assertEqual(0, memory_statistics.environment_levels)
+
+    def test_gc_hooks(self):
+        statistics = MemoryStatistics()
+        statistics.enable()
+        self.assertTrue(statistics.is_gc_minor_enabled())
+
+        statistics.on_gc_minor(100, 0, 0)
+        statistics.on_gc_collect_step(300, 0, 1)
+        statistics.on_gc_collect(1, 0, 0, 0, 0, 0)
+
+        summary = json.loads(statistics.to_json())
+        self.assertEqual(1, summary['gc_minor_collections'])
+        self.assertEqual(1, summary['gc_major_collections'])
+        self.assertEqual(400, summary['gc_pause_ticks'])
+        self.assertEqual(300, summary['gc_maximum_pause_ticks'])
+        self.assertFalse(summary['gc_hooks'])  # only installed once translated
+
+    def test_peak_rss(self):
+        self.assertEqual(-1, read_peak_rss_kb('/does/not/exist'))
+        self.assertNotEqual(0, read_peak_rss_kb())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,28 @@
 import unittest
 
-from src.ast import IntegerValue
+from src.ast import IntegerValue, StringValue, InterpretationError
+from src.environment import Environment
 from src.native_functions import create_environment_with_natives, list_native_environment_names, tiger_start_timer, \
-    tiger_stop_timer
+    tiger_stop_timer, create_native_functions
+from src.parser import Parser
 
 
 class TestUtil(unittest.TestCase):
+    def evaluate(self, program):
+        return Parser(program).parse(create_native_functions()).evaluate(Environment.empty())
+
     def test_function_call(self):
         env = create_environment_with_natives()
         names = list_native_environment_names(env)
 
-        self.assertListEqual(['print', 'timeGo', 'timeStop'], names)
+        self.assertListEqual(['print', 'timeGo', 'timeStop', 'concat', 'size', 'substring', 'ord', 'chr',
+                              'arrayFill', 'arrayCopy', 'arrayEquals'], names)
+
+    def test_names_are_listed_from_the_current_level(self):
+        env = create_environment_with_natives().push(2)
+        env.set(0, create_native_functions()[1])
+
+        self.assertListEqual(['print'], list_native_environment_names(env))
 
     def test_timer_in_python(self):
         tiger_start_timer()
@@ -23,6 +35,61 @@ class TestUtil(unittest.TestCase):
         self.assertIsInstance(ticks, IntegerValue)
         self.assertGreater(ticks.integer, 0)
 
+    def test_string_functions(self):
+        self.assertEqual(StringValue('abcdef'), self.evaluate('concat("abc", "def")'))
+        self.assertEqual(IntegerValue(3), self.evaluate('size("abc")'))
+        self.assertEqual(StringValue('bcd'), self.evaluate('substring("abcdef", 1, 3)'))
+        self.assertEqual(IntegerValue(97), self.evaluate('ord("abc")'))
+        self.assertEqual(IntegerValue(-1), self.evaluate('ord("")'))
+        self.assertEqual(StringValue('a'), self.evaluate('chr(97)'))
+
+    def test_concat_in_loop_builds_rope(self):
+        result = self.evaluate("""
+        let
+          var s := ""
+        in
+          for i := 1 to 1000 do s := concat(s, chr(97));
+          s
+        end
+        """)
+
+        self.assertIsInstance(result, StringValue)
+        self.assertTrue(result.is_rope())
+        self.assertEqual(1000, result.length)
+        self.assertEqual('a' * 1000, result.get_string())
+        self.assertFalse(result.is_rope())
+
+    def test_deep_rope_flattens_without_recursion(self):
+        s = StringValue('')
+        for i in range(100000):
+            s = StringValue.concatenate(s, StringValue('ab'[i % 2]))
+
+        self.assertEqual(100000, s.length)
+        self.assertEqual('ab' * 50000, s.get_string())
+
+    def test_array_functions(self):
+        result = self.evaluate("""
+        let
+          type ints = array of int
+          var a := ints[5] of 0
+          var b := ints[5] of 0
+          var c := ints[5] of 0
+        in
+          arrayFill(a, 7);
+          a[0] := 1;
+          arrayCopy(a, 0, b, 1, 4);
+          arrayCopy(a, 0, a, 1, 4);  // overlapping, a is now [1, 1, 7, 7, 7]
+          arrayCopy(a, 0, c, 0, 5);
+          arrayEquals(a, b) + 10 * arrayEquals(a, c) + 100 * a[1] + 1000 * b[1]
+        end
+        """)
+
+        self.assertEqual(IntegerValue(0 + 10 + 100 + 1000), result)
+
+    def test_array_copy_out_of_bounds(self):
+        with self.assertRaises(InterpretationError):
+            self.evaluate('let type ints = array of int var a := ints[2] of 0 in arrayCopy(a, 1, a, 0, 2) end')
+
 
 if __name__ == '__main__':
     unittest.main()
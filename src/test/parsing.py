@@ -214,6 +214,20 @@ class TestParsing(unittest.TestCase):
         b = StringValue('0')
         self.assertEqual(a, b)
 
+    def test_string_literals_are_interned(self):
+        program = Parser('(a("abc"); b("abc"); c("abd"))').parse()
+        abc1, abc2, abd = [call.arguments[0] for call in program.expressions]
+        self.assertIs(abc1, abc2)
+        self.assertIsNot(abc1, abd)
+
+    def test_string_inequality_by_hash(self):
+        a = StringValue('abc')
+        b = StringValue('abd')
+        self.assertNotEqual(a.get_hash(), b.get_hash())
+        self.assertNotEqual(a, b)
+        self.assertEqual(StringValue.concatenate(StringValue('a' * 64), StringValue('bc')),
+                         StringValue('a' * 64 + 'bc'))
+
     def test_let_empty_declaration(self):
         self.assertParsesTo('let in x() end', Let([], [FunctionCall('x', [])]))
 
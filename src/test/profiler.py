@@ -0,0 +1,84 @@
+import unittest
+
+from src.ast import FunctionCall, Add, IntegerValue
+from src.environment import Environment
+from src.native_functions import create_native_functions
+from src.parser import Parser
+from src.profiler import profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def profile(self, program):
+        program = Parser(program, 'test.tig').parse(create_native_functions())
+        profiler.reset()
+        profiler.enabled = True
+        try:
+            program.evaluate(Environment.empty())
+        finally:
+            profiler.enabled = False
+        return program
+
+    def test_counts_and_locations(self):
+        self.profile("""let
+          function f(n:int) : int = n + 1
+        in
+          for i := 1 to 10 do f(i)
+        end""")
+
+        entries = profiler.sorted_entries()
+        calls = [e for e in entries if isinstance(e.node, FunctionCall)]
+        additions = [e for e in entries if isinstance(e.node, Add) and e.location() == 'test.tig:2']
+        self.assertEqual(1, len(calls))
+        self.assertEqual(10, calls[0].count)
+        self.assertEqual('test.tig:4', calls[0].location())
+        self.assertEqual(1, len(additions))
+        self.assertEqual(10, additions[0].count)
+        self.assertEqual(sorted([e.self_ticks for e in entries], reverse=True), [e.self_ticks for e in entries])
+
+    def test_shared_literals_are_located_where_they_are_evaluated(self):
+        self.profile("""let
+          var a := 1
+        in
+          a + 1
+        end""")
+
+        ones = [e for e in profiler.sorted_entries() if isinstance(e.node, IntegerValue) and e.node.integer == 1]
+        self.assertEqual(['test.tig:2', 'test.tig:4'], sorted([e.location() for e in ones]))
+        self.assertEqual([1, 1], [e.count for e in ones])
+
+    def test_recursive_evaluations_are_totalled_once(self):
+        program = self.profile("""let
+          function f(n:int) : int = if n = 0 then 0 else f(n - 1) + 1
+        in
+          f(20)
+        end""")
+
+        entries = profiler.sorted_entries()
+        root = [e for e in entries if e.node is program][0]
+        recursive_call = [e for e in entries if isinstance(e.node, FunctionCall) and e.location() == 'test.tig:2'][0]
+        self.assertEqual(20, recursive_call.count)
+        self.assertEqual(0, recursive_call.depth)
+        for entry in entries:
+            self.assertLessEqual(entry.total_ticks, root.total_ticks)
+            self.assertLessEqual(entry.self_ticks, entry.total_ticks)
+
+    def test_collapsed_stacks(self):
+        self.profile("""let
+          function g() = ()
+          function f() = g()
+        in
+          f()
+        end""")
+
+        paths = [line.split(' ')[0] for line in profiler.collapsed_stacks().split('\n') if line]
+        self.assertEqual(['main', 'main;f', 'main;f;g'], sorted(paths))
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler.reset()
+        Parser('1 + 1').parse(create_native_functions()).evaluate(Environment.empty())
+
+        self.assertEqual(0, len(profiler.entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
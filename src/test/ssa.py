@@ -0,0 +1,398 @@
+import unittest
+
+from src.ast import FunctionDeclaration, Assign, While
+from src.main.tiger_interpreter import parse_options
+from src.native_functions import create_empty_environment
+from src.scopes import DepthFirstAstIterator
+from src.ssa.ir import Constant, Phi, Copy, BinaryOp, Call, Branch
+from src.ssa.lowering import lower_function, lower_program
+from src.ssa.passes import CopyPropagation, SparseConditionalConstantPropagation, DeadValueElimination, \
+    PassManager, default_passes, optimize_program
+from src.ssa.verifier import VerificationError, verify
+from src.test.test_utilities import parse_program, assert_pass_preserves_result
+
+
+def find_function(program, name):
+    for node in DepthFirstAstIterator(program):
+        if isinstance(node, FunctionDeclaration) and node.name == name:
+            return node
+    raise AssertionError('no function %s' % name)
+
+
+def instructions_of(function, instruction_class):
+    return [i for i in function.instructions() if isinstance(i, instruction_class)]
+
+
+class TestLowering(unittest.TestCase):
+    def lower(self, program, name):
+        function = lower_function(find_function(parse_program(program), name))
+        verify(function)
+        return function
+
+    def test_straight_line_assignments_become_values(self):
+        function = self.lower("""
+        let function f(a: int): int = let var x := a + 1 in x := x * 2; x end in f(1) end
+        """, 'f')
+        self.assertEqual(1, len(function.blocks))
+        self.assertEqual("""function f(v0(a)):
+b0:
+  v1 = add v0(a), 1
+  v2 = copy[x] v1
+  v3 = mul v2, 2
+  v4 = copy[x] v3
+  return v4""", function.to_string())
+
+    def test_loop_variables_become_phis(self):
+        function = self.lower("""
+        let function f(n: int): int = let var s := 0 in for i := 1 to n do s := s + i; s end in f(3) end
+        """, 'f')
+        names = [phi.variable_name for phi in instructions_of(function, Phi)]
+        self.assertTrue('s' in names)
+        self.assertTrue('i' in names)
+        headers = [block for block in function.blocks if block.loop_exit is not None]
+        self.assertEqual(1, len(headers))
+
+    def test_if_joins_values_with_a_phi(self):
+        function = self.lower("""
+        let function f(a: int): int = if a > 0 then a else 0 - a in f(1) end
+        """, 'f')
+        branch = function.entry().terminator()
+        self.assertTrue(isinstance(branch, Branch))
+        self.assertEqual(1, len(branch.join.phis()))
+
+    def test_outer_variables_are_loaded_and_stored(self):
+        function = self.lower("""
+        let var count := 0 function f(): int = (count := count + 1; count) in f() end
+        """, 'f')
+        self.assertEqual("""function f():
+b0:
+  v0 = load count
+  v1 = add v0, 1
+  store count, v1
+  v2 = load count
+  return v2""", function.to_string())
+
+    def test_breaks_carry_values_to_the_loop_exit(self):
+        function = self.lower("""
+        let function f(n: int): int = let var a := 0 in while a < n do (a := a + 100; break); a end in f(1) end
+        """, 'f')
+        header = [block for block in function.blocks if block.loop_exit is not None][0]
+        exit_block = header.loop_exit
+        self.assertEqual(['a', '$while'], [phi.variable_name for phi in exit_block.phis()])
+        assigned = [copy for copy in instructions_of(function, Copy) if copy.variable_name == 'a'][-1]
+        breaking = [block for block in exit_block.predecessors if assigned.block is block]
+        self.assertEqual(1, len(breaking))
+        self.assertTrue(exit_block.phis()[0].operands[exit_block.predecessor_index(breaking[0])] is assigned)
+
+    def test_unsupported_functions_are_skipped(self):
+        functions, skipped = lower_program(parse_program("""
+        let
+          function nested(): int = let function g(): int = 1 in g() end
+          function records(): int = let type r = {x: int} var a := r{x = 1} in a.x end
+          function simple(): int = 1
+        in
+          nested() + records() + simple()
+        end
+        """))
+        self.assertEqual(['g', 'simple', '$main'], [f.name for f in functions])
+        self.assertEqual([('nested', 'declares function g'), ('records', 'declares record type r')], skipped)
+
+
+class TestVerifier(unittest.TestCase):
+    def lower(self):
+        return lower_function(find_function(parse_program("""
+        let function f(a: int): int = if a > 0 then a + 1 else 2 in f(1) end
+        """), 'f'))
+
+    def test_lowered_functions_verify(self):
+        verify(self.lower())
+
+    def test_use_before_definition(self):
+        function = self.lower()
+        entry = function.entry()
+        comparison = entry.instructions[0]
+        entry.remove(comparison)
+        entry.instructions.insert(1, comparison)
+        comparison.block = entry
+        self.assertRaises(VerificationError, verify, function)
+
+    def test_missing_terminator(self):
+        function = self.lower()
+        entry = function.entry()
+        entry.remove(entry.terminator())
+        self.assertRaises(VerificationError, verify, function)
+
+    def test_phi_operand_count(self):
+        function = self.lower()
+        phi = instructions_of(function, Phi)[0]
+        phi.operands.append(Constant(None))
+        self.assertRaises(VerificationError, verify, function)
+
+    def test_broken_pass_is_named(self):
+        class BrokenPass(DeadValueElimination):
+            name = 'broken'
+
+            def run(self, function):
+                return DeadValueElimination.run(self, function) + self.break_function(function)
+
+            @staticmethod
+            def break_function(function):
+                function.entry().remove(function.entry().terminator())
+                return 1
+
+        try:
+            PassManager([BrokenPass()]).run(self.lower())
+            self.fail('expected a VerificationError')
+        except VerificationError as e:
+            self.assertTrue(e.reason.startswith('after broken: function f has block b0 without a terminator'))
+
+
+class TestPasses(unittest.TestCase):
+    def lower(self, program, name):
+        return lower_function(find_function(parse_program(program), name))
+
+    def run_passes(self, function, passes):
+        changes = [p.run(function) for p in passes]
+        verify(function)
+        return changes
+
+    def test_copy_propagation(self):
+        function = self.lower("""
+        let function f(a: int): int = let var x := a var y := x in y + x end in f(1) end
+        """, 'f')
+        self.run_passes(function, [CopyPropagation()])
+        self.assertEqual([], instructions_of(function, Copy))
+        self.assertEqual("""function f(v0(a)):
+b0:
+  v1 = add v0(a), v0(a)
+  return v1""", function.to_string())
+
+    def test_copy_propagation_removes_phis_of_unassigned_variables(self):
+        function = self.lower("""
+        let function f(n: int): int = let var k := 3 var s := 0 in for i := 1 to n do s := s + k; s end in f(3) end
+        """, 'f')
+        self.run_passes(function, [CopyPropagation()])
+        self.assertEqual(['s', 'i'], [phi.variable_name for phi in instructions_of(function, Phi)])
+
+    def test_sccp_folds_constants(self):
+        function = self.lower("""
+        let function f(): int = let var x := 6 var y := x * 7 in y - 2 end in f() end
+        """, 'f')
+        self.run_passes(function, [SparseConditionalConstantPropagation(), DeadValueElimination()])
+        self.assertEqual("""function f():
+b0:
+  return 40""", function.to_string())
+
+    def test_sccp_folds_branches(self):
+        function = self.lower("""
+        let function f(a: int): int = let var x := 1 in if x = 1 then a else (print("never"); 0) end in f(5) end
+        """, 'f')
+        self.run_passes(function, default_passes())
+        self.assertEqual([], instructions_of(function, Branch))
+        self.assertEqual([], instructions_of(function, Call))  # the print of the branch not taken
+        self.assertTrue(function.blocks[-1].terminator().value() is function.parameters[0])
+
+    def test_sccp_keeps_constants_assigned_in_loops(self):
+        function = self.lower("""
+        let
+          function f(n: int): int =
+            let var k := 2 var s := 0 in
+              for i := 1 to n do (s := s + k; k := 2);
+              if k = 2 then s else 0 - 1
+            end
+        in
+          f(3)
+        end
+        """, 'f')
+        self.run_passes(function, default_passes())
+        self.assertEqual(0, len([phi for phi in instructions_of(function, Phi) if phi.variable_name == 'k']))
+        self.assertEqual(1, len(instructions_of(function, Branch)))  # the loop's
+
+    def test_sccp_does_not_fold_failing_operations(self):
+        function = self.lower("""
+        let function f(): int = 1 / 0 in f() end
+        """, 'f')
+        self.run_passes(function, default_passes())
+        self.assertEqual(1, len(instructions_of(function, BinaryOp)))
+
+    def test_dead_values(self):
+        function = self.lower("""
+        let function f(a: int): int = let var unused := a * a var n := 0 in while n < 10 do n := n + 1; a end in f(1) end
+        """, 'f')
+        changes = self.run_passes(function, [CopyPropagation(), DeadValueElimination()])
+        self.assertTrue(changes[1] > 0)
+        self.assertEqual(['lt', 'add'], [operation.to_string().split()[2] for operation in
+                                         instructions_of(function, BinaryOp)])  # the loop's comparison and increment
+
+
+class TestOptimizeProgram(unittest.TestCase):
+    def optimize(self, program, pass_manager=None):
+        """:return: the reports after checking that the optimized program evaluates to the same result"""
+        _, reports = assert_pass_preserves_result(self, program, lambda p: optimize_program(p, pass_manager))
+        return reports
+
+    def test_recursion(self):
+        program = """
+        let function fib(n: int): int = if n < 2 then n else fib(n - 1) + fib(n - 2) in fib(15) end
+        """
+        reports = self.optimize(program)
+        optimized = parse_program(program)
+        optimize_program(optimized)
+        self.assertEqual(find_function(parse_program(program), 'fib').body, find_function(optimized, 'fib').body)
+        self.assertEqual('ssa: function=fib blocks=4 values=8 copy-propagation=0 sccp=0 copy-propagation=0 '
+                         'dead-values=0', reports[0].to_string())
+
+    def test_loops_and_breaks(self):
+        self.optimize("""
+        let
+          var total := 0
+          function f(n: int): int =
+            let var x := 1 var y := 0 var k := 3 in
+              for i := 1 to n do (y := y + x * k; if k > 2 then x := x + 1 else x := 0);
+              while y > 100 do (y := y - 7; if y = 50 then break);
+              for j := 0 to 100 do (if j * j > y then break; total := total + j);
+              y + total
+            end
+        in
+          f(20) + f(3)
+        end
+        """)
+
+    def test_values_assigned_before_breaks(self):
+        for pass_manager in [PassManager([]), None]:
+            self.optimize("""
+            let
+              function f(n: int): int =
+                let var a := 0 in for i := 1 to n do (if i = 3 then (a := a + 100; break); a := a + i); a end
+            in
+              f(10)
+            end
+            """, pass_manager)
+            self.optimize("""
+            let
+              function g(): int =
+                let var i := 1 var b := 0 in while i <= 2 do (b := b + i; if i = 1 then break; i := i + 1); b end
+            in
+              g()
+            end
+            """, pass_manager)
+
+    def test_loop_variables_are_assigned_once(self):
+        program = """
+        let
+          function f(n: int): int =
+            let var s := 0 var i := 0 var x := 1 in while i < n do (s := s + i * x; i := i + 1; x := x + 2); s end
+        in
+          f(10)
+        end
+        """
+        optimized, _ = assert_pass_preserves_result(self, program, optimize_program)
+
+        def assignments_in_loop(program):
+            loop = [node for node in DepthFirstAstIterator(find_function(program, 'f')) if isinstance(node, While)][0]
+            return len([node for node in DepthFirstAstIterator(loop.body) if isinstance(node, Assign)])
+
+        self.assertEqual(3, assignments_in_loop(parse_program(program)))
+        self.assertEqual(3, assignments_in_loop(optimized))  # the phis of the loop header are coalesced
+
+    def test_swapped_loop_variables(self):
+        self.optimize("""
+        let
+          function fib(n: int): int =
+            let var a := 0 var b := 1 in for i := 1 to n do (let var t := a in a := b; b := t + b end); a end
+        in
+          fib(20)
+        end
+        """)
+
+    def test_while_values(self):
+        self.optimize("""
+        let
+          function f(n: int): int =
+            let var i := 0 var last := 0 in
+              last := (while i < n do (i := i + 1; i * 2)) = nil;
+              last + i
+            end
+        in
+          f(4)
+        end
+        """)
+
+    def test_records_arrays_and_strings(self):
+        self.optimize("""
+        let
+          type point = {x: int, y: int}
+          type ints = array of int
+          var origin := point{x = 0, y = 0}
+          function sum(a: ints, n: int): int =
+            let var s := 0 in for i := 0 to n - 1 do s := s + a[i]; s end
+          function shift(p: point, dx: int): point =
+            let var q := point{x = p.x + dx, y = p.y} in q.y := q.y + 1; q end
+          function label(n: int): string = concat("n=", if n > size("abc") then "big" else "small")
+          var a := ints[5] of 2
+        in
+          a[3] := 7;
+          origin := shift(origin, 4);
+          (size(label(sum(a, 5))) + origin.x) * origin.y
+        end
+        """)
+
+    def test_evaluation_order(self):
+        self.optimize("""
+        let
+          var log := ""
+          var g := 1
+          function t(s: string, v: int): int = (log := concat(log, s); g := g + v; v)
+          function f(n: int): int =
+            let var a := g var b := 0 in
+              b := t("a", 1) + t("b", 2) * t("c", n);
+              b := b + (g + t("d", a)) + (t("e", 1) - g);
+              if size(log) > 3 then t("f", b) else t("g", a)
+            end
+        in
+          f(4);
+          size(log) * 1000 + g
+        end
+        """)
+
+    def test_if_values(self):
+        reports = self.optimize("""
+        let
+          function max(a: int, b: int): int = if a > b then a else b
+          function clamp(a: int): int = max(0, if a > 10 then 10 else (if a < 0 - 10 then 0 - 10 else a)) + 1
+        in
+          clamp(20) + clamp(0 - 20) * 100 + clamp(5) * 10000 + max(3, 2)
+        end
+        """)
+        self.assertEqual(['ssa: function=max blocks=4 values=4 copy-propagation=0 sccp=0 copy-propagation=0 '
+                          'dead-values=0'], [report.to_string() for report in reports[:1]])
+
+    def test_runtime_errors_are_kept(self):
+        program = parse_program("""
+        let type ints = array of int function f(): int = let var a := ints[2] of 0 in a[5] end in f() end
+        """)
+        optimize_program(program)
+        self.assertRaises(Exception, program.evaluate, create_empty_environment())
+
+    def test_skipped_functions_are_reported(self):
+        reports = self.optimize("""
+        let function f(): int = let function g(): int = 2 in g() end in f() end
+        """)
+        self.assertEqual(['ssa: function=g blocks=1 values=0 copy-propagation=0 sccp=0 copy-propagation=0 '
+                          'dead-values=0',
+                          'ssa: function=$main blocks=1 values=1 copy-propagation=0 sccp=0 copy-propagation=0 '
+                          'dead-values=0',
+                          'ssa: function=f skipped=declares function g'],
+                         [report.to_string() for report in reports])
+
+    def test_options(self):
+        options = parse_options(['tiger-interpreter', '--ssa-report', 'program.tig'])
+        self.assertTrue(options.ssa)
+        self.assertTrue(options.ssa_report)
+        options = parse_options(['tiger-interpreter', '--ssa', 'program.tig'])
+        self.assertTrue(options.ssa)
+        self.assertFalse(options.ssa_report)
+
+
+if __name__ == '__main__':
+    unittest.main()
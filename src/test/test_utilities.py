@@ -1,6 +1,7 @@
 import os
 
 from src.ast import IntegerValue, StringValue
+from src.native_functions import create_native_functions, create_empty_environment
 from src.parser import Parser
 
 
@@ -28,6 +29,24 @@ def parse_file(path, native_function_names=None):
     return parser.parse(native_function_names)
 
 
+def parse_program(text):
+    """Parse a program with the native functions declared, as the interpreter does"""
+    return Parser(text).parse(create_native_functions())
+
+
+def assert_pass_preserves_result(test, text, optimize):
+    """
+    Check that an optimization pass does not change what a program evaluates to: the program is parsed twice, once to
+    evaluate it as is and once to run optimize() over it before evaluating it
+    :return: the optimized program and the value optimize() returned (e.g. its report)
+    """
+    expected = parse_program(text).evaluate(create_empty_environment())
+    optimized = parse_program(text)
+    result = optimize(optimized)
+    test.assertEqual(expected, optimized.evaluate(create_empty_environment()))
+    return optimized, result
+
+
 class OutputContainer:
     """Container for holding output"""
     __value__ = ""
@@ -36,7 +55,7 @@ class OutputContainer:
         if isinstance(s, IntegerValue):
             self.__value__ += str(s.integer)
         elif isinstance(s, StringValue):
-            self.__value__ += s.string
+            self.__value__ += s.get_string()
         else:
             raise ValueError('Unknown value type ' + str(s))
 
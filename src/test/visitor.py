@@ -0,0 +1,142 @@
+import unittest
+
+from src.ast import LValue, IntegerValue, Add, Multiply, Sequence
+from src.scopes import DepthFirstAstIterator, ExitScope
+from src.test.test_utilities import parse_program
+from src.visitor import AstVisitor, AstTransformer, bind_methods
+
+
+class RecordingVisitor(AstVisitor):
+    def __init__(self):
+        self.log = []
+
+    def enter_Program(self, node):
+        self.log.append('enter %s' % node.__class__.__name__)
+        return True
+
+    def exit_Let(self, node):
+        self.log.append('exit Let')
+
+    def exit_FunctionDeclaration(self, node):
+        self.log.append('exit FunctionDeclaration')
+
+
+class OperationCounter(AstVisitor):
+    def __init__(self):
+        self.operations = 0
+        self.integers = 0
+
+    def enter_BinaryOperation(self, node):
+        self.operations += 1
+        return True
+
+    def enter_IntegerValue(self, node):
+        self.integers += 1
+        return True
+
+
+class BoundOperationCounter(OperationCounter):
+    pass
+
+
+bind_methods(BoundOperationCounter)
+
+
+class FunctionSkipper(RecordingVisitor):
+    def enter_FunctionDeclaration(self, node):
+        self.log.append('skip %s' % node.name)
+        return False
+
+
+class ConstantFolder(AstTransformer):
+    def exit_Sequence(self, node):
+        return node.expressions[0] if len(node.expressions) == 1 else None
+
+    def exit_Add(self, node):
+        if isinstance(node.left, IntegerValue) and isinstance(node.right, IntegerValue):
+            return IntegerValue(node.left.integer + node.right.integer)
+        return None
+
+    def exit_Multiply(self, node):
+        if isinstance(node.left, IntegerValue) and isinstance(node.right, IntegerValue):
+            return IntegerValue(node.left.integer * node.right.integer)
+        return None
+
+
+class TestVisitor(unittest.TestCase):
+    def test_children_are_visited_in_iteration_order(self):
+        program = parse_program("""
+        let
+          type point = {x: int, y: int}
+          var p := point{x = 1, y = 2}
+          var a := 0
+          function f(n: int): int = if n > 0 then f(n - 1) + p.x else a
+        in
+          for i := 1 to 3 do a := a + f(i);
+          while a > 100 do (a := a - 1; if a = 50 then break);
+          a
+        end
+        """)
+        visitor = RecordingVisitor()
+        visitor.visit(program)
+        expected = ['enter %s' % node.__class__.__name__ for node in DepthFirstAstIterator(program)
+                    if not isinstance(node, ExitScope)]
+        self.assertEqual(expected, [entry for entry in visitor.log if entry.startswith('enter')])
+
+    def test_exit_methods_replace_scope_markers(self):
+        program = parse_program("let var x := 1 function f(y: int): int = y in let var z := x in f(z) end end")
+        visitor = RecordingVisitor()
+        visitor.visit(program)
+        self.assertEqual(['enter Let', 'enter VariableDeclaration', 'enter IntegerValue', 'enter FunctionDeclaration',
+                          'enter FunctionParameter', 'enter LValue', 'exit FunctionDeclaration', 'enter Let',
+                          'enter VariableDeclaration', 'enter LValue', 'enter FunctionCall', 'enter LValue', 'exit Let',
+                          'exit Let'], visitor.log)
+
+    def test_methods_default_to_parent_classes(self):
+        program = parse_program("let var x := 1 in (x + 2) * (3 - x) end")
+        for counter in [OperationCounter(), BoundOperationCounter()]:
+            counter.visit(program)
+            self.assertEqual(3, counter.operations)
+            self.assertEqual(3, counter.integers)
+
+    def test_skipping_children(self):
+        program = parse_program("let function f(y: int): int = y + 1 in f(2) end")
+        visitor = FunctionSkipper()
+        visitor.visit(program)
+        self.assertEqual(['enter Let', 'skip f', 'exit FunctionDeclaration', 'enter FunctionCall', 'enter IntegerValue',
+                          'exit Let'], visitor.log)
+
+    def test_deep_nesting(self):
+        node = IntegerValue(1)
+        for _ in range(20000):
+            node = Sequence([Add(node, IntegerValue(1))])
+        counter = OperationCounter()
+        counter.visit(node)
+        self.assertEqual(20000, counter.operations)
+        self.assertEqual(20001, counter.integers)
+        self.assertEqual(IntegerValue(20001), ConstantFolder().transform(node))
+
+
+class TestTransformer(unittest.TestCase):
+    def test_rewriting_in_place(self):
+        program = parse_program("let var x := (1 + 2) * 3 in x + 2 * 5 end")
+        let = ConstantFolder().transform(program)
+        self.assertTrue(let is program)
+        self.assertEqual(IntegerValue(9), program.declarations[0].expression)
+        self.assertTrue(isinstance(program.expressions[0], Add))
+        self.assertEqual(IntegerValue(10), program.expressions[0].right)
+
+    def test_replacing_the_root(self):
+        root = Multiply(Add(IntegerValue(1), IntegerValue(2)), IntegerValue(4))
+        self.assertEqual(IntegerValue(12), ConstantFolder().transform(root))
+
+    def test_unchanged_nodes_are_kept(self):
+        program = parse_program("let var x := 1 in x + x end")
+        add = program.expressions[0]
+        ConstantFolder().transform(program)
+        self.assertTrue(program.expressions[0] is add)
+        self.assertTrue(isinstance(add.left, LValue) and add.left.declaration is program.declarations[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,9 @@ from src.tokens import NumberToken, IdentifierToken, KeywordToken, SymbolToken,
 
 
 class Location(RPythonizedObject):
+    _attrs_ = ['offset', 'line', 'file']
+    __slots__ = _attrs_
+
     def __init__(self, offset, line, file):
         self.offset = offset
         self.line = line
@@ -0,0 +1,105 @@
+from src.ast import Program, list_ast_classes
+from src.rpythonizer import add_default_visitor_methods, bind_visitor_methods
+
+"""
+The states of the nodes on the stack of a traversal
+"""
+ENTER = 0
+EXIT = 1  # after the children were visited
+EXIT_SKIPPED = 2  # enter_<class>() returned False so the children were not visited
+
+
+class AstVisitor:
+    """
+    Visit the nodes of an AST depth-first, in the order of their children() (e.g. the declarations of a let, then its
+    body), with an explicit stack rather than recursion so that deeply nested programs can be visited. For each node,
+    node.accept(visitor) calls the visitor's enter_<class>() method, e.g. enter_Let(), and--once the children are
+    visited--node.accept_exit(visitor) calls exit_<class>(), so that a scope is left in exit_Let() rather than when
+    reaching a marker node. Each of these methods calls that of the parent class by default (e.g. enter_Add() calls
+    enter_BinaryOperation(), up to enter_Program()), so subclasses only override the methods of the nodes they handle;
+    bind_methods() makes each of these a direct call. enter_<class>() returns whether to visit the children of the node
+    """
+
+    def visit(self, root):
+        assert isinstance(root, Program)
+        nodes = [root]
+        states = [ENTER]
+        while nodes:
+            node = nodes.pop()
+            state = states.pop()
+            if state != ENTER:
+                node.accept_exit(self)
+            elif node.accept(self):
+                nodes.append(node)
+                states.append(EXIT)
+                children = node.children()
+                for i in range(len(children) - 1, -1, -1):  # so that the children are popped in order
+                    nodes.append(children[i])
+                    states.append(ENTER)
+            else:
+                nodes.append(node)
+                states.append(EXIT_SKIPPED)
+
+    def enter_Program(self, node):
+        return True
+
+    def exit_Program(self, node):
+        return None
+
+
+class AstTransformer(AstVisitor):
+    """
+    Rewrite an AST in place: as AstVisitor, but the exit_<class>() methods may return a node to replace the visited
+    node with (or None to keep it), which is set in its parent with set_children(). Since the children of a node are
+    replaced before exit_<class>() is called for the node, rewrites compose bottom-up, e.g. folding (1 + 2) * 3 in one
+    traversal
+    """
+
+    def transform(self, root):
+        """:return: the root of the rewritten AST, which is root itself unless exit_<class>() replaced it"""
+        assert isinstance(root, Program)
+        nodes = [root]
+        states = [ENTER]
+        results = [[]]  # the (possibly replaced) children of each node being visited, the root's in the first
+        while nodes:
+            node = nodes.pop()
+            state = states.pop()
+            if state == ENTER:
+                results.append([])
+                nodes.append(node)
+                if node.accept(self):
+                    states.append(EXIT)
+                    children = node.children()
+                    for i in range(len(children) - 1, -1, -1):
+                        nodes.append(children[i])
+                        states.append(ENTER)
+                else:
+                    states.append(EXIT_SKIPPED)
+                continue
+            children = results.pop()
+            if state == EXIT and is_replaced(node.children(), children):
+                node.set_children(children)
+            replacement = node.accept_exit(self)
+            results[-1].append(replacement if replacement is not None else node)
+        return results[0][0]
+
+
+def is_replaced(children, replacements):
+    for i in range(len(children)):
+        if children[i] is not replacements[i]:
+            return True
+    return False
+
+
+def bind_methods(visitor_class):
+    """
+    Bind the enter_<class>() and exit_<class>() methods that a subclass of AstVisitor does not define to those it defines
+    for the nearest parent class (see rpythonizer.bind_visitor_methods); call it once the subclass is defined, e.g.
+    bind_methods(LValueTransformer)
+    """
+    bind_visitor_methods(visitor_class, list_ast_classes(), Program)
+
+
+# add the default enter_<class>() and exit_<class>() methods of all AST classes
+for cls in list_ast_classes():
+    add_default_visitor_methods(AstVisitor, cls, Program)